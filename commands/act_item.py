@@ -1,7 +1,36 @@
-from evennia.utils.utils import make_iter, uses_database
 from commands.command import Command
 from world.utils.act import Announce, act
-from world.utils.utils import can_contain_more, can_drop, can_see_obj, is_container, is_cursed, is_equippable, is_equipped, is_obj, can_pickup, is_sleeping, is_weapon, is_wieldable, is_wielded, is_worn, match_name, parse_dot_notation
+from world.utils.match import find_objs
+from world.utils.utils import can_contain_more, can_drop, can_see_obj, is_container, is_cursed, is_equippable, is_equipped, is_obj, can_pickup, is_weapon, is_wieldable, is_wielded, is_worn
+
+
+def parse_amount(args):
+    """
+    splits an amount off the front of args
+
+    ex: `5 arrow` = (5, 'arrow')
+    ex: `arrow` = (None, 'arrow')
+
+    raises ValueError for an amount under 1, ex: `0 arrow`
+    """
+    amount, _, rest = args.partition(' ')
+    if rest and amount.isdigit():
+        if int(amount) < 1:
+            raise ValueError("How many?")
+        return int(amount), rest.strip()
+    return None, args
+
+
+def take_from_stack(obj, query, amount=None):
+    """
+    returns the part of the stack obj a command acts on, the whole stack
+    for all/all.<obj>, `amount` of it when given, otherwise a single one
+    """
+    if amount is not None:
+        return obj.split(amount)
+    if query == 'all' or query.startswith('all.'):
+        return obj
+    return obj.split(1)
 
 
 class CmdPut(Command):
@@ -33,74 +62,6 @@ class CmdPut(Command):
             act("You put $p in $P", True, True, ch, obj, con_obj,
                 Announce.ToChar)
 
-        def find_container(con_name, pos=None):
-            locs = [ch, ch.location]
-            for loc in locs:
-                if pos is None:
-                    # find first container
-                    _container = None
-                    for obj in loc.contents:
-                        if is_container(obj) and match_name(con_name, obj):
-                            # match
-                            _container = obj
-                            return _container
-                else:
-                    try:
-                        pos = int(pos)
-                    except:
-                        raise ValueError('pos should be a integer value')
-
-                    # find <pos> container
-                    cntr = 1
-                    _container = None
-                    for obj in loc.contents:
-                        if is_container(obj) and match_name(con_name, obj):
-                            if cntr == con_pos:
-                                # match container
-                                _container = obj
-                                return _container
-                            cntr += 1
-
-        def find_obj(obj_name, pos=None):
-            # get all objects
-            if pos is None and obj_name == 'all':
-                # simple return all contents that isn't container type
-                matched_objs = []
-
-                for obj in ch.contents:
-                    if is_container(obj) or is_equipped(obj):
-                        continue
-                    matched_objs.append(obj)
-                return matched_objs
-
-            # put book in bag
-            elif pos is None:
-                for obj in ch.contents:
-                    if not is_container(obj) and match_name(
-                            obj_name, obj) and not is_equipped(obj):
-                        return make_iter(obj)
-                return None
-
-            # put all.book in bag
-            elif pos == 'all':
-                matched_objs = []
-                for obj in ch.contents:
-                    if not is_container(obj) and match_name(
-                            obj_name, obj) and not is_equipped(obj):
-                        matched_objs.append(obj)
-                return matched_objs
-
-            else:
-                # get <pos> of matching name
-                cntr = 1
-                for obj in ch.contents:
-                    if not is_container(obj) and match_name(
-                            obj_name, obj) and not is_equipped(obj):
-                        if cntr == pos:
-                            return make_iter(obj)
-                        cntr += 1
-                return None
-
         args = self.args.strip().split()
         if not args or len(args) != 3:
             ch.msg("Put what in what?")
@@ -111,62 +72,33 @@ class CmdPut(Command):
             ch.msg("You must speicify `in`")
             return
 
-        all_objs = False
-        obj_pos = con_pos = None
-
-        obj_pos, obj_name = parse_dot_notation(obj_name)
-        if obj_pos == 'all':
-            all_objs = True
-
-        con_pos, container = parse_dot_notation(container)
-
-        if not obj_pos and not con_pos:
-            _container = find_container(container)
-            objs = find_obj(obj_name)
-            if not _container:
-                ch.msg("You couldn't find such container")
-                return
-            if not objs:
-                ch.msg("You couldn't find such item")
-                return
-
-            for obj in objs:
-                if not can_see_obj(ch,
-                                   obj) or is_equipped(obj) or is_cursed(obj):
-                    ch.msg("You can't do that.")
-                    continue
-
-                if can_contain_more(_container):
-                    obj.move_to(_container)
-                    success_put(obj, _container)
-                else:
-                    ch.msg("You can't fit anymore items in there.")
-
-            return
-
-        # obj=all.<obj>
-        _container = find_container(container, pos=con_pos)
-        if not _container:
-            ch.msg("You could't find that container.")
+        containers = find_objs(container, (ch, ch.location),
+                               condition=is_container)
+        if not containers:
+            ch.msg("You couldn't find such container")
             return
+        _container = containers[0]
 
-        pos = 'all' if all_objs else obj_pos
-
-        objs = find_obj(obj_name, pos=pos)
+        objs = find_objs(obj_name, (ch, ),
+                         condition=lambda x: not is_container(x) and
+                         not is_equipped(x))
         if not objs:
-            ch.msg("You can't find anything like that.")
+            ch.msg("You couldn't find such item")
             return
 
         for obj in objs:
             if not can_see_obj(ch, obj) or is_cursed(obj):
                 ch.msg("You can't do that.")
                 continue
-            if can_contain_more(_container):
+
+            obj = take_from_stack(obj, obj_name)
+            if can_contain_more(_container, obj.count):
                 obj.move_to(_container)
                 success_put(obj, _container)
             else:
+                # put back what was split off
+                obj.merge_stack()
                 ch.msg("You can't fit anymore items in there.")
-        return
 
 
 class CmdGet(Command):
@@ -176,6 +108,7 @@ class CmdGet(Command):
     Usage:
       get|take book
       get|take 2.book
+      get|take 5 arrow
       get|take book from bag
       get|take all.book from all.bag
       get|take book from 2.bag
@@ -195,9 +128,6 @@ class CmdGet(Command):
         ch = self.caller
 
         def success_get(obj, con=None):
-            # add obj weight to characters carry rating
-            ch.attrs.change_vital('carry', by=obj.db.weight)
-
             if not con:
                 act(f"$n picks up a $p.", True, True, ch, obj, None,
                     Announce.ToRoom)
@@ -223,38 +153,28 @@ class CmdGet(Command):
         # get all.book from all.bag
         # get all from chest
 
-        # TODO: refactor this function
-
         # arg length == get in room
-        if len(args) == 1:  #ex: get all.book, get 1.book, get book
-            obj_pos, obj_name = parse_dot_notation(args[0])
-
-            #ex: get all
-            if obj_name == 'all':
-                for obj in ch.location_contents():
-                    if can_pickup(ch, obj):
-                        obj.move_to(ch, quiet=True)
-                        success_get(obj)
+        #ex: get all.book, get 1.book, get book, get 5 arrow
+        if len(args) == 1 or (len(args) == 2 and args[0].isdigit()):
+            try:
+                amount, query = parse_amount(' '.join(args))
+            except ValueError as err:
+                ch.msg(str(err))
                 return
-
-            #ex: get all.book, 1.book
-            cntr = 1
+            objs = find_objs(query, (ch.location, ), condition=is_obj)
             got_something = False
-            for obj in ch.location_contents():
+            for obj in objs:
+                obj = take_from_stack(obj, query, amount)
+                # carry rating changes with every pick up
                 if can_pickup(ch, obj):
-                    # all.book
-                    if obj_pos == 'all' and match_name(obj_name, obj):
-                        obj.move_to(ch, quiet=True)
-                        success_get(obj)
-                        got_something = True
-                    # 1.book
-                    if match_name(obj_name, obj):
-                        if obj_pos == cntr or not obj_pos:
-                            obj.move_to(ch, quiet=True)
-                            success_get(obj)
-                            return
-                        cntr += 1
-            if not got_something:
+                    obj.move_to(ch, quiet=True)
+                    success_get(obj)
+                    got_something = True
+                else:
+                    # put back what was split off
+                    obj.merge_stack()
+
+            if not got_something and query != 'all':
                 ch.msg("You can't get that.")
             return
 
@@ -266,51 +186,28 @@ class CmdGet(Command):
             if "from" != _filler:
                 ch.msg("must supply `in` when getting from a container")
                 return
-            obj_pos, obj_name = parse_dot_notation(obj_name)
-            con_pos, con_name = parse_dot_notation(con_name)
-
-            locs = [ch.contents, ch.location.contents]
-
-            ####### first find container(s) ################
-            matched_containers = []
-            for loc in locs:
-                cntr = 1
-                for obj in loc:
-                    if is_container(obj):
-                        # all.bag
-                        if con_pos == 'all' and match_name(con_name, obj):
-                            matched_containers.append(obj)
-                        # 2.bag or bag <= first find
-                        if match_name(con_name, obj):
-                            if con_pos == cntr or not con_pos:
-                                matched_containers.append(obj)
 
+            matched_containers = find_objs(con_name, (ch, ch.location),
+                                           condition=is_container)
             if not matched_containers:
                 ch.msg("Could not find that container.")
                 return
-            #################################################
 
-            ###### find items from container ################
+            # book, 2.book only get one item out of the first container
+            # that has it
+            get_one = not (obj_name == 'all' or obj_name.startswith('all.'))
             found_something = False
             for con in matched_containers:
-                cntr = 1
-                for obj in con.contents:
-                    if is_obj(obj):
-                        # all.book
-                        if obj_pos == 'all' and match_name(
-                                obj_name, obj) or obj_name == 'all':
-                            obj.move_to(ch, quiet=True)
-                            success_get(obj, con)
-                            found_something = True
-                        elif match_name(obj_name, obj):
-                            if obj_pos == cntr or not obj_pos:
-                                obj.move_to(ch, quiet=True)
-                                success_get(obj, con)
-                                return
+                for obj in find_objs(obj_name, (con, ), condition=is_obj):
+                    obj = take_from_stack(obj, obj_name)
+                    obj.move_to(ch, quiet=True)
+                    success_get(obj, con)
+                    if get_one:
+                        return
+                    found_something = True
             if not found_something:
                 ch.msg("Could not find that item.")
             return
-            ##################################################
 
 
 class CmdRemove(Command):
@@ -331,31 +228,24 @@ class CmdRemove(Command):
             ch.msg("What do you want to remove?")
             return
 
-        obj_name = self.args.strip()
+        def is_removable(obj):
+            if is_cursed(obj):
+                return False
+            return (is_equippable(obj) and is_worn(obj)) or (
+                is_wieldable(obj) and is_wielded(obj))
+
+        objs = find_objs(self.args.strip(), (ch, ), condition=is_removable)
+        if not objs:
+            ch.msg("You can't remove that")
+            return
 
-        success_remove = False
-        for obj in ch.contents:
-            if is_equippable(obj) and is_worn(obj) and not is_cursed(obj):
+        for obj in objs:
+            if is_equippable(obj) and is_worn(obj):
                 # equipment
-                if obj_name == 'all':
-                    ch.equipment.remove(obj)
-                    success_remove = True
-                elif match_name(obj_name, obj):
-                    ch.equipment.remove(obj)
-                    return
-
-            elif is_wieldable(obj) and is_wielded(obj) and not is_cursed(obj):
+                ch.equipment.remove(obj)
+            else:
                 # weapon
-                if obj_name == 'all':
-                    ch.equipment.unwield(obj)
-                    success_remove = True
-
-                elif match_name(obj_name, obj):
-                    ch.equipment.unwield(obj)
-                    return
-
-        if not success_remove:
-            ch.msg("You can't remove that")
+                ch.equipment.unwield(obj)
 
 
 class CmdDrop(Command):
@@ -363,7 +253,9 @@ class CmdDrop(Command):
     drop something
     Usage:
       drop <obj>
-      drop <amt>.<obj> #TODO
+      drop <pos>.<obj>
+      drop all.<obj>
+      drop <amt> <obj>
       drop all
     """
 
@@ -382,72 +274,27 @@ class CmdDrop(Command):
             return
 
         def success_drop(obj):
-            # remove obj weight to characters carry rating
-            ch.attrs.change_vital('carry', by=-obj.db.weight)
             act("$n drops $p", True, True, ch, obj, None, Announce.ToRoom)
             act("You drop $p", True, True, ch, obj, None, Announce.ToChar)
 
-        if "." in args:
-            pos, obj_name = args.split('.')
-            do_all = False
-            if pos == 'all':
-                do_all = True
+        try:
+            amount, query = parse_amount(args)
+        except ValueError as err:
+            ch.msg(str(err))
+            return
+        objs = find_objs(query, (ch, ), condition=lambda x: not is_equipped(x))
+        if not objs:
+            ch.msg("You don't have anything like that.")
+            return
+
+        for obj in objs:
+            if can_drop(ch, obj):
+                obj = take_from_stack(obj, query, amount)
+                obj.move_to(ch.location, quiet=True)
+                success_drop(obj)
             else:
-                try:
-                    pos = int(pos)
-                except:
-                    ch.msg("pos must be a valid integer")
-                    return
-
-            # handles dot notation
-            cntr = 1
-            for obj in ch.contents:
-                if is_equipped(obj):
-                    continue
-                if match_name(obj_name, obj):
-                    if do_all:
-                        # match
-                        if can_drop(ch, obj):
-                            obj.move_to(ch.location, quiet=True)
-                            success_drop(obj)
-                        else:
-                            ch.msg("You can't drop that.")
-                        continue
-
-                    if cntr == pos:
-                        # match
-                        if can_drop(ch, obj):
-                            obj.move_to(ch.location, quiet=True)
-                            success_drop(obj)
-                        else:
-                            ch.msg("You can't drop that.")
-
-                    cntr += 1
-
-        else:
-            for obj in ch.contents:
-                if is_equipped(obj):
-                    continue
-
-                if args == 'all':
-                    if can_drop(ch, obj):
-                        obj.move_to(ch.location, quiet=True)
-                        success_drop(obj)
-
-                    else:
-                        act("You can't drop $p", False, False, ch, obj, None,
-                            Announce.ToChar)
-                    continue
-
-                elif match_name(args, obj):
-                    if can_drop(ch, obj):
-                        obj.move_to(ch.location, quiet=True)
-                        success_drop(obj)
-                        return
-                    else:
-                        act("You can't drop $p", False, False, ch, obj, None,
-                            Announce.ToChar)
-                        return
+                act("You can't drop $p", False, False, ch, obj, None,
+                    Announce.ToChar)
 
 
 class CmdWield(Command):
@@ -467,14 +314,12 @@ class CmdWield(Command):
             ch.msg("What do you want to wield?")
             return
 
-        args = self.args.strip()
-        for obj in ch.contents:
-            if is_wieldable(obj) and not is_wielded(obj):
-                # potential candidate
-                if match_name(args, obj):
-                    # match
-                    ch.equipment.wield(obj)
-                    return
+        objs = find_objs(
+            self.args.strip(), (ch, ),
+            condition=lambda x: is_wieldable(x) and not is_wielded(x))
+        if objs:
+            ch.equipment.wield(objs[0])
+            return
 
         ch.msg("You couldn't find anything like that to wield.")
 
@@ -499,18 +344,12 @@ class CmdWear(Command):
             ch.msg("What do you want to wear?")
             return
 
-        args = self.args.strip()
-        if args == 'all':
-            for obj in ch.contents:
-                if is_equippable(
-                        obj) and not is_worn(obj) and not is_weapon(obj):
-                    ch.equipment.add(obj)
+        objs = find_objs(self.args.strip(), (ch, ),
+                         condition=lambda x: is_equippable(x) and
+                         not is_worn(x) and not is_weapon(x))
+        if not objs:
+            ch.msg("You couldn't find anything like that to wear")
             return
-        for obj in ch.contents:
-            if is_equippable(obj) and not is_worn(obj) and not is_weapon(obj):
-                # this object is a potential candidate
-                if match_name(args, obj):
-                    # we have a match!
-                    ch.equipment.add(obj)
-                    return
-        ch.msg("You couldn't find anything like that to wear")
\ No newline at end of file
+
+        for obj in objs:
+            ch.equipment.add(obj)
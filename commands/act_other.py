@@ -1,4 +1,8 @@
 from commands.command import Command
+from world.combat import COMBAT
+from world.utils.act import Announce, act
+from world.utils.match import find_objs
+from world.utils.utils import get_name, is_npc
 
 
 class CmdTitle(Command):
@@ -25,4 +29,43 @@ class CmdTitle(Command):
             ch.attrs.title.value = ""
         else:
             ch.attrs.title.value = args
-        ch.msg("Title set.")
\ No newline at end of file
+        ch.msg("Title set.")
+
+class CmdKill(Command):
+    """
+    Attack someone.
+
+    Usage:
+        kill <target>
+    """
+
+    key = 'kill'
+    aliases = ['hit']
+
+    def func(self):
+        ch = self.caller
+
+        args = self.args.strip()
+        if not args:
+            ch.msg('Kill whom?')
+            return
+
+        victim = COMBAT.fighting(ch)
+        if victim is not None:
+            ch.msg(f"You are already fighting {get_name(victim)}!")
+            return
+
+        victims = find_objs(args, (ch.location, ), condition=is_npc)
+        if not victims:
+            ch.msg("They aren't here.")
+            return
+        victim = victims[0]
+        if 'nokill' in (victim.db.flags or []):
+            ch.msg(f"You can't attack {get_name(victim)}.")
+            return
+
+        act("You attack $N!", False, False, ch, None, victim, Announce.ToChar)
+        act("$n attacks you!", True, False, ch, None, victim, Announce.ToVict)
+        act("$n attacks $N!", True, False, ch, None, victim,
+            Announce.ToNotVict)
+        COMBAT.engage(ch, victim)
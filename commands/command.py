@@ -34,7 +34,7 @@ class Command(BaseCommand):
     """
     def at_post_cmd(self):
         "called after self.func()."
-        self.caller.msg(prompt=self.caller.get_prompt())
+        self.caller.send_prompt()
 
 
 class CmdFrenzied(Command):
@@ -46,6 +46,7 @@ class CharacterCmdSet(default_cmds.CharacterCmdSet):
         self.add(info.CmdLook())
         self.add(info.CmdScore())
         self.add(info.CmdRead())
+        self.add(info.CmdLibrary())
         self.add(info.CmdInventory())
         self.add(info.CmdEquipment())
         self.add(info.CmdTime())
@@ -60,6 +61,7 @@ class CharacterCmdSet(default_cmds.CharacterCmdSet):
         self.add(act_item.CmdWield())
 
         self.add(act_other.CmdTitle())
+        self.add(act_other.CmdKill())
 
         # movement commands
         self.add(act_mov.CmdNorth())
@@ -87,6 +89,7 @@ class BuilderCmdSet(CmdSet):
         self.add(wiz.CmdMList())
         self.add(wiz.CmdHolyLight())
         self.add(wiz.CmdGoto())
+        self.add(wiz.CmdDiceStat())
         self.add(wiz.CmdWizHelp)
 
 
@@ -126,6 +129,10 @@ class GodCmdSet(CmdSet):
         self.add(wiz.CmdBookLoad())
         self.add(wiz.CmdDBLoad())
         self.add(wiz.CmdLanguageUpdate())
+        self.add(wiz.CmdStorageMigrate())
+        self.add(wiz.CmdSaveQueue())
+        self.add(wiz.CmdTrigStat())
+        self.add(wiz.CmdAIStat())
         self.add(wiz.CmdPy())
 
 
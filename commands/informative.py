@@ -2,15 +2,17 @@
 holds informative type of commands
 """
 from evennia.server.sessionhandler import SESSIONS
-from evennia.contrib.rplanguage import obfuscate_language
 from world.calendar import DAYS, DAYS_IN_WEEK, HOLIDAYS, MONTHS, START_ERA, START_YEAR
-from world.paginator import BookEvMore
-from evennia import EvForm, EvTable
+from world.forms import new_form
+from world.library import catalogue
+from world.paginator import BookEvMore, book_layout
+from evennia import EvTable
 from evennia.contrib import custom_gametime
 from evennia.utils import evmore
 from evennia.utils.utils import inherits_from
 from commands.command import Command
-from world.utils.utils import can_see_obj, capitalize_sentence, get_name, is_book, is_container, is_equipped, is_invis, is_npc, is_obj, is_pc, is_pc_npc, is_wielded, is_wiz, is_worn, match_name, parse_dot_notation, rplanguage_parse_string
+from world.utils.utils import can_see_obj, capitalize_sentence, get_name, is_book, is_container, is_equipped, is_invis, is_npc, is_obj, is_pc, is_pc_npc, is_wiz, rplanguage_parse_string
+from world.utils.match import find_objs
 from evennia.utils.ansi import raw as raw_ansi
 
 
@@ -37,22 +39,21 @@ class CmdPeek(Command):
 
             ch.msg(table)
             return
-        for obj in ch.location.contents:
-            if is_pc_npc(obj) and match_name(args, obj):
-                items = list(obj.contents)
-                items.sort(key=lambda x: x.db.sdesc.lower())
+        for obj in find_objs(args, (ch.location, ), condition=is_pc_npc):
+            items = list(obj.contents)
+            items.sort(key=lambda x: x.db.sdesc.lower())
 
-                for item in items:
-                    if is_worn(item) or is_wielded(item):
-                        continue
+            for item in items:
+                if obj.equipment.is_equipped(item):
+                    continue
 
-                    if not can_see_obj(ch, item):
-                        continue
+                if not can_see_obj(ch, item):
+                    continue
 
-                    table.add_row(raw_ansi(item.obj_desc()))
-                ch.msg(f"You peek into {get_name(obj)}'s inventory")
-                ch.msg(table)
-                return
+                table.add_row(raw_ansi(item.obj_desc()))
+            ch.msg(f"You peek into {get_name(obj)}'s inventory")
+            ch.msg(table)
+            return
         ch.msg("You couldn't find anyone like that.")
 
 
@@ -208,38 +209,22 @@ class CmdRead(Command):
         ch = self.caller
 
         def show_book(book):
-            title = book.db.title
-            author = book.db.author
-            contents = book.db.contents
-            date = book.db.date
-
-            book_contents = f"\n|gTitle|w: {title}\n|gAuthor|w: {author}\n|gDate|w: {date}\n\n|n"
-            # evmore.msg(ch, book_contents)
-            form = EvForm("resources.forms.book")
-            form.map(cells={1: book.db.title, 2: book.db.author})
-
             # translate book into language as specified in book extra settings
             book_lang = book.db.language
             lang_skill = ch.languages.get(book_lang, None)
             if not lang_skill:  # language doesn't exist
-                BookEvMore(ch, book_contents + contents)
+                BookEvMore(ch, book_layout(book))
             else:
                 ch.debug_msg(book_lang, lang_skill)
-                contents_translated = obfuscate_language(contents,
-                                                         level=1.0 -
-                                                         lang_skill.level,
-                                                         language=book_lang)
-                contents_translated = capitalize_sentence(contents_translated)
-                BookEvMore(ch, book_contents + contents_translated)
+                BookEvMore(ch, book_layout(book, book_lang, lang_skill.level))
 
         if not self.args:
             ch.msg("what do you want to read?")
             return
 
         obj_name = self.args.strip()
-        pos, book = None, None
         if "." in obj_name:
-            pos, book = obj_name.split('.')
+            pos, book = obj_name.split('.', 1)
             if book != 'book':
                 ch.msg("if using dot expression, you must use book")
                 return
@@ -248,22 +233,54 @@ class CmdRead(Command):
             except:
                 ch.msg("not a valid position number")
                 return
-        cntr = 1
-        for obj in ch.contents:
+            # <num>.book counts through every book, whatever its name
+            obj_name = f"{pos}.all"
 
-            if is_book(obj):
-                if obj_name in obj.db.name and not pos and not book:  # using object name instead of dot expression
-                    show_book(obj)
-                    return
-                else:
-                    # assume we are using dot expression
-                    if cntr == pos:
-                        show_book(obj)
-                        return
-                    cntr += 1
+        books = find_objs(obj_name, (ch, ), condition=is_book)
+        if books:
+            show_book(books[0])
+            return
         ch.msg("You couldn't find anything to read")
 
 
+class CmdLibrary(Command):
+    """
+    Search the library for books
+
+    Usage:
+        library search <words>
+
+        ex:
+        library search red mountain
+    """
+
+    key = 'library'
+    locks = "cmd:all()"
+
+    def func(self):
+        ch = self.caller
+        args = self.args.strip().split(' ', 1)
+        if len(args) < 2 or args[0] != 'search' or not args[1].strip():
+            ch.msg("Usage: library search <words>")
+            return
+
+        books = catalogue()
+        hits = books.search(args[1])
+        if not hits:
+            ch.msg("The library has no books about that.")
+            return
+
+        table = self.styled_table("Title",
+                                  "Author",
+                                  "Category",
+                                  border='incols')
+        for vnum, _ in hits:
+            book = books.books[vnum]
+            table.add_row(book.get('title', ''), book.get('author', ''),
+                          book.get('category', ''))
+        ch.msg(str(table))
+
+
 class CmdEquipment(Command):
     """
     view currently worn equipment
@@ -323,7 +340,7 @@ class CmdInventory(Command):
             items.sort(key=lambda x: x.db.sdesc.lower())
             table = self.styled_table(border="header")
             for item in items:
-                if is_worn(item) or is_wielded(item):
+                if ch.equipment.is_equipped(item):
                     continue
 
                 if not can_see_obj(ch, item):
@@ -360,41 +377,7 @@ class CmdLook(Command):
                 ch.msg("You have no location to look at!")
                 return
 
-            room_msg = ""
-
-            # get room title
-            room_msg += f"|c{location.db.name}|n\n"
-
-            #get room_desc
-            room_msg += f"|G{location.db.desc}|n\n\n"
-
-            # get room exits
-            room_msg += "|C[ Exits: "
-            for direction, dvnum in location.db.exits.items():
-                if dvnum < 0:
-                    continue  # not set
-
-                room_msg += f"|lc{direction}|lt{direction}|le "
-            room_msg += "]|n\n\n"
-
-            # get room contents
-            # get objects
-            for obj in sorted(location.contents,
-                              key=lambda x: x.db.look_index):
-                if is_pc(obj):
-                    if obj.id == ch.id:
-                        continue
-                    room_msg += f"{obj.name.capitalize()}{obj.attrs.title.value} is {obj.attrs.position.value.name.lower()} here\n"
-
-                elif is_npc(obj) and can_see_obj(ch, obj):
-                    room_msg += f"{obj.db.ldesc}\n"
-
-                elif is_obj(obj):
-                    if is_invis(obj) and not can_see_obj(ch, obj):
-                        ch.msg("Couldn't see")
-                        continue
-                    else:
-                        room_msg += f"{obj.obj_desc(ldesc=True)}\n"
+            room_msg = location.look_header() + location.look_contents(ch)
             ch.msg(room_msg)
             return
 
@@ -413,35 +396,26 @@ class CmdLook(Command):
                 evmore.EvMore(ch, msg)
                 return
             # look for obj in room
-            for obj in ch.location.contents:
-                if is_obj(obj):
-                    if obj_name in obj.db.name:
-                        edesc = rplanguage_parse_string(ch, obj.db.edesc)
-                        ch.msg(f"You look at {obj.db.sdesc}\n{edesc}")
-                        return
-                elif is_npc(obj):
-                    if obj_name in obj.db.key:
-                        edesc = rplanguage_parse_string(ch, obj.db.edesc)
-                        ch.msg(f"You look at {obj.db.sdesc}\n{edesc}")
-                        return
+            for obj in find_objs(obj_name, (ch.location, )):
+                if is_obj(obj) or is_npc(obj):
+                    edesc = rplanguage_parse_string(ch, obj.db.edesc)
+                    ch.msg(f"You look at {obj.db.sdesc}\n{edesc}")
+                    return
 
                 elif is_pc(obj):
-                    if obj_name in obj.name:
-                        edesc = rplanguage_parse_string(ch, obj.db.desc)
-                        ch.msg(f"You look at {obj.full_title()}\n{edesc}")
-                        return
-            # try looking for an obj in your inventory, if found send back edesc
-            for obj in ch.contents:
-                if is_equipped(obj):
-                    continue
-                if match_name(obj_name, obj):
-                    edesc = obj.db.edesc
-                    if not edesc:
-                        ch.msg("You see nothing interesting.")
-                    else:
-                        edesc = rplanguage_parse_string(ch, edesc)
-                        ch.msg(edesc)
+                    edesc = rplanguage_parse_string(ch, obj.db.desc)
+                    ch.msg(f"You look at {obj.full_title()}\n{edesc}")
                     return
+            # try looking for an obj in your inventory, if found send back edesc
+            for obj in find_objs(obj_name, (ch, ),
+                                 condition=lambda x: not is_equipped(x)):
+                edesc = obj.db.edesc
+                if not edesc:
+                    ch.msg("You see nothing interesting.")
+                else:
+                    edesc = rplanguage_parse_string(ch, edesc)
+                    ch.msg(edesc)
+                return
             ch.msg("You don't see anything like that.")
             return
 
@@ -450,31 +424,22 @@ class CmdLook(Command):
             if _filler != 'in':
                 ch.msg("Supply `in` when looking in a container")
                 return
-            pos, con_name = parse_dot_notation(con_name)
-
-            cntr = 1
-            locs = [ch, ch.location]
-            for loc in locs:
-                for obj in loc.contents:
-                    if not is_container(obj):
-                        continue
-                    if match_name(con_name, obj) and (cntr == pos or not pos):
-                        # found container; display contents, sorted
-                        objs = list(obj.contents)
-                        objs.sort(key=lambda x: x.db.sdesc.lower())
-                        table = self.styled_table(border="header")
-                        for item in objs:
-                            if not can_see_obj(ch, item):
-                                sdesc = "<something>"
-                            else:
-                                sdesc = f"{item.obj_desc()}"
-                            table.add_row("{}|n".format(raw_ansi(sdesc)))
-                        extra = "" if not is_pc_npc(
-                            loc) else ", that you are holding,"
-                        string = f"|w{obj.db.sdesc}{extra} has:\n{table}"
-                        ch.msg(string)
-                        return
-                    cntr += 1
+            for obj in find_objs(con_name, (ch, ch.location),
+                                 condition=is_container):
+                # found container; display contents, sorted
+                objs = list(obj.contents)
+                objs.sort(key=lambda x: x.db.sdesc.lower())
+                table = self.styled_table(border="header")
+                for item in objs:
+                    if not can_see_obj(ch, item):
+                        sdesc = "<something>"
+                    else:
+                        sdesc = f"{item.obj_desc()}"
+                    table.add_row("{}|n".format(raw_ansi(sdesc)))
+                extra = "" if obj.location != ch else ", that you are holding,"
+                string = f"|w{obj.db.sdesc}{extra} has:\n{table}"
+                ch.msg(string)
+                return
             ch.msg("You couldn't find anything like that.")
 
 
@@ -500,7 +465,7 @@ class CmdScore(Command):
             else:
                 return f"{num}"
 
-        form = EvForm("resources.score_form")
+        form = new_form("resources.score_form")
         form.map({
             1: f"{ch.full_title()}",
             2: ch.stats.str.base,
@@ -540,4 +505,4 @@ class CmdScore(Command):
                         table=[languages, lan_skill],
                         border='incols')
         form.map(tables={"A": table})
-        ch.msg(form)
+        ch.msg(str(form))
@@ -24,8 +24,13 @@ from world.edit.redit import REditMode
 from typeclasses.objs.custom import CUSTOM_OBJS
 from world.edit.oedit import OEditMode
 from world.utils.utils import DBDumpEncoder, delete_contents, has_zone, is_invis, is_npc, is_pc, is_wiz, match_string
+from world.utils.serialize import stored_size
+from world import combat, library, mobai, persistence
+from world.dice import DiceError, dice, distribution
 from world.conditions import HolyLight, get_condition
 from world.utils.act import Announce, act
+from world.mobprog import dispatch
+from world.mobprog.parser import compile_trigdb
 from commands.command import Command
 from world.globals import BUILDER_LVL, GOD_LVL, WIZ_LVL, IMM_LVL
 
@@ -166,6 +171,157 @@ class CmdLanguageUpdate(Command):
             lang.add(override=force)  # add langauge and overwrite
 
 
+class CmdStorageMigrate(Command):
+    """
+    Rewrites the stored attrs, stats, skills, conditions, traits and
+    languages of every character and mob into the compact storage
+    format. Only needs to be run once, running it again is harmless.
+
+    Usage:
+        storage_migrate
+    """
+
+    key = 'storage_migrate'
+
+    def func(self):
+        ch = self.caller
+        handlers = ('attrs', 'stats', 'skills', 'conditions', 'traits',
+                    'languages')
+
+        num_chars = before = after = 0
+        for char in Character.objects.all_family():
+            for name in handlers:
+                if not char.attributes.has(name):
+                    continue
+                before += stored_size(char.attributes.get(name))
+                getattr(char, name).save()
+                after += stored_size(char.attributes.get(name))
+            num_chars += 1
+
+        ch.msg(f"Migrated {num_chars} characters/mobs, "
+               f"{before} bytes -> {after} bytes")
+
+
+class CmdSaveQueue(Command):
+    """
+    Shows how many writes are waiting in the save queue and
+    what the last save cycle wrote.
+
+    Usage:
+        savequeue
+    """
+
+    key = 'savequeue'
+
+    def func(self):
+        ch = self.caller
+        last = persistence.LAST_CYCLE
+        ch.msg(f"Queued writes: {persistence.queue_depth()}\n"
+               f"Last cycle: {last['rows']} rows ({last['bytes']} bytes)")
+
+
+class CmdTrigStat(Command):
+    """
+    Shows the triggers that used the most cpu time since the server
+    started, how often they fired and were stopped for running too long.
+
+    Usage:
+        trigstat
+    """
+
+    key = 'trigstat'
+
+    def func(self):
+        ch = self.caller
+        if not dispatch.FIRES:
+            ch.msg("No trigger has fired yet.")
+            return
+        table = self.styled_table("VNum",
+                                  "Fires",
+                                  "CPU ms",
+                                  "Killed",
+                                  border='incols')
+        for vnum, cpu in dispatch.CPU_TIME.most_common(20):
+            table.add_row(vnum, dispatch.FIRES[vnum], f"{cpu * 1000:.1f}",
+                          dispatch.KILLS[vnum])
+        ch.msg(str(table))
+
+
+class CmdAIStat(Command):
+    """
+    Shows how many mobs the ai scheduler handles and
+    what its last pulse did, and the same for fights.
+
+    Usage:
+        aistat
+    """
+
+    key = 'aistat'
+
+    def func(self):
+        ch = self.caller
+        last = mobai.LAST_PULSE
+        ch.msg(f"Scheduled mobs: {len(mobai.MOBAI)}\n"
+               f"Last pulse: {last['ms']:.2f}ms, {last['acted']} acted, "
+               f"{last['skipped']} skipped, {last['deferred']} deferred")
+        last = combat.LAST_ROUND
+        ch.msg(f"Engagements: {len(combat.COMBAT)}\n"
+               f"Last round: {last['ms']:.2f}ms, {last['fights']} fights "
+               f"in {last['rooms']} rooms, {last['deaths']} deaths")
+
+
+class CmdDiceStat(Command):
+    """
+    Rolls a dice expression many times and shows how
+    the totals are spread.
+
+    Usage:
+        dicestat <dice> [samples]
+        dicestat 1d10+4
+        dicestat 3d6 100000
+    """
+
+    key = 'dicestat'
+    max_rows = 30
+    bar_width = 40
+
+    def func(self):
+        ch = self.caller
+        args = self.args.split()
+        if not args:
+            ch.msg("Roll what? ex: dicestat 1d10+4")
+            return
+        try:
+            die = dice(args[0])
+            samples = int(args[1]) if len(args) > 1 else 10000
+        except DiceError as err:
+            ch.msg(str(err))
+            return
+        except ValueError:
+            ch.msg("samples must be a number")
+            return
+        samples = min(max(samples, 1), 1000000)
+
+        counts = distribution(die, samples)
+        # group the totals so that at most max_rows are shown
+        step = max(1, -(-(die.max - die.min + 1) // self.max_rows))
+        rows = {}
+        for total, count in counts.items():
+            low = die.min + (total - die.min) // step * step
+            rows[low] = rows.get(low, 0) + count
+        mean = sum(x * n for x, n in counts.items()) / samples
+
+        table = self.styled_table("Total", "%", "", border='incols')
+        most = max(rows.values())
+        for low in sorted(rows):
+            label = str(low) if step == 1 else f"{low}-{low + step - 1}"
+            bar = '#' * max(1, rows[low] * self.bar_width // most)
+            table.add_row(label, f"{rows[low] * 100 / samples:.1f}", bar)
+        ch.msg(f"{die}: min {die.min}, max {die.max}, "
+               f"average {die.average:.1f} (rolled {mean:.2f} "
+               f"over {samples} rolls)\n{table}")
+
+
 class CmdDBDump(Command):
     """
     Dumps zones/objects/room/mobs into json flat files.
@@ -1056,6 +1212,14 @@ class CmdDBLoad(Command):
                 for vnum, data in data.items():
                     GLOBAL_SCRIPTS.get(dbname).vnum[int(vnum)] = data
             ch.msg(f"loaded {name}")
+            if name == 'obj':
+                library.reload()
+            if name == 'trig':
+                dispatch.reload_index()
+                # compile the progs now rather than when they first fire
+                errors = compile_trigdb(deserialize(GLOBAL_SCRIPTS.trigdb.vnum))
+                for vnum, error in sorted(errors.items()):
+                    ch.msg(f"|rtrigger {vnum} doesn't compile|n: {error}")
 
         if not self.args:
             names = [f"|c{x.name[:-2]}|n"
@@ -1140,6 +1304,7 @@ class CmdBookLoad(Command):
             GLOBAL_SCRIPTS.objdb.vnum[next_vnum] = book
             next_vnum += 1
 
+        library.reload()
         ch.msg("loaded books")
 
 
@@ -22,7 +22,35 @@ def at_server_start():
     This is called every time the server starts up, regardless of
     how it was shut down.
     """
-    pass
+    from evennia import GLOBAL_SCRIPTS, SESSION_HANDLER, logger
+    from evennia.utils.dbserialize import deserialize
+    from world import persistence, timers
+    from world.mobprog.parser import compile_trigdb
+    from typeclasses.mobs.mob import Mob
+    from world.combat import COMBAT
+    from world.mobai import MOBAI, is_active
+    from world.regen import REGEN
+
+    # characters puppeted before a reload don't go through
+    # at_post_puppet again, pick them back up here
+    for session in SESSION_HANDLER.get_sessions():
+        if session.puppet:
+            REGEN.add(session.puppet)
+    REGEN.start()
+    persistence.start()
+
+    for mob in Mob.objects.all():
+        if is_active(mob):
+            MOBAI.add(mob)
+    MOBAI.start()
+    COMBAT.start()
+
+    timers.load()
+    timers.start()
+
+    errors = compile_trigdb(deserialize(GLOBAL_SCRIPTS.trigdb.vnum))
+    for vnum, error in sorted(errors.items()):
+        logger.log_err(f"trigger {vnum} doesn't compile: {error}")
 
 
 def at_server_stop():
@@ -30,7 +58,11 @@ def at_server_stop():
     This is called just before the server is shut down, regardless
     of it is for a reload, reset or shutdown.
     """
-    pass
+    from world import timers
+    from world.persistence import drain, save_dirty
+    timers.save()
+    save_dirty()
+    drain()
 
 
 def at_server_reload_start():
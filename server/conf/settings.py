@@ -60,6 +60,11 @@ GLOBAL_SCRIPTS = {
         'typeclass': 'typeclasses.scripts.EntityDB',
         'persistent': True,
         'desc': 'storage for zones'
+    },
+    'timerdb': {
+        'typeclass': 'typeclasses.scripts.Script',
+        'persistent': True,
+        'desc': 'pending condition timers'
     }
 }
 
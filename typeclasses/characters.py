@@ -8,24 +8,30 @@ creation commands.
 
 """
 import copy
-import numpy as np
 from world.utils.db import search_roomdb
-from evennia import DefaultCharacter, EvMenu, TICKER_HANDLER, search_object
+from evennia import DefaultCharacter, EvMenu, search_object
 from evennia.utils.utils import inherits_from, lazy_property, make_iter
 
 from typeclasses.rooms.rooms import Room
 from world.conditions import HolyLight
 from world.utils.act import Announce, act
+from world.utils import carry
+from world.utils.output import collect, flush_output
 from world.utils.utils import can_see_obj, delete_contents, is_equippable, is_npc, is_obj, is_pc, is_pc_npc, is_wieldable, is_wielded, is_wiz, is_worn, apply_obj_effects, remove_obj_effects
 from world.gender import Gender
 from world.races import NoRace
 from world.attributes import Attribute, VitalAttribute
 from world.birthsigns import NoSign
-from world.globals import BUILDER_LVL, GOD_LVL, IMM_LVL, Positions, START_LOCATION_VNUM, TICK_HEAL_CHAR, TICK_SAVE_CHAR, WIZ_LVL, WEAR_LOCATIONS
+from world.globals import BUILDER_LVL, GOD_LVL, IMM_LVL, Positions, START_LOCATION_VNUM, WIZ_LVL, WEAR_LOCATIONS
 from world.characteristics import CHARACTERISTICS
 from world.skills import Skill
 from world.storagehandler import StorageHandler
+from world import vitals
+from world.persistence import process_queue, save_dirty
+from world.regen import REGEN
+from world.timers import cancel_condition, schedule_condition, schedule_stored
 from world.languages import LanguageSkill, VALID_LANGUAGES
+from world.mobprog import dispatch
 
 
 class _CalcVitals:
@@ -40,7 +46,7 @@ class _CalcVitals:
 
     @property
     def base(self):
-        return (self.base_mult * np.log2(self.lvl)) * self.lvl
+        return vitals.base_vital(self.lvl, self.base_mult)
 
     def __repr__(self):
         return str(self.calc())
@@ -91,6 +97,10 @@ class EquipmentHandler:
     """
     Handles equipment based objects that exist in caller.location
     identified by
+
+    What is worn/wielded where is stored on caller as a compact
+    slot -> object id map (Attribute `equipment`), kept up to date by
+    add/wield/unwield/remove, so nothing has to be looked up per object.
     """
     _valid_wear_loc = WEAR_LOCATIONS
 
@@ -99,17 +109,52 @@ class EquipmentHandler:
         self.location = {}
         self.loc_help_msg = {}
 
+        slots = self.caller.attributes.get('equipment', default=None)
+        if slots is None:
+            slots = self._find_equipped()
+
+        contents = {obj.id: obj for obj in self.caller.contents}
         for loc in self._valid_wear_loc:
-            self.location[loc.name] = None  # obj
+            self.location[loc.name] = contents.get(slots.get(loc.name))
 
-        # now try to find objects in caller.location
-        # that are 1) is_equippable and 2)is_worn or 3) is wieldable and 4) is_wielded
+        # ids of everything that is worn or wielded
+        self.equipped = {
+            obj.id
+            for obj in self.location.values() if obj is not None
+        }
+
+    def _find_equipped(self):
+        """ builds the slot map from contents, for characters without one """
+        slots = {}
         for obj in self.caller.contents:
             if (is_equippable(obj) and is_worn(obj)):
-                self.location[obj.db.wear_loc] = obj
+                slots[obj.db.wear_loc] = obj.id
 
             if (is_wieldable(obj) and is_wielded(obj)):
-                self.location['wield'] = obj
+                slots['wield'] = obj.id
+        self.caller.attributes.add('equipment', slots)
+        return slots
+
+    def _set_slot(self, slot, obj):
+        old = self.location[slot]
+        if old is not None:
+            self.equipped.discard(old.id)
+        if obj is not None:
+            self.equipped.add(obj.id)
+        self.location[slot] = obj
+        self.caller.attributes.add(
+            'equipment',
+            {k: v.id
+             for k, v in self.location.items() if v is not None})
+
+    def is_equipped(self, obj):
+        return obj.id in self.equipped
+
+    def clear(self, obj):
+        """ frees the slot of obj, if it is equipped """
+        for slot, equipped in self.location.items():
+            if equipped is obj:
+                self._set_slot(slot, None)
 
     def add(self, obj):
         """ 
@@ -122,7 +167,7 @@ class EquipmentHandler:
             return
 
         obj.db.is_worn = True
-        self.location[obj.db.wear_loc] = obj
+        self._set_slot(obj.db.wear_loc, obj)
         act("$n wears $p", True, True, self.caller, obj, None, Announce.ToRoom)
         act("You wear $p", True, True, self.caller, obj, None, Announce.ToChar)
         apply_obj_effects(self.caller, obj)
@@ -132,7 +177,7 @@ class EquipmentHandler:
             self.caller.msg("You are already wielding something.")
             return
         obj.db.is_wielded = True
-        self.location['wield'] = obj
+        self._set_slot('wield', obj)
 
         act("$n wields $p", True, True, self.caller, obj, None,
             Announce.ToRoom)
@@ -142,7 +187,7 @@ class EquipmentHandler:
 
     def unwield(self, obj):
         obj.db.is_wielded = False
-        self.location['wield'] = None
+        self._set_slot('wield', None)
         act("$n unwields $p", True, True, self.caller, obj, None,
             Announce.ToRoom)
         act("You unwield $p", True, True, self.caller, obj, None,
@@ -157,7 +202,7 @@ class EquipmentHandler:
         remove any stat changes and affects to player here
         """
         obj.db.is_worn = False
-        self.location[obj.db.wear_loc] = None
+        self._set_slot(obj.db.wear_loc, None)
 
         act("$n removes $p", True, True, self.caller, obj, None,
             Announce.ToRoom)
@@ -172,9 +217,7 @@ class SkillHandler(StorageHandler):
     __attr_name__ = "skills"
 
     def __getitem__(self, key):
-        if key in self.__dict__.keys():
-            return self.__dict__[key]
-        return None
+        return self._load().get(key, None)
 
     def add(self, skill: Skill):
         if not isinstance(skill, Skill):
@@ -195,6 +238,8 @@ class StatHandler(StorageHandler):
 
 class ConditionHandler(StorageHandler):
     __attr_name__ = 'conditions'
+    # durations and periodic effects are scheduled in world.timers
+    __timed__ = True
 
     def has(self, condition):
         return True if self.get(condition) is not None else False
@@ -213,11 +258,27 @@ class ConditionHandler(StorageHandler):
                 # self.caller.msg("you can't be affected by this again")
                 return None
             c.at_condition(self.caller)  # fire at condition
+            if self.__timed__:
+                # before set, it marks c as timed
+                schedule_condition(self.caller, self.__attr_name__, c)
             self.set(c)
+            self._clear_look()
 
             if not quiet and (c.__activate_msg__ != ""):
                 self.caller.msg(c.__activate_msg__)
 
+    def schedule_stored(self):
+        """ schedules the timers of conditions stored before they were timed """
+        if self.__timed__ and schedule_stored(
+                self.caller, self.__attr_name__,
+                self.__getattr__(self.__attr_name__) or []):
+            self.mark_dirty()
+
+    def _clear_look(self):
+        # what others see of caller might have changed
+        if self.caller.location:
+            self.caller.location.ndb.look_contents = None
+
     def remove(self, *condition, quiet=False):
         for con in condition:
             cls, x, y = con
@@ -233,13 +294,18 @@ class ConditionHandler(StorageHandler):
             c.after_condition(self.caller)
 
             match = None
-            for _c in self.__getattr__(self.__attr_name__):
+            conditions = self.__getattr__(self.__attr_name__)
+            for _c in conditions:
                 if _c == c:
                     match = _c
                     break
 
             if match is not None:
-                self.__getattr__(self.__attr_name__).remove(match)
+                conditions.remove(match)
+                self.__setattr__(self.__attr_name__, conditions)
+                self._clear_look()
+                if self.__timed__:
+                    cancel_condition(self.caller, c)
                 if not quiet and (c.__deactivate_msg__ != ""):
                     self.caller.msg(c.__deactivate_msg__)
 
@@ -259,27 +325,64 @@ class ConditionHandler(StorageHandler):
 
     def set(self, condition):
         name = self.__attr_name__
-        self.__getattr__(name).append(condition)
+        conditions = self.__getattr__(name)
+        conditions.append(condition)
+        self.__setattr__(name, conditions)
 
 
 class TraitHandler(ConditionHandler):
     __attr_name__ = "traits"
+    __timed__ = False
 
 
 class AttrHandler(StorageHandler):
     __attr_name__ = "attrs"
+    __handler_fields__ = StorageHandler.__handler_fields__ + (
+        '_mods_version', '_vitals', '_vitals_key')
+
+    def init(self):
+        self._mods_version = 0
+        self._vitals = None
+        self._vitals_key = None
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name not in self.__handler_fields__:
+            REGEN.changed(self.caller)
+
+    def reload(self):
+        super().reload()
+        self._vitals_key = None
+        REGEN.changed(self.caller)
+
+    def mark_dirty(self):
+        super().mark_dirty()
+        REGEN.changed(self.caller)
 
     def update(self):
-        self.max_carry()
-        self.max_health()
-        self.max_magicka()
-        self.max_speed()
-        self.max_stamina()
+        """
+        recalculates the max of every vital, only when stats, level or
+        vital modifiers changed since the last time. returns the maxima.
+        """
+        key = (self.caller.stats.version, self.level.value,
+               self._mods_version)
+        if key == self._vitals_key:
+            return self._vitals
+
+        self._vitals = {
+            'carry': self.max_carry(),
+            'health': self.max_health(),
+            'magicka': self.max_magicka(),
+            'speed': self.max_speed(),
+            'stamina': self.max_stamina()
+        }
+        self._vitals_key = key
+        self.mark_dirty()
+        return self._vitals
 
     @property
     def base_vital(self):
-        level = self.caller.attrs.level.value
-        return (1.5 * np.log2(level)) * level
+        return vitals.base_vital(self.level.value)
 
     def change_vital(self, attr_type, by=0, update=True):
         """
@@ -360,50 +463,43 @@ class AttrHandler(StorageHandler):
             except ValueError:
                 # it doesn't exist, just add it to list
                 attr.mod.append(by)
+            self._mods_version += 1
         self.__setattr__(attr_type, attr)
         self.update()
 
     def max_health(self):
-        health = self.base_vital * np.log(self.caller.stats.end.base)
-        tot = int(health) + self.health.mods
-
-        self.health.max = max(tot, 3)
-        return max(tot, 3)
+        stats = self.caller.stats
+        tot = vitals.max_health(self.level.value, stats.end.base,
+                                self.health.mods)
+        self.health.max = tot
+        return tot
 
     def max_stamina(self):
-        end = self.caller.stats.end.base
-        agi = self.caller.stats.agi.base
-        stamina = self.base_vital * np.log(((end + agi) / 2))
-        tot = int(stamina) + self.stamina.mods
-
-        self.stamina.max = max(tot, 3)
-        return max(tot, 3)
+        stats = self.caller.stats
+        tot = vitals.max_stamina(self.level.value, stats.end.base,
+                                 stats.agi.base, self.stamina.mods)
+        self.stamina.max = tot
+        return tot
 
     def max_magicka(self):
-        wp = self.caller.stats.wp.base
-        int_ = self.caller.stats.int.base
-        magicka = self.base_vital * np.log((wp + int_) / 2)
-        tot = int(magicka) + self.magicka.mods + 20
-
-        self.magicka.max = max(tot, 3)
-        return max(tot, 3)
+        stats = self.caller.stats
+        tot = vitals.max_magicka(self.level.value, stats.wp.base,
+                                 stats.int.base, self.magicka.mods)
+        self.magicka.max = tot
+        return tot
 
     def max_speed(self):
-        sb = self.caller.stats.str.bonus
-        ab = self.caller.stats.agi.bonus
-        speed = sb + (2 * ab) + 20
-
-        tot = speed + self.speed.mods
+        stats = self.caller.stats
+        tot = vitals.max_speed(stats.str.bonus, stats.agi.bonus,
+                               self.speed.mods)
         self.speed.max = tot
         return tot
 
     def max_carry(self):
         # carry rating
-        str = self.caller.stats.str.collect()
-        end = self.caller.stats.end.collect()
-        carry = ((0.75 * str) + (0.25 * end)) + 50
-
-        tot = int(carry) + self.carry.mods
+        stats = self.caller.stats
+        tot = vitals.max_carry(stats.str.collect(), stats.end.collect(),
+                               self.carry.mods)
         self.carry.max = tot
         return tot
 
@@ -452,6 +548,7 @@ class Character(DefaultCharacter):
                        msg_receivers=msg_receivers,
                        mapping=mapping,
                        **kwargs)
+        dispatch.fire('say', self.location, self, speech=message)
 
     def announce_move_from(self,
                            destination,
@@ -497,36 +594,40 @@ class Character(DefaultCharacter):
                    auto_quit=False)
             self.attributes.remove('new_character')
 
-        ############### Non-Persistent Tickers ####################
-        TICKER_HANDLER.add(interval=TICK_HEAL_CHAR,
-                           callback=self.tick_heal_player,
-                           idstring=f"tick_heal_{self.name}",
-                           persistent=False)
-
-        TICKER_HANDLER.add(interval=TICK_SAVE_CHAR,
-                           callback=self.save_character,
-                           idstring=f"tick_save_{self.name}",
-                           persistent=False)
-        ###########################################################
+        REGEN.add(self)
+        self.conditions.schedule_stored()
+        # new session, it needs the full prompt and vitals
+        self.ndb.sent_prompt = None
+        self.ndb.sent_vitals = None
         self.msg(f"\nYou become |c{self.name.capitalize()}|n")
         self.execute_cmd('look')
 
     def save_character(self):
-        self.db.stats = dict(self.db.stats)
-        self.db.skills = dict(self.db.skills)
-        self.db.conditions = dict(self.db.conditions)
-        self.db.traits = dict(self.db.traits)
-        self.db.attrs = dict(self.db.attrs)
-        self.msg('saved.')
+        """ queues the handlers of this character that changed """
+        rows = save_dirty((self.stats, self.skills, self.conditions,
+                           self.traits, self.attrs, self.languages))
+        process_queue()
+        return rows
 
     def at_pre_unpuppet(self):
+        flush_output(self)
+        REGEN.remove(self)
         self.save_character()
 
-    def at_server_reload(self):
-        self.save_character()
-
-    def at_server_shutdown(self):
-        self.save_character()
+    def at_object_receive(self, moved_obj, source_location, **kwargs):
+        super().at_object_receive(moved_obj, source_location, **kwargs)
+        # contents changed, see world.utils.match
+        self.ndb.keyword_index = None
+        carry.at_receive(self, moved_obj)
+        if is_obj(moved_obj):
+            moved_obj.queue_merge()
+
+    def at_object_leave(self, moved_obj, target_location, **kwargs):
+        super().at_object_leave(moved_obj, target_location, **kwargs)
+        self.ndb.keyword_index = None
+        carry.at_leave(self, moved_obj)
+        if self.equipment.is_equipped(moved_obj):
+            self.equipment.clear(moved_obj)
 
     def at_after_move(self, src, **kwargs):
         self.execute_cmd('look')
@@ -584,47 +685,82 @@ class Character(DefaultCharacter):
     def languages(self):
         return LanguageHandler(self)
 
+    def msg(self, text=None, from_obj=None, session=None, **kwargs):
+        # plain text is sent in one go at the end of the command/tick
+        plain = isinstance(text, str) and not (from_obj or session or kwargs)
+        if collect(self, text, plain):
+            return
+        super().msg(text=text, from_obj=from_obj, session=session, **kwargs)
+
     def full_title(self):
         return f"{self.name.capitalize()}{self.attrs.title.value}"
 
-    def get_prompt(self):
+    def prompt_vitals(self):
+        """ current and max value of every vital shown in the prompt """
         self.attrs.update()
-        hp = self.attrs.health
-        mg = self.attrs.magicka
-        st = self.attrs.stamina
-        sp = self.attrs.speed
-        ca = self.attrs.carry
+        weight = carry.carried_weight(self)
+        if self.attrs.carry.cur != weight:
+            self.attrs.carry.cur = weight
+            self.attrs.mark_dirty()
+        vitals = {}
+        for name in ('health', 'magicka', 'stamina', 'speed', 'carry'):
+            attr = self.attrs.get(name)
+            vitals[name] = attr.cur
+            vitals[f"{name}_max"] = attr.max
+        return vitals
+
+    def get_prompt(self):
+        vitals = self.prompt_vitals()
+        holylight = is_wiz(self) and self.conditions.has(HolyLight)
+
+        # the prompt only changes when one of its parts does
+        key = (tuple(vitals.values()), holylight)
+        cached = self.ndb.prompt_cache
+        if cached and cached[0] == key:
+            return cached[1]
+
         prompt = "\n\n"
 
-        if is_wiz(self) and self.conditions.has(HolyLight):
+        if holylight:
             prompt += "(|wholy|ylight|n)"
 
-        prompt += f" HP:{hp.cur}/{hp.max} MG:{mg.cur}/{mg.max} ST:{st.cur}/{st.max} SP:{sp.cur}/{sp.max} CR:{ca.cur}/{ca.max} > "
+        prompt += (
+            f" HP:{vitals['health']}/{vitals['health_max']}"
+            f" MG:{vitals['magicka']}/{vitals['magicka_max']}"
+            f" ST:{vitals['stamina']}/{vitals['stamina_max']}"
+            f" SP:{vitals['speed']}/{vitals['speed_max']}"
+            f" CR:{vitals['carry']}/{vitals['carry_max']} > ")
 
+        self.ndb.prompt_cache = (key, prompt)
         return prompt
 
+    def send_prompt(self):
+        """
+        sends the prompt, and pushes the vitals out of band
+        (GMCP Char.Vitals / MSDP) for clients with status bars.
+        Both are only sent when something changed since the last time,
+        and the out of band push only holds the vitals that changed.
+        """
+        vitals = self.prompt_vitals()
+        sent = self.ndb.sent_vitals or {}
+        changed = {k: v for k, v in vitals.items() if sent.get(k) != v}
+        if changed:
+            # char_vitals goes out as GMCP Char.Vitals
+            self.msg(char_vitals=((), changed))
+            self.ndb.sent_vitals = vitals
+
+        prompt = self.get_prompt()
+        if prompt != self.ndb.sent_prompt:
+            self.msg(prompt=prompt)
+            self.ndb.sent_prompt = prompt
+
     def full_restore(self):
         self.attrs.update()
         self.attrs.health.cur = self.attrs.health.max
         self.attrs.magicka.cur = self.attrs.magicka.max
         self.attrs.speed.cur = self.attrs.speed.max
         self.attrs.stamina.cur = self.attrs.stamina.max
-
-    def tick_heal_player(self):
-        # called by global ticker  handler
-        # heals the player based on vitals restore rate
-        # up until the player is fully healed.
-        # then remove subscription until damaged again.
-
-        # heal stats based on level
-        level = self.attrs.level.value
-        amnt = 0.17588 * level + 5
-
-        #health
-        self.attrs.change_vital('health', by=amnt, update=False)
-        self.attrs.change_vital('magicka', by=amnt, update=False)
-        self.attrs.change_vital('speed', by=amnt, update=False)
-        self.attrs.change_vital('stamina', by=amnt, update=True)
+        self.attrs.mark_dirty()
 
     def clear_inventory(self):
         """ recurively delete all objs within self.contents """
@@ -642,13 +778,10 @@ class Character(DefaultCharacter):
         self.msg(str(x))
 
     def add_attr(self, name, value, is_vital=False):
-        if not self.attributes.has('attrs'):
-            self.attributes.add('attrs', dict())
-
         if is_vital:
-            self.db.attrs[name] = VitalAttribute(name=name, value=value)
+            self.attrs.set(name, VitalAttribute(name=name, value=value))
         else:
-            self.db.attrs[name] = Attribute(name=name, value=value)
+            self.attrs.set(name, Attribute(name=name, value=value))
 
     def at_object_creation(self):
         self.db.look_index = 0
@@ -661,6 +794,7 @@ class Character(DefaultCharacter):
         self.db.conditions = {'conditions': []}
         self.db.traits = {'traits': []}
         self.db.stats = copy.deepcopy(CHARACTERISTICS)
+        self.stats.save()  # store stats in their compact form
         self.db.is_npc = False
         self.db.is_pc = True
 
@@ -686,6 +820,7 @@ class Character(DefaultCharacter):
         self.add_attr('stamina', None, is_vital=True)
         self.add_attr('speed', None, is_vital=True)
         self.add_attr('carry', None, is_vital=True)
+        self.save_character()
 
         # set new starting location here
         start_loc = search_object('2', typeclass=Room)
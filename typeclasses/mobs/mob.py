@@ -12,6 +12,8 @@ from evennia.utils.dbserialize import deserialize
 from world.characteristics import CHARACTERISTICS
 from world.conditions import Blinded, DarkSight, DetectHidden, DetectInvis, Diseased, Flying, Hidden, Invisible, Sanctuary, Silenced, Sneak, WaterWalking, get_condition
 from typeclasses.characters import Character
+from world.combat import COMBAT
+from world.mobai import MOBAI, is_active
 
 
 class Mob(Character):
@@ -33,6 +35,15 @@ class Mob(Character):
         # do not give npc other cmdsets made for character
         pass
 
+    def at_after_move(self, source_location, **kwargs):
+        # nobody to show the new room to
+        pass
+
+    def at_object_delete(self):
+        MOBAI.remove(self)
+        COMBAT.stop(self)
+        return True
+
     def at_object_creation(self):
         self.db.look_index = 1
         self.db.attrs = {}
@@ -42,6 +53,7 @@ class Mob(Character):
         self.db.conditions = {'conditions': []}
         self.db.traits = {'traits': []}
         self.db.stats = copy.deepcopy(CHARACTERISTICS)
+        self.stats.save()  # store stats in their compact form
         self.db.is_npc = True
         self.db.is_pc = False
 
@@ -74,6 +86,9 @@ class Mob(Character):
         for stat_name, stat_value in obj['stats'].items():
             self.attributes.add(stat_name, stat_value)
 
+        if is_active(self):
+            MOBAI.add(self)
+
 
 VALID_MOB_FLAGS = {
     'sentinel', 'scavenger', 'aware', 'aggr', 'stay_zone', 'memory', 'helper',
@@ -37,6 +37,7 @@ class Container(Object):
     __obj_type__ = 'container'
     __specific_fields__ = {'limit': -1}
     __help_msg__ = ["limit: [int] - number of objects, -1 for infinity"]
+    __stackable__ = False
 
 
 class Weapon(Object):
@@ -45,6 +46,7 @@ class Weapon(Object):
     """
 
     __obj_type__ = "weapon"
+    __stackable__ = False
     __specific_fields__ = {"dam_type": "", 'dam_roll': ""}
     __help_msg__ = [
         f"dam_type:{wrap(' '.join(DAM_TYPES['physical']))}",
@@ -76,6 +78,7 @@ class Equipment(Object):
     Equipable objects
     """
     __obj_type__ = 'equipment'
+    __stackable__ = False
     __specific_fields__ = {'wear_loc': "", 'AR': 0, 'MAR': 0}
     __help_msg__ = [
         f"wear_loc: {', '.join([x.name for x in WEAR_LOCATIONS])}",
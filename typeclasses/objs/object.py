@@ -2,10 +2,12 @@
 Default Scrolls object
 All objects must inherit this class to work properly
 """
+from twisted.internet import reactor
 from evennia.utils.dbserialize import deserialize
 from world.globals import DEFAULT_OBJ_STRUCT
 from world.conditions import ALL_CONDITIONS, get_condition
-from evennia import DefaultObject, GLOBAL_SCRIPTS
+from evennia import DefaultObject, GLOBAL_SCRIPTS, ObjectDB
+from world.utils import carry
 
 
 class Object(DefaultObject):
@@ -157,6 +159,8 @@ class Object(DefaultObject):
     __obj_type__ = ""
     __specific_fields__ = {}
     __help_msg__ = ""
+    # identical copies can be held as one object with a count
+    __stackable__ = True
 
     # make it default quiet
     def move_to(
@@ -176,6 +180,30 @@ class Object(DefaultObject):
         super().basetype_setup()
         self.locks.add(";".join(["call:false()", "puppet:false()"]))
 
+    def at_object_receive(self, moved_obj, source_location, **kwargs):
+        super().at_object_receive(moved_obj, source_location, **kwargs)
+        # contents changed, see world.utils.match
+        self.ndb.keyword_index = None
+        carry.at_receive(self, moved_obj)
+        if isinstance(moved_obj, Object):
+            moved_obj.queue_merge()
+
+    def at_object_leave(self, moved_obj, target_location, **kwargs):
+        super().at_object_leave(moved_obj, target_location, **kwargs)
+        self.ndb.keyword_index = None
+        carry.at_leave(self, moved_obj)
+
+    def at_object_delete(self):
+        # no move hooks are called, whoever held self carries less now
+        carry.invalidate(self.location)
+        return True
+
+    def at_give(self, giver, getter, **kwargs):
+        super().at_give(giver, getter, **kwargs)
+        # world.mobprog needs world.utils.utils, which imports this module
+        from world.mobprog import dispatch
+        dispatch.fire_at('give', getter, giver, obj=self)
+
     def obj_desc(self, ldesc=False):
         """ returns string of tags currently set on obj"""
         if not self.db.tags:  # list is empty
@@ -193,8 +221,83 @@ class Object(DefaultObject):
             tags += "(|rda|Yed|rric|n) "
 
         if not ldesc:
-            return tags + self.db.sdesc
-        return tags + self.db.ldesc
+            return tags + self.db.sdesc + self.stack_desc()
+        return tags + self.db.ldesc + self.stack_desc()
+
+    @property
+    def count(self):
+        """ number of identical objects this object stands for """
+        return self.attributes.get('count', default=1)
+
+    def stack_desc(self):
+        return f" (x{self.count})" if self.count > 1 else ""
+
+    def stack_key(self):
+        """
+        objects with the same stack key are identical: same vnum and
+        same state. None if the object can't be stacked right now.
+        """
+        if not self.__stackable__ or self.contents:
+            return None
+        # the fields are only set by at_object_creation, which clears it
+        key = self.ndb.stack_key
+        if key is None:
+            fields = list(DEFAULT_OBJ_STRUCT) + list(self.__specific_fields__)
+            state = tuple(
+                repr(deserialize(self.attributes.get(field)))
+                for field in fields if field != 'key')
+            key = self.ndb.stack_key = (self.key, self.typename, state)
+        return key
+
+    def split(self, amount):
+        """
+        takes amount off the stack as a new object in the same location,
+        returns self when amount covers the whole stack
+        """
+        if amount < 1:
+            raise ValueError(f"can't split {amount} off a stack")
+        if amount >= self.count:
+            return self
+        new_obj = ObjectDB.objects.copy_object(self,
+                                               new_key=self.key,
+                                               new_location=self.location)
+        new_obj.attributes.add('count', amount)
+        self.attributes.add('count', self.count - amount)
+        return new_obj
+
+    def merge_stack(self):
+        """
+        merges self into an identical stack at its location,
+        returns the object that now holds the stack
+        """
+        key = self.stack_key()
+        if key is None or not self.location:
+            return self
+        for obj in self.location.contents:
+            # characters and exits have no stack key
+            if (obj is self or obj.key != self.key
+                    or not hasattr(obj, 'stack_key')):
+                continue
+            if obj.stack_key() == key:
+                obj.attributes.add('count', obj.count + self.count)
+                self.delete()
+                return obj
+        return self
+
+    def queue_merge(self):
+        """
+        merges self into a stack at its location once the current move
+        is over, called by whatever receives it
+        """
+        if self.ndb.merge_queued:
+            return
+        self.ndb.merge_queued = True
+        reactor.callLater(0, self._queued_merge)
+
+    def _queued_merge(self):
+        self.ndb.merge_queued = False
+        if self.pk:
+            self.merge_stack()
 
     def at_object_creation(self):
         """ 
@@ -240,6 +343,8 @@ class Object(DefaultObject):
                 self.attributes.add(efield, self.db.extra[efield])
             else:
                 self.attributes.add(efield, evalue)
+        # state changed, see stack_key
+        self.ndb.stack_key = None
 
 
 VALID_OBJ_TAGS = {
@@ -5,10 +5,14 @@ Rooms are simple containers that has no location of their own.
 
 """
 
+from twisted.internet import reactor
 from world.utils.db import search_roomdb
 from world.globals import DEFAULT_ROOM_STRUCT
 from evennia import DefaultRoom, GLOBAL_SCRIPTS, search_object
-from world.utils.utils import delete_contents, is_pc, EntityLoader
+from world.conditions import DetectHidden, DetectInvis, HolyLight
+from world.utils.translate import warm_room
+from world.mobprog import dispatch
+from world.utils.utils import can_see_obj, delete_contents, is_npc, is_obj, is_pc, is_pc_npc, EntityLoader
 
 
 class Room(DefaultRoom):
@@ -25,6 +29,73 @@ class Room(DefaultRoom):
     __specific_fields__ = {}
     __help_msg__ = ""
 
+    def at_object_receive(self, moved_obj, source_location, **kwargs):
+        super().at_object_receive(moved_obj, source_location, **kwargs)
+        # contents changed, see world.utils.match
+        self.ndb.keyword_index = None
+        self.ndb.look_contents = None
+        self.ndb.trig_listeners = None
+        if is_obj(moved_obj):
+            moved_obj.queue_merge()
+        if is_pc_npc(moved_obj):
+            dispatch.fire('enter', self, moved_obj)
+            if is_pc(moved_obj):
+                dispatch.fire('greet', self, moved_obj)
+        if is_pc(moved_obj) and not self.ndb.edesc_warm:
+            # translate extra descs at every rank once the look is sent
+            self.ndb.edesc_warm = True
+            reactor.callLater(0, warm_room, self)
+
+    def at_object_leave(self, moved_obj, target_location, **kwargs):
+        super().at_object_leave(moved_obj, target_location, **kwargs)
+        self.ndb.keyword_index = None
+        self.ndb.look_contents = None
+        self.ndb.trig_listeners = None
+
+    def look_header(self):
+        """ room name, desc and exits, cached until the room is rebuilt """
+        header = self.ndb.look_header
+        if header is None:
+            header = f"|c{self.db.name}|n\n"
+            header += f"|G{self.db.desc}|n\n\n"
+            header += "|C[ Exits: "
+            for direction, dvnum in self.db.exits.items():
+                if dvnum < 0:
+                    continue  # not set
+
+                header += f"|lc{direction}|lt{direction}|le "
+            header += "]|n\n\n"
+            self.ndb.look_header = header
+        return header
+
+    def look_contents(self, viewer):
+        """
+        what viewer sees lying around. characters are always listed
+        fresh, mobs and objects are cached per set of sight conditions
+        until the contents of the room change.
+        """
+        chars = ""
+        for obj in self.contents:
+            if is_pc(obj) and obj.id != viewer.id:
+                chars += f"{obj.name.capitalize()}{obj.attrs.title.value} is {obj.attrs.position.value.name.lower()} here\n"
+
+        sight = tuple(
+            viewer.conditions.has(x)
+            for x in (HolyLight, DetectInvis, DetectHidden))
+        cache = self.ndb.look_contents
+        # objects created or deleted in place don't call the move hooks
+        if cache is None or cache.get('len') != len(self.contents):
+            cache = self.ndb.look_contents = {'len': len(self.contents)}
+        if sight not in cache:
+            rest = ""
+            for obj in sorted(self.contents, key=lambda x: x.db.look_index):
+                if is_npc(obj) and can_see_obj(viewer, obj):
+                    rest += f"{obj.db.ldesc}\n"
+                elif is_obj(obj) and can_see_obj(viewer, obj):
+                    rest += f"{obj.obj_desc(ldesc=True)}\n"
+            cache[sight] = rest
+        return chars + cache[sight]
+
     def announce(self, msg, exclude=[]):
         """send msg to all pcs in current room"""
         for obj in self.contents:
@@ -100,6 +171,8 @@ class Room(DefaultRoom):
         self.db.edesc = room['edesc']
         self.db.extra = room['extra']
         self.db.load_list = room['load_list']
+        self.ndb.look_header = None
+        self.ndb.edesc_warm = None
 
         for efield, evalue in self.__specific_fields__.items():
             if efield in self.db.extra.keys():
@@ -6,7 +6,8 @@ from world.characteristics import *
 
 __all__ = ('WarriorSign', 'LadySign', 'SteedSign', 'LordSign', 'MageSign',
            'RitualSign', 'ApprenticeSign', 'AtronachSign', 'change_birthsign',
-           'ThiefSign', 'LoverSign', 'ShadowSign', 'TowerSign')
+           'ThiefSign', 'LoverSign', 'ShadowSign', 'TowerSign',
+           'get_birthsign')
 
 
 class BirthSign:
@@ -263,6 +264,15 @@ ALL_BIRTHSIGNS = [
 ]
 
 
+def get_birthsign(sign_name, cursed=False):
+    if sign_name == NoSign.__obj_name__:
+        return NoSign()
+    for sign in ALL_BIRTHSIGNS:
+        if sign.__obj_name__ == sign_name:
+            return sign(cursed)
+    return None
+
+
 def change_birthsign(caller, birthsign):
     if caller.attrs.birthsign.value == birthsign:
         caller.msg("you already are born under the {birthsign}")
@@ -3,10 +3,10 @@ Holds entire character generation process using evennia menus
 """
 import operator
 import copy
-import numpy as np
 
-from evennia.utils.evform import EvForm, EvTable
-from evennia.contrib.dice import roll_dice
+from evennia.utils.evform import EvTable
+from world.forms import new_form
+from world.dice import dice
 from world.characteristics import CHARACTERISTICS
 from world.birthsigns import *
 from world.races import PLAYABLE_RACES, change_race, get_race
@@ -17,9 +17,9 @@ from world.attributes import Attribute
 def pick_race(caller, **kwargs):
     races = [(x.name, x.sdesc) for x in PLAYABLE_RACES]
     text = "Pick a race"
-    form = EvForm('resources.chargen_race_form')
+    form = new_form('resources.chargen_race_form')
 
-    race_info = np.zeros((len(PLAYABLE_RACES), 8), dtype='object')
+    race_info = []
 
     for idx in range(len(PLAYABLE_RACES)):
 
@@ -32,16 +32,14 @@ def pick_race(caller, **kwargs):
             else:
                 info.append(s.stats[idy - 1].base)
 
-        max = np.max([x for x in info if isinstance(x, int)])
-        min = np.min([x for x in info if isinstance(x, int)])
-
-        idx_max = info.index(max)
-        idx_min = info.index(min)
+        stats = [x for x in info if isinstance(x, int)]
+        idx_max = info.index(max(stats))
+        idx_min = info.index(min(stats))
         info[idx_max] = f"|g{info[idx_max]}|n"
         info[idx_min] = f"|r{info[idx_min]}|n"
 
         info = [str(x) for x in info]
-        race_info[idx] = info
+        race_info.append(info)
 
     race_table = EvTable("Race",
                          "Str",
@@ -51,7 +49,7 @@ def pick_race(caller, **kwargs):
                          "Wp",
                          "Prc",
                          "Prs",
-                         table=race_info.transpose().tolist(),
+                         table=[list(x) for x in zip(*race_info)],
                          border='incols',
                          height=2)
     form.map(tables={'B': race_table})
@@ -131,16 +129,13 @@ def gen_characteristics_3(caller, **kwargs):
 
     stat_keys = dict({x.short: x.base for x in race_stats})
 
-    dice = np.vectorize(lambda x: x + roll_dice(1, 8))
-
-    stats = (dice(np.full((7, ), fill_value=0, dtype=np.int64)) +
-             list(stat_keys.values())).tolist()
+    stats = (dice("1d8").roll_batch(7) + list(stat_keys.values())).tolist()
     stat_keys = dict(zip(stat_keys.keys(), stats))
 
     race_base = dict({x.short: x.base for x in race_stats})
 
     # return None, None
-    form = EvForm('resources.forms.chargen_attribute_roll')
+    form = new_form('resources.forms.chargen_attribute_roll')
     map = {}
     cntr = 1
 
@@ -162,7 +157,7 @@ def gen_characteristics_3(caller, **kwargs):
     form.map(cells=map)
     text = str(form)
 
-    lck = roll_dice(3, 5)
+    lck = dice("3d5").roll()
     stat_keys['lck'] = lck
     k = kwargs.copy()
     k['stats'] = stat_keys.copy()
@@ -217,7 +212,7 @@ def finish(caller, **kwargs):
     is_cursed = False
     idx = None
     while 1:
-        idx = roll_dice(1, 5) - 1
+        idx = dice("1d5").roll() - 1
         if idx < 4:
             break
         is_cursed = True
@@ -0,0 +1,282 @@
+"""
+Fights.
+
+An engagement is one character going after another. Every engagement is
+a small record holding what a round needs (hit roll, damage dice, armour
+of the victim), read from both fighters once when it starts, and a
+single ticker resolves a round of every engagement in one pass every
+PULSE_VIOLENCE seconds, rolling the dice of all of them in batches. What
+happened in a room during the round is gathered and sent as one message
+to each player there.
+
+    COMBAT.engage(mob, victim)   # victim fights back if idle
+    COMBAT.fighting(ch)          # who ch is fighting, or None
+
+Mobs fight with their dam_num/dam_size/dam_mod/hit_roll, players with
+the dam_roll of what they wield (or their fists). Mob health is kept in
+ndb.hp, starting from their hp stat.
+"""
+import time
+
+from evennia import TICKER_HANDLER, logger
+
+from typeclasses.rooms.rooms import get_room
+from world.dice import Dice, DiceError, dice, roll_all
+from world.globals import PULSE_VIOLENCE, START_LOCATION_VNUM, Positions
+from world.utils.act import compile_act, render_act
+from world.utils.utils import is_pc, is_wielded
+
+FIST_DICE = dice("1d4")
+D20 = dice("1d20")
+
+# most damage a word is used for, what a round looks like from the room
+DAMAGE_WORDS = ((0, 'misses'), (2, 'scratches'), (4, 'grazes'), (6, 'hits'),
+                (10, 'injures'), (15, 'wounds'), (20, 'mauls'),
+                (30, 'decimates'), (40, 'devastates'), (60, 'maims'),
+                (None, 'MUTILATES'))
+
+# how long the last round took and what happened in it
+LAST_ROUND = {'ms': 0.0, 'fights': 0, 'rooms': 0, 'deaths': 0}
+
+
+def damage_word(damage):
+    for most, word in DAMAGE_WORDS:
+        if most is None or damage <= most:
+            return word
+
+
+def get_hp(ch):
+    if is_pc(ch):
+        return ch.attrs.health.cur
+    if ch.ndb.hp is None:
+        ch.ndb.hp = ch.db.hp or 0
+    return ch.ndb.hp
+
+
+def set_hp(ch, value):
+    if is_pc(ch):
+        ch.attrs.health.cur = value
+        ch.attrs.mark_dirty()
+    else:
+        ch.ndb.hp = value
+
+
+def set_position(ch, position):
+    if is_pc(ch):
+        ch.attrs.position.value = position
+    else:
+        ch.db.position = position
+
+
+def get_position(ch):
+    if is_pc(ch):
+        return ch.attrs.position.value
+    return ch.db.position
+
+
+def attack_of(ch):
+    """ (verb, hit roll, damage dice) ch attacks with """
+    if not is_pc(ch):
+        return (ch.db.attack or 'hit', ch.db.hit_roll or 0,
+                Dice(ch.db.dam_num or 0, ch.db.dam_size or 0, ch.db.dam_mod
+                     or 0))
+    for obj in ch.contents:
+        if is_wielded(obj):
+            try:
+                damage = dice(obj.db.dam_roll)
+            except DiceError:
+                damage = FIST_DICE
+            return obj.db.dam_type or 'hit', 0, damage
+    return 'punch', 0, FIST_DICE
+
+
+def armour_of(ch):
+    if is_pc(ch):
+        return ch.attrs.AR.value
+    return ch.db.ar or 0
+
+
+class Engagement:
+    """ attacker going after victim """
+    __slots__ = ('attacker', 'victim', 'verb', 'hit_roll', 'dice', 'armour')
+
+    def __init__(self, attacker, victim, verb, hit_roll, dice, armour):
+        self.attacker = attacker
+        self.victim = victim
+        self.verb = verb
+        self.hit_roll = hit_roll
+        self.dice = dice
+        self.armour = armour
+
+    def hits(self, attack):
+        """ whether a d20 roll of attack hits """
+        if attack == 1:
+            return False
+        return attack == 20 or attack + self.hit_roll >= 10 + self.armour
+
+
+def _templates(verb, damage):
+    word = damage_word(damage)
+    return (compile_act(f"Your {verb} {word} $N."),
+            compile_act(f"$n's {verb} {word} you."),
+            compile_act(f"$n's {verb} {word} $N."))
+
+
+_DEATH = (compile_act("You have killed $N!"),
+          compile_act("You have been |rKILLED|n!"),
+          compile_act("$N is |rDEAD|n!"))
+
+
+class CombatSystem:
+    def __init__(self):
+        self.fights = {}  # attacker id: Engagement
+        self.targeted = {}  # victim id: {attacker id, ...}
+
+    def __len__(self):
+        return len(self.fights)
+
+    def start(self):
+        TICKER_HANDLER.add(interval=PULSE_VIOLENCE,
+                           callback=violence_pulse,
+                           idstring="combat",
+                           persistent=False)
+
+    def fighting(self, ch):
+        fight = self.fights.get(ch.id)
+        return fight.victim if fight else None
+
+    def engage(self, ch, victim):
+        """ ch starts fighting victim, returns False if already fighting """
+        if ch.id in self.fights or ch is victim:
+            return False
+        verb, hit_roll, dice = attack_of(ch)
+        self.fights[ch.id] = Engagement(ch, victim, verb, hit_roll, dice,
+                                        armour_of(victim))
+        self.targeted.setdefault(victim.id, set()).add(ch.id)
+        set_position(ch, Positions.Fighting)
+        if victim.id not in self.fights:
+            self.engage(victim, ch)
+        return True
+
+    def disengage(self, ch):
+        """ ch stops fighting """
+        fight = self.fights.pop(ch.id, None)
+        if fight is None:
+            return
+        attackers = self.targeted.get(fight.victim.id)
+        if attackers is not None:
+            attackers.discard(ch.id)
+            if not attackers:
+                del self.targeted[fight.victim.id]
+        if ch.pk and get_position(ch) == Positions.Fighting:
+            set_position(ch, Positions.Standing)
+
+    def stop(self, ch):
+        """ ch stops fighting, and so does everyone fighting ch """
+        self.disengage(ch)
+        for attacker_id in list(self.targeted.get(ch.id, ())):
+            self.disengage(self.fights[attacker_id].attacker)
+
+    def _valid(self, fight):
+        attacker, victim = fight.attacker, fight.victim
+        if not (attacker.pk and victim.pk):
+            return False
+        if attacker.location is None or attacker.location != victim.location:
+            return False
+        for ch in (attacker, victim):
+            if is_pc(ch) and not ch.has_account:
+                return False
+        return True
+
+    def round(self):
+        """ resolves a round of every fight """
+        start = time.perf_counter()
+        events = {}  # room: [(templates, ch, vict), ...]
+        dead = {}  # victim id: (victim, killer)
+        fights = []
+        for fight in list(self.fights.values()):
+            if self._valid(fight):
+                fights.append(fight)
+            else:
+                self.disengage(fight.attacker)
+
+        # every hit and damage roll of the round at once
+        attacks = D20.roll_batch(len(fights)).tolist()
+        hits = [x.hits(attack) for x, attack in zip(fights, attacks)]
+        damages = iter(
+            roll_all([x.dice for x, hit in zip(fights, hits) if hit]))
+
+        for fight, hit in zip(fights, hits):
+            attacker, victim = fight.attacker, fight.victim
+            damage = max(1, next(damages)) if hit else 0
+            if attacker.id in dead:
+                continue
+            if victim.id in dead:
+                self.disengage(attacker)
+                continue
+            hp = get_hp(victim) - damage
+            if damage:
+                set_hp(victim, hp)
+            room = attacker.location
+            events.setdefault(room, []).append(
+                (_templates(fight.verb, damage), attacker, victim))
+            if damage and hp <= 0:
+                dead[victim.id] = (victim, attacker)
+                events[room].append((_DEATH, attacker, victim))
+
+        for victim, killer in dead.values():
+            self.stop(victim)
+        involved = self._flush(events)
+        for victim, killer in dead.values():
+            try:
+                self.die(victim, killer)
+            except Exception:
+                logger.log_trace(f"death of {victim.key} failed")
+        for ch in involved:
+            if ch.pk and ch.has_account:
+                ch.send_prompt()
+
+        LAST_ROUND.update(ms=(time.perf_counter() - start) * 1000,
+                          fights=len(fights),
+                          rooms=len(events),
+                          deaths=len(dead))
+
+    def _flush(self, events):
+        """ sends each player the round of their room, returns them """
+        viewers = []
+        for room, happened in events.items():
+            for viewer in room.contents:
+                if not (is_pc(viewer) and viewer.has_account):
+                    continue
+                lines = []
+                for (to_char, to_vict, to_room), ch, vict in happened:
+                    if viewer is ch:
+                        template = to_char
+                    elif viewer is vict:
+                        template = to_vict
+                    else:
+                        template = to_room
+                    lines.append(render_act(template, viewer, ch, None, vict))
+                viewer.msg("\n".join(lines))
+                viewers.append(viewer)
+        return viewers
+
+    def die(self, victim, killer):
+        if not is_pc(victim):
+            from world.mobprog.dispatch import fire_at
+            fire_at('death', victim, killer)
+            victim.delete()
+            return
+        set_hp(victim, 1)
+        set_position(victim, Positions.Standing)
+        room = get_room(START_LOCATION_VNUM)
+        if room is not None:
+            victim.move_to(room)
+
+
+COMBAT = CombatSystem()
+
+
+def violence_pulse():
+    # called by the global ticker handler
+    COMBAT.round()
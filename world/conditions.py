@@ -2,6 +2,7 @@
 Things that externally affect the character and their capabilities intead of
 features of the characters nature
 """
+from world.diseases import get_disease
 
 
 class Condition:
@@ -31,6 +32,9 @@ class Condition:
         effect(self, caller)
             function that can be called at will as long as condition/trait is enabled
 
+        progress(self, caller, stage)
+            the condition reaches stage, one of stages()
+
         on_duplicate(self, other)
             handles logic for if and when a trait/condition is flagged for multi_allow. 
             In backend, traits are stored in 'key:value' pairs, therefore we can't have 
@@ -48,6 +52,9 @@ class Condition:
     __deactivate_msg__ = ""
     __default_x__ = None
     __default_y__ = None
+    # custom_gametime units, ex: {'min': 30}. see world.timers
+    __duration__ = None  # ends by itself after
+    __interval__ = None  # effect() is called every
 
     def __init__(self, X=None, Y=None):
         self.meta = dict()
@@ -101,6 +108,14 @@ class Condition:
         """ things to do when condition ends """
         return None
 
+    def stages(self):
+        """ custom_gametime units after which each stage is reached """
+        return ()
+
+    def progress(self, caller, stage):
+        """ the condition reaches stage """
+        return None
+
     def on_duplicate(self, other):
         if not self.multi_allow:
             return None
@@ -111,6 +126,7 @@ class Bleeding(Condition):
     __activate_msg__ = "You begin bleeding profusely."
     __deactivate_msg__ = "Your bleeding is under control."
     __default_x__ = 1
+    __interval__ = {'min': 1}
 
     def at_condition(self, caller):
         if self.X is None:
@@ -120,7 +136,7 @@ class Bleeding(Condition):
         # take damage to caller of value X and end condition
         if self.enabled:
             caller.attrs.health.cur -= self.X
-            self.end_condition()
+            self.end_condition(caller)
 
 
 class Blinded(Condition):
@@ -134,6 +150,8 @@ class Burning(Condition):
     __activate_msg__ = "You are engulfed in flames!"
     __deactivate_msg__ = "The flames around you die down."
     __default_x__ = 1
+    __interval__ = {'min': 1}
+    __duration__ = {'min': 5}
 
     def at_condition(self, caller):
         if self.X is None:
@@ -227,12 +245,12 @@ class Frenzied(Condition):
         }
 
         self.meta['immunity'] = ['stunned', 'fear', {'wound': 'passive'}]
-        caller.stats.str.bonus += 1
-        caller.stats.end.bonus += 1
+        caller.stats.modify_stat('str', by=1)
+        caller.stats.modify_stat('end', by=1)
 
     def after_condition(self, caller):
-        caller.stats.str.bonus -= 1
-        caller.stats.end.bonus -= 1
+        caller.stats.modify_stat('str', by=-1)
+        caller.stats.modify_stat('end', by=-1)
 
 
 class HolyLight(Condition):
@@ -320,13 +338,11 @@ class Slowed(Condition):
 
     def at_condition(self, caller):
         cur_speed = caller.attrs.speed.max
-        speed_mod = cur_speed // 2 + 1
-        caller.attrs.speed.add_mod(-speed_mod)
+        self.meta['speed_mod'] = -(cur_speed // 2 + 1)
+        caller.attrs.modify_vital('speed', by=self.meta['speed_mod'])
 
     def after_condition(self, caller):
-        cur_speed = caller.attrs.max_speed
-        speed_mod = (cur_speed * 2) - 1
-        caller.attrs.speed.remove_mod(-speed_mod)
+        caller.attrs.modify_vital('speed', by=-self.meta['speed_mod'])
 
 
 class Sleeping(Condition):
@@ -423,6 +439,16 @@ class Diseased(Condition):
         if self.X is None:
             raise ValueError("diseased trait must have X defined")
 
+    def stages(self):
+        disease = get_disease(self.X)
+        if disease is None:
+            return ()
+        return [after for after, _ in disease.__stages__]
+
+    def progress(self, caller, stage):
+        self.meta['stage'] = stage
+        get_disease(self.X).progress(caller, stage)
+
 
 ALL_CONDITIONS = {
     Bleeding,
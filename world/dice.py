@@ -0,0 +1,138 @@
+"""
+Dice expressions.
+
+Rolls like `1d10+4`, `2d6-1` or `3d8` (weapon dam_roll, chargen stats)
+are parsed once into immutable Dice, cached per expression. Dice roll
+one at a time or many at once with NumPy, both from the generators of
+this module, which `seed()` makes repeatable (for tests).
+
+    dice("1d10+4").roll()
+    dice("1d10+4").roll_batch(10000)
+    roll_all([weapon_dice, claw_dice, weapon_dice])
+"""
+import random
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+_DICE = re.compile(r"^\s*(\d+)\s*d\s*(\d+)\s*(?:([+-])\s*(\d+))?\s*$",
+                   re.IGNORECASE)
+
+MAX_DICE = 100
+MAX_SIZE = 1000
+
+_NP = None
+_RNG = random.Random()
+_NP_RNG = None
+_SEED = None
+
+
+def _numpy():
+    # numpy is heavy to import and only needed for batch rolls
+    global _NP
+    if _NP is None:
+        import numpy as _NP
+    return _NP
+
+
+def _np_rng():
+    global _NP_RNG
+    if _NP_RNG is None:
+        _NP_RNG = _numpy().random.default_rng(_SEED)
+    return _NP_RNG
+
+
+def seed(value=None):
+    """ reseeds the dice, the same seed gives the same rolls """
+    global _SEED, _NP_RNG
+    _SEED = value
+    _RNG.seed(value)
+    _NP_RNG = None
+
+
+class DiceError(ValueError):
+    pass
+
+
+class Dice(NamedTuple):
+    """ num dice of size sides, plus mod """
+    num: int
+    size: int
+    mod: int = 0
+
+    def __str__(self):
+        if not self.mod:
+            return f"{self.num}d{self.size}"
+        return f"{self.num}d{self.size}{self.mod:+d}"
+
+    @property
+    def min(self):
+        return self.mod + (self.num if self.size > 0 else 0)
+
+    @property
+    def max(self):
+        return self.mod + self.num * max(self.size, 0)
+
+    @property
+    def average(self):
+        return (self.min + self.max) / 2
+
+    def roll(self):
+        if self.size < 1:
+            return self.mod
+        randint = _RNG.randint
+        return sum(randint(1, self.size) for _ in range(self.num)) + self.mod
+
+    def roll_batch(self, count):
+        """ count rolls at once, as a numpy array """
+        np = _numpy()
+        if self.size < 1 or self.num < 1:
+            return np.full(count, self.mod, dtype=np.int64)
+        rolls = _np_rng().integers(1, self.size + 1, size=(count, self.num))
+        return rolls.sum(axis=1) + self.mod
+
+
+@lru_cache(maxsize=1024)
+def dice(expr):
+    """ the Dice of expr like `1d10+4`, raises DiceError if not valid """
+    match = _DICE.match(str(expr))
+    if match is None:
+        raise DiceError(f"`{expr}` is not a dice roll, ex: 1d10+4")
+    num, size, sign, mod = match.groups()
+    num, size, mod = int(num), int(size), int(mod or 0)
+    if not 0 < num <= MAX_DICE:
+        raise DiceError(f"number of dice must be 1 to {MAX_DICE}")
+    if not 0 < size <= MAX_SIZE:
+        raise DiceError(f"size of dice must be 1 to {MAX_SIZE}")
+    return Dice(num, size, -mod if sign == '-' else mod)
+
+
+def valid_dice(expr):
+    """ None if expr is a valid dice roll, what is wrong with it if not """
+    try:
+        dice(expr)
+    except DiceError as err:
+        return str(err)
+    return None
+
+
+def roll_all(all_dice):
+    """
+    rolls every Dice of all_dice, the same dice are rolled in one batch.
+    returns the rolls as a list in the same order.
+    """
+    groups = {}
+    for idx, die in enumerate(all_dice):
+        groups.setdefault(die, []).append(idx)
+    results = [0] * len(all_dice)
+    for die, idxs in groups.items():
+        for idx, value in zip(idxs, die.roll_batch(len(idxs)).tolist()):
+            results[idx] = value
+    return results
+
+
+def distribution(die, samples=10000):
+    """ {total: times rolled} of samples rolls of die """
+    np = _numpy()
+    values, counts = np.unique(die.roll_batch(samples), return_counts=True)
+    return dict(zip(values.tolist(), counts.tolist()))
@@ -1,10 +1,17 @@
 class Disease:
     __obj_name__ = ""
     __help_category__ = "diseases"
+    # ({custom_gametime units after infection}, message) per stage
+    __stages__ = ()
+
     @property
     def name(self):
         return self.__obj_name__
 
+    def progress(self, caller, stage):
+        """ the disease of caller reaches stage """
+        caller.msg(self.__stages__[stage][1])
+
 class Ataxia(Disease):
     """
     Ataxia is a commona and relatively mild disease found across
@@ -30,6 +37,7 @@ class Ataxia(Disease):
     in severity any time after seven days. 
     """
     __obj_name__ = "ataxia"
+    __stages__ = (({'day': 7}, "Your joints stiffen and every muscle aches."),)
 
 
 class BrainRot(Disease):
@@ -57,6 +65,8 @@ class BrainRot(Disease):
     loss of Personality as well, unless cured.
     """
     __obj_name__ = "brain_rot"
+    __stages__ = (({'day': 7}, "Your thoughts grow slow and muddled."),
+                  ({'day': 14}, "You struggle to remember who you are."))
 
 
 class BoneBreak(Disease):
@@ -82,6 +92,8 @@ class BoneBreak(Disease):
     After a week late stage may develop.
     """
     __obj_name__ = "bone_break_fever"
+    __stages__ = (({'day': 3}, "Your bones begin to ache."),
+                  ({'day': 10}, "Your bones feel as brittle as dry twigs."))
 
 
 class BloodLung(Disease):
@@ -108,6 +120,7 @@ class BloodLung(Disease):
     unil cured.
     """
     __obj_name__ = "blood_lung"
+    __stages__ = (({'day': 3}, "You cough up a mouthful of blood."),)
 
 
 class  BlackHeart(Disease):
@@ -137,6 +150,7 @@ class  BlackHeart(Disease):
     after three days.
     """
     __obj_name__ = "black_heart_blight"
+    __stages__ = (({'day': 3}, "Your heart beats heavy and slow."),)
 
 
 class  Chills(Disease):
@@ -541,3 +555,12 @@ ALL_DISEASES = (Ataxia(), BrainRot(), BoneBreak(), BloodLung(), BlackHeart(),
         Greenspore(), Helljoint(), Rattles(), RedFever(), Rockjoint(),
         RustChancre(), Shakes(), SwampFever(), TunnelCough(), Witbane(),
         YellowTick(), CoronaVirus())
+
+
+def get_disease(disease):
+    """ the disease of ALL_DISEASES matching a name, class or instance """
+    name = disease if isinstance(disease, str) else disease.__obj_name__
+    for x in ALL_DISEASES:
+        if x.name == name:
+            return x
+    return None
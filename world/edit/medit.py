@@ -1,16 +1,17 @@
 from enum import IntEnum
-import numpy as np
+import math
 
 from evennia import CmdSet, Command, EvEditor, GLOBAL_SCRIPTS
 from evennia.commands.default.help import CmdHelp
 from evennia.utils.utils import crop, list_to_string, wrap
 
-from evennia.contrib.dice import roll_dice
+from world.dice import dice
 
 from world.globals import DAM_TYPES, DEFAULT_MOB_STRUCT, MAX_LEVEL, MIN_LEVEL, Positions, Size
 from world.edit.model import _EditMode
 from typeclasses.mobs.mob import VALID_MOB_APPLIES, VALID_MOB_FLAGS
 from world.utils.utils import mxp_string
+from world import vitals
 
 _MEDIT_PROMPT = "(|ymedit|n)"
 
@@ -164,10 +165,8 @@ class AutoLevel(Command):
                 return
             level = args
 
-        dice = np.vectorize(lambda x: x + roll_dice(2, 5))
-        base_stats = np.full((8, ), fill_value=self._base_stat, dtype=np.int64)
-
-        base_stats = dice(base_stats)
+        # numpy is only imported by the batch roll, not at startup
+        base_stats = dice("2d5").roll_batch(8) + self._base_stat
 
         members = MobDifficulty.members(return_dict=True)
         seed = {
@@ -455,7 +454,7 @@ class AutoMobScaling:
 
     @property
     def base(self):
-        return (self.base_mult * np.log2(self.olvl)) * self.olvl
+        return vitals.base_vital(self.olvl, self.base_mult)
 
     @property
     def diff_mod(self):
@@ -476,16 +475,16 @@ class AutoMobScaling:
         return rightMin + (valueScaled * rightSpan)
 
     def calc_hp(self):
-        val = int((self.base * np.log(self.end)) * self.diff_mod)
+        val = int((self.base * math.log(self.end)) * self.diff_mod)
         return max(val, 3)
 
     def calc_mp(self):
-        val = int((self.base * np.log(
+        val = int((self.base * math.log(
             (self.int + self.wp) / 2)) * self.diff_mod)
         return max(val, 3)
 
     def calc_sp(self):
-        val = int((self.base * np.log(
+        val = int((self.base * math.log(
             (self.end + self.agi) / 2)) * self.diff_mod)
         return max(val, 3)
 
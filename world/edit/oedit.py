@@ -10,7 +10,9 @@ from commands.command import Command
 from evennia.commands.default.help import CmdHelp
 from .model import _EditMode
 
+from world.dice import dice, valid_dice
 from world.globals import DEFAULT_OBJ_STRUCT
+from world.library import update_book
 _OEDIT_PROMPT = "(|goedit|n) > "
 
 
@@ -59,7 +61,16 @@ class OEditMode(_EditMode):
                     limit = self.obj['extra']['limit']
                     self.obj['extra']['limit'] = int(limit)
 
+                if self.obj['type'] in ('weapon', 'staff'):
+                    dam_roll = self.obj['extra']['dam_roll']
+                    error = valid_dice(dam_roll)
+                    if error:
+                        self.caller.msg(f"dam_roll is not valid: {error}")
+                        return
+                    self.obj['extra']['dam_roll'] = str(dice(dam_roll))
+
             self.db.vnum[self.vnum] = self.obj
+            update_book(self.vnum, self.obj)
             self.caller.msg("object saved.")
 
     def summarize(self):
@@ -0,0 +1,106 @@
+"""
+Parsed EvForm templates.
+
+Building an EvForm reads its module and scans the template for the
+cell/table rectangles, and does both again on every `map`. Forms shown
+all the time (score, books, chargen) always have the same layout, so
+each template is parsed once here, as an empty EvForm, and `new_form`
+hands out EvForms that fill the rectangles of the template instead of
+parsing the module again.
+
+    form = new_form("resources.score_form", cells={1: name})
+    form.map(tables={"A": table})
+    ch.msg(str(form))
+"""
+import time
+
+from evennia import EvForm, EvTable
+from evennia.utils.evtable import EvCell
+
+# same options EvForm gives its cells and tables by default
+_OPTIONS = {
+    "pad_left": 0,
+    "pad_right": 0,
+    "pad_top": 0,
+    "pad_bottom": 0,
+    "align": "l",
+    "valign": "t",
+    "enforce_size": True,
+}
+
+_TEMPLATES = {}
+
+
+class FormTemplate(EvForm):
+    """ the empty EvForm of a form module, parsed once """
+
+
+class Form(EvForm):
+    """
+    an EvForm filled from the rectangles of a FormTemplate, mapping it
+    doesn't read and parse the module again
+    """
+    def __init__(self, template, cells=None, tables=None, **kwargs):
+        self.template = template
+        super().__init__(cells=cells, tables=tables, **kwargs)
+
+    def reload(self, filename=None, form=None, **kwargs):
+        if filename or form:
+            raise ValueError("the layout of a Form is its template's")
+        self.options.update(kwargs)
+        # options given to the form apply to its cells/tables, as in EvForm
+        options = dict(_OPTIONS, **self.options)
+        self.raw_form = self.template.raw_form
+        self.mapping = {}
+        for key, (y, x, width, height, blank) in self.template.mapping.items():
+            rect = blank
+            if isinstance(blank, EvTable):
+                if key in self.tables_mapping:
+                    rect = self.tables_mapping[key]
+                    rect.reformat(width=width, height=height, **options)
+            elif key in self.cells_mapping:
+                rect = EvCell(self.cells_mapping[key], width=width,
+                              height=height, **options)
+            self.mapping[key] = (y, x, width, height, rect)
+        self.form = self._populate_form(self.raw_form, self.mapping)
+
+
+def get_template(path):
+    """ returns the parsed template of form module path """
+    template = _TEMPLATES.get(path)
+    if template is None:
+        template = _TEMPLATES[path] = FormTemplate(path)
+    return template
+
+
+def new_form(path, cells=None, tables=None):
+    """ a fresh form of the template at path """
+    return Form(get_template(path), cells=cells, tables=tables)
+
+
+def reload_templates():
+    """ forgets every parsed template, they are parsed again on next use """
+    _TEMPLATES.clear()
+
+
+def benchmark(path, cells=None, tables=None, number=100):
+    """
+    times filling and rendering the form at path, both as a new EvForm
+    and from its parsed template. returns the average ms per form.
+    """
+    def evform():
+        form = EvForm(path)
+        form.map(cells=cells or {}, tables=tables or {})
+        return str(form)
+
+    def template():
+        return str(new_form(path, cells=cells, tables=tables))
+
+    results = {}
+    for name, func in (('evform', evform), ('template', template)):
+        func()  # warm up, the template gets parsed here
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        results[name] = (time.perf_counter() - start) * 1000 / number
+    return results
@@ -13,6 +13,9 @@ HERO_LVL = 201
 START_LOCATION_VNUM = 2
 TICK_SAVE_CHAR = 60  #seconds
 TICK_HEAL_CHAR = 10  #
+PULSE_MOBILE = 4  # seconds between mob ai pulses
+PULSE_VIOLENCE = 3  # seconds between combat rounds
+PULSE_TIMERS = 1  # seconds between checks for due condition timers
 DEFAULT_MOB_STRUCT = {
     "key": "mob unfinished",
     "sdesc": "the unfinished mob",
@@ -88,9 +91,12 @@ DEFAULT_ZONE_STRUCT = {
     'reset_msg': "zone has reset"
 }
 
+# attachedto: `<mob|obj|room> <vnum>`
+# event: one of world.mobprog.dispatch.EVENTS
 DEFAULT_TRIG_STRUCT = {
     'name': 'unfinished trigger',
     'attachedto': '',
+    'event': '',
     'prog': ''
 }
 
@@ -0,0 +1,151 @@
+"""
+Catalogue of the books in the object database.
+
+Books are looked up by category, author, language and title through
+plain dict indexes, and by the words of their contents through an
+inverted index (word -> {vnum: occurrences}). The catalogue is built
+from objdb the first time it is needed, kept up to date by oedit when a
+blueprint is saved and rebuilt after objdb is reloaded.
+
+    catalogue().search("dragon break")   # [(vnum, score), ...]
+    catalogue().random(category='fiction')
+"""
+import math
+import random
+import re
+
+from evennia import GLOBAL_SCRIPTS
+from evennia.utils.dbserialize import deserialize
+
+_WORDS = re.compile(r"[a-z0-9']+")
+
+# words of the title and author count as much as this many in contents
+TITLE_WEIGHT = 5
+
+_CATALOGUE = None
+
+
+def words(text):
+    """ lowercased words of text """
+    return _WORDS.findall(str(text).lower())
+
+
+def _word_counts(extra):
+    counts = {}
+    for word in words(extra.get('contents', '')):
+        counts[word] = counts.get(word, 0) + 1
+    for field in ('title', 'author'):
+        for word in words(extra.get(field, '')):
+            counts[word] = counts.get(word, 0) + TITLE_WEIGHT
+    return counts
+
+
+class BookCatalogue:
+    def __init__(self):
+        self.books = {}  # vnum: extra of the blueprint
+        self.vnums = []
+        self.by_category = {}
+        self.by_author = {}
+        self.by_language = {}
+        self.by_title = {}
+        self.postings = {}  # word: {vnum: occurrences}
+        self.lengths = {}  # vnum: amount of indexed words
+
+    def __len__(self):
+        return len(self.books)
+
+    def _indexes(self, extra):
+        return ((self.by_category, extra.get('category', '')),
+                (self.by_author, extra.get('author', '')),
+                (self.by_language, extra.get('language', '')),
+                (self.by_title, extra.get('title', '')))
+
+    def add(self, vnum, blueprint):
+        """ indexes blueprint, replacing what was indexed for vnum """
+        self.remove(vnum)
+        if blueprint.get('type') != 'book':
+            return
+        extra = dict(blueprint.get('extra') or {})
+        self.books[vnum] = extra
+        self.vnums.append(vnum)
+        for index, value in self._indexes(extra):
+            index.setdefault(str(value).lower(), []).append(vnum)
+
+        counts = _word_counts(extra)
+        for word, count in counts.items():
+            self.postings.setdefault(word, {})[vnum] = count
+        self.lengths[vnum] = sum(counts.values())
+
+    def remove(self, vnum):
+        extra = self.books.pop(vnum, None)
+        if extra is None:
+            return
+        self.vnums.remove(vnum)
+        for index, value in self._indexes(extra):
+            value = str(value).lower()
+            vnums = index.get(value, [])
+            if vnum in vnums:
+                vnums.remove(vnum)
+            if not vnums:
+                index.pop(value, None)
+
+        for word in _word_counts(extra):
+            postings = self.postings[word]
+            del postings[vnum]
+            if not postings:
+                del self.postings[word]
+        del self.lengths[vnum]
+
+    def search(self, query, limit=10):
+        """
+        ranks books by the words of query (tf-idf), books matching
+        more of the words come first. returns [(vnum, score), ...]
+        """
+        scores = {}
+        matched = {}
+        for word in set(words(query)):
+            postings = self.postings.get(word)
+            if not postings:
+                continue
+            idf = math.log(1 + len(self.books) / len(postings))
+            for vnum, count in postings.items():
+                tf = count / self.lengths[vnum]
+                scores[vnum] = scores.get(vnum, 0) + tf * idf
+                matched[vnum] = matched.get(vnum, 0) + 1
+
+        ranked = sorted(scores,
+                        key=lambda x: (matched[x], scores[x]),
+                        reverse=True)
+        return [(vnum, scores[vnum]) for vnum in ranked[:limit]]
+
+    def random(self, category=None):
+        """ vnum of a random book, of category if given, None if none """
+        if category is None:
+            vnums = self.vnums
+        else:
+            vnums = self.by_category.get(category.lower())
+        if not vnums:
+            return None
+        return random.choice(vnums)
+
+
+def catalogue():
+    """ returns the catalogue, built from objdb on first use """
+    global _CATALOGUE
+    if _CATALOGUE is None:
+        _CATALOGUE = BookCatalogue()
+        for vnum, blueprint in deserialize(GLOBAL_SCRIPTS.objdb.vnum).items():
+            _CATALOGUE.add(vnum, blueprint)
+    return _CATALOGUE
+
+
+def reload():
+    """ forgets the catalogue, it is rebuilt from objdb on next use """
+    global _CATALOGUE
+    _CATALOGUE = None
+
+
+def update_book(vnum, blueprint):
+    """ call when the blueprint of vnum is saved """
+    if _CATALOGUE is not None:
+        _CATALOGUE.add(vnum, blueprint)
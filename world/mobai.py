@@ -0,0 +1,194 @@
+"""
+Behaviour of mobs, driven by their flags (see VALID_MOB_FLAGS).
+
+Rather than a ticker per mob, mobs with something to do are kept in a
+timing wheel: a ring of slots, one per pulse. Every PULSE_MOBILE seconds
+the current slot is processed, at most MAX_MOBS_PER_PULSE mobs of it
+(the rest wait for the next pulse), and each mob is put back a random
+number of slots ahead. Mobs whose zone has no player online are put
+back without doing anything.
+
+    sentinel   never wanders
+    stay_zone  only wanders to rooms of its own zone
+    scavenger  picks up the most valuable object lying around
+    aggr       attacks a player in its room
+"""
+import random
+import time
+
+from evennia import SESSION_HANDLER, TICKER_HANDLER, logger
+
+from typeclasses.rooms.rooms import get_room
+from world.combat import COMBAT
+from world.globals import PULSE_MOBILE, Positions
+from world.utils.act import Announce, act
+from world.utils.utils import can_pickup, can_see_obj, is_obj, is_pc, is_wiz
+
+AI_FLAGS = {'scavenger', 'aggr'}
+WHEEL_SLOTS = 8
+MAX_MOBS_PER_PULSE = 200
+
+# how long the last pulse took and what it did
+LAST_PULSE = {'ms': 0.0, 'acted': 0, 'skipped': 0, 'deferred': 0}
+
+
+def player_zones():
+    """ zones with at least one player in them """
+    zones = set()
+    for session in SESSION_HANDLER.get_sessions():
+        puppet = session.puppet
+        if puppet is not None and puppet.location is not None:
+            zones.add(puppet.location.db.zone)
+    return zones
+
+
+def wanders(mob):
+    return 'sentinel' not in (mob.db.flags or [])
+
+
+def is_active(mob):
+    """ mobs that have anything to do on a pulse """
+    flags = set(mob.db.flags or [])
+    return wanders(mob) or bool(flags & AI_FLAGS)
+
+
+def start_fight(mob, victim):
+    """ mob goes after victim """
+    act("$n snarls and attacks you!", True, False, mob, None, victim,
+        Announce.ToVict)
+    act("$n attacks $N!", True, False, mob, None, victim,
+        Announce.ToNotVict)
+    COMBAT.engage(mob, victim)
+
+
+def aggro(mob):
+    victims = [
+        x for x in mob.location.contents
+        if is_pc(x) and not is_wiz(x) and can_see_obj(mob, x)
+    ]
+    if not victims:
+        return False
+    start_fight(mob, random.choice(victims))
+    return True
+
+
+def scavenge(mob):
+    objs = [
+        x for x in mob.location.contents
+        if is_obj(x) and can_see_obj(mob, x) and can_pickup(mob, x)
+    ]
+    if not objs:
+        return False
+    obj = max(objs, key=lambda x: x.db.cost or 0)
+    act("$n gets $p.", True, True, mob, obj, None, Announce.ToRoom)
+    obj.move_to(mob, quiet=True)
+    return True
+
+
+def wander(mob):
+    exits = [(d, v) for d, v in mob.location.db.exits.items() if v >= 0]
+    if not exits:
+        return False
+    direction, vnum = random.choice(exits)
+    room = get_room(vnum)
+    if room is None:
+        return False
+    if 'stay_zone' in (mob.db.flags or []) and room.db.zone != mob.db.zone:
+        return False
+    act(f"$n leaves {direction}.", True, True, mob, None, None,
+        Announce.ToRoom)
+    mob.move_to(room, quiet=True)
+    act("$n has arrived.", True, True, mob, None, None, Announce.ToRoom)
+    return True
+
+
+def think(mob):
+    """ one pulse worth of behaviour, returns True if mob did something """
+    if COMBAT.fighting(mob) or mob.db.position != Positions.Standing:
+        return False
+    flags = mob.db.flags or []
+    if 'aggr' in flags and aggro(mob):
+        return True
+    if 'scavenger' in flags and random.randint(0, 7) == 0 and scavenge(mob):
+        return True
+    if wanders(mob) and random.randint(0, 3) == 0:
+        return wander(mob)
+    return False
+
+
+class MobAI:
+    def __init__(self, slots=WHEEL_SLOTS):
+        self.wheel = [[] for _ in range(slots)]
+        self.pos = 0
+        self.mobs = {}  # mob id: slot it waits in
+
+    def __len__(self):
+        return len(self.mobs)
+
+    def add(self, mob, delay=None):
+        """ schedules mob delay pulses from now (random if None) """
+        if mob.id in self.mobs:
+            return
+        if delay is None:
+            delay = random.randint(1, len(self.wheel) - 1)
+        slot = (self.pos + delay) % len(self.wheel)
+        self.wheel[slot].append(mob)
+        self.mobs[mob.id] = slot
+
+    def remove(self, mob):
+        # dropped from its slot when the slot comes up
+        self.mobs.pop(mob.id, None)
+
+    def start(self):
+        TICKER_HANDLER.add(interval=PULSE_MOBILE,
+                           callback=mobai_pulse,
+                           idstring="mobai",
+                           persistent=False)
+
+    def pulse(self):
+        start = time.perf_counter()
+        current = self.pos
+        # entries left behind by removed (or rescheduled) mobs are dropped,
+        # and so are copies of mobs removed and added back to this slot
+        slot, seen = [], set()
+        for mob in self.wheel[current]:
+            if self.mobs.get(mob.id) == current and mob.id not in seen:
+                seen.add(mob.id)
+                slot.append(mob)
+        batch = slot[:MAX_MOBS_PER_PULSE]
+        deferred = slot[MAX_MOBS_PER_PULSE:]
+        self.wheel[current] = []
+        self.pos = (current + 1) % len(self.wheel)
+
+        zones = player_zones()
+        acted = skipped = 0
+        for mob in batch:
+            self.mobs.pop(mob.id, None)
+            if not mob.pk:
+                continue  # deleted
+            if mob.location is None or mob.location.db.zone not in zones:
+                skipped += 1
+            else:
+                try:
+                    acted += think(mob)
+                except Exception:
+                    logger.log_trace(f"mob ai failed for {mob.key}")
+            self.add(mob)
+
+        # too many for one pulse, they go first next pulse
+        self.wheel[self.pos][:0] = deferred
+        for mob in deferred:
+            self.mobs[mob.id] = self.pos
+
+        LAST_PULSE.update(ms=(time.perf_counter() - start) * 1000,
+                          acted=acted,
+                          skipped=skipped,
+                          deferred=len(deferred))
+
+
+MOBAI = MobAI()
+
+
+def mobai_pulse():
+    # called by the global ticker handler
+    MOBAI.pulse()
@@ -0,0 +1,170 @@
+"""
+Dispatch of game events to the triggers listening for them.
+
+Triggers (see DEFAULT_TRIG_STRUCT) name the event they listen to and
+the blueprint they are attached to, as `<mob|obj|room> <vnum>`. They are
+indexed by (event, kind, vnum) once, and every room keeps the list of
+(entity, trigger) pairs of itself and its contents per event, cleared
+by the room when something enters or leaves it. Firing an event in a
+room then only walks the triggers listening for it there.
+
+Events:
+    say     someone speaks in the room (speech is in the namespace)
+    enter   a character enters the room
+    greet   a player enters the room of the mob
+    give    an object is given to the mob (obj is in the namespace)
+    death   the mob dies
+
+Progs can fire events themselves, nesting stops at MAX_CALL_LEVEL.
+"""
+import time
+from collections import Counter
+
+from evennia import GLOBAL_SCRIPTS, logger
+from evennia.utils.dbserialize import deserialize
+
+from world.mobprog.parser import MobProgParser
+from world.mobprog.sandbox import BudgetExceeded
+from world.utils.utils import is_npc, is_obj, is_room
+
+EVENTS = ('say', 'enter', 'greet', 'give', 'death')
+
+# how deep progs may fire each other (ex: two mobs answering each other's
+# say), like MAX_CALL_LEVEL of ROM
+MAX_CALL_LEVEL = 5
+_DEPTH = 0
+
+# trigger vnum: times it fired
+FIRES = Counter()
+# trigger vnum: cpu seconds spent running it
+CPU_TIME = Counter()
+# trigger vnum: times it was stopped for running too long
+KILLS = Counter()
+
+_INDEX = None
+
+
+def _kind(entity):
+    if is_npc(entity):
+        return 'mob'
+    if is_obj(entity):
+        return 'obj'
+    if is_room(entity):
+        return 'room'
+    return None
+
+
+class TriggerIndex:
+    def __init__(self):
+        self.triggers = {}  # trigger vnum: trigger
+        self.listeners = {}  # (event, kind, vnum): [trigger vnum, ...]
+        # bumped on every change, rooms rebuild their listeners on it
+        self.version = 0
+
+    def add(self, vnum, trig):
+        """ indexes trig, replacing what was indexed for vnum """
+        self.remove(vnum)
+        event = trig.get('event', '')
+        try:
+            kind, attached = trig.get('attachedto', '').split()
+            key = (event, kind, int(attached))
+        except ValueError:
+            return  # not attached to anything (yet)
+        if event not in EVENTS:
+            return
+        self.triggers[vnum] = (key, trig['prog'])
+        self.listeners.setdefault(key, []).append(vnum)
+        self.version += 1
+
+    def remove(self, vnum):
+        indexed = self.triggers.pop(vnum, None)
+        if indexed is None:
+            return
+        key, _ = indexed
+        self.listeners[key].remove(vnum)
+        if not self.listeners[key]:
+            del self.listeners[key]
+        self.version += 1
+
+    def of(self, event, entity):
+        """ vnums of the triggers for event attached to entity """
+        kind = _kind(entity)
+        if kind is None:
+            return ()
+        try:
+            return self.listeners.get((event, kind, int(entity.key)), ())
+        except ValueError:
+            return ()
+
+
+def index():
+    """ returns the trigger index, built from trigdb on first use """
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = TriggerIndex()
+        for vnum, trig in deserialize(GLOBAL_SCRIPTS.trigdb.vnum).items():
+            _INDEX.add(vnum, trig)
+    return _INDEX
+
+
+def reload_index():
+    """ forgets the index, it is rebuilt from trigdb on next use """
+    global _INDEX
+    _INDEX = None
+
+
+def room_listeners(room):
+    """ {event: [(entity, trigger vnum), ...]} of room and its contents """
+    idx = index()
+    cached = room.ndb.trig_listeners
+    # moves clear the cache (see Room.at_object_receive), the length only
+    # catches objects created or deleted in place, which don't call them
+    if cached is not None and cached[0] == (idx.version, len(
+            room.contents)):
+        return cached[1]
+
+    listeners = {}
+    for entity in [room] + list(room.contents):
+        for event in EVENTS:
+            for vnum in idx.of(event, entity):
+                listeners.setdefault(event, []).append((entity, vnum))
+    room.ndb.trig_listeners = ((idx.version, len(room.contents)), listeners)
+    return listeners
+
+
+def run(vnum, entity, ch, **kwargs):
+    """ runs trigger vnum attached to entity, triggered by ch """
+    global _DEPTH
+    if _DEPTH >= MAX_CALL_LEVEL:
+        logger.log_err(f"trigger {vnum} on {entity.key} not run: progs "
+                       f"nested more than {MAX_CALL_LEVEL} deep")
+        return
+    FIRES[vnum] += 1
+    _, prog = index().triggers[vnum]
+    start = time.process_time()
+    _DEPTH += 1
+    try:
+        MobProgParser(entity, ch).execute(prog, **kwargs)
+    except BudgetExceeded as err:
+        KILLS[vnum] += 1
+        logger.log_err(f"trigger {vnum} on {entity.key} stopped: {err}")
+    except Exception:
+        logger.log_trace(f"trigger {vnum} on {entity.key} failed")
+    finally:
+        _DEPTH -= 1
+        CPU_TIME[vnum] += time.process_time() - start
+
+
+def fire(event, room, ch, **kwargs):
+    """ fires event in room for every listener but ch itself """
+    if room is None:
+        return
+    for entity, vnum in room_listeners(room).get(event, ()):
+        if entity is not ch:
+            run(vnum, entity, ch, **kwargs)
+
+
+def fire_at(event, entity, ch, **kwargs):
+    """ fires event on the triggers of entity only """
+    for vnum in index().of(event, entity):
+        run(vnum, entity, ch, **kwargs)
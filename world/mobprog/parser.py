@@ -1,5 +1,60 @@
-from yapf.yapflib.yapf_api import FormatCode
-from evennia import search_object
+"""
+Mobprogs are compiled once into code objects, cached by a hash of their
+source, and executed with the objects involved put straight into the
+namespace.
+"""
+import hashlib
+
+from world.mobprog import utils as _utils
+from world.mobprog.sandbox import PROG_FILENAME, run_code
+
+# sha1 of the prog source: compiled code object
+_CODE = {}
+_GLOBALS = None
+
+
+def _token_replace(data):
+    return data.replace("$n", 'ch').replace("$i", "vict")
+
+
+def prog_hash(data):
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def compile_prog(data):
+    """
+    returns the code object of trigger source data, compiled
+    the first time it is seen. raises SyntaxError on invalid scripts.
+    """
+    key = prog_hash(data)
+    code = _CODE.get(key)
+    if code is None:
+        code = compile(_token_replace(data), f"{PROG_FILENAME} {key[:8]}>",
+                       'exec')
+        _CODE[key] = code
+    return code
+
+
+def compile_trigdb(trigdb):
+    """
+    compiles every trigger of trigdb (vnum: trigger), returns a dict of
+    vnum: error message for those that failed to compile.
+    """
+    errors = {}
+    for vnum, trig in trigdb.items():
+        try:
+            compile_prog(trig['prog'])
+        except SyntaxError as err:
+            errors[vnum] = f"line {err.lineno}: {err.msg}"
+    return errors
+
+
+def prog_globals():
+    """ what every mobprog can use, see world.mobprog.utils """
+    global _GLOBALS
+    if _GLOBALS is None:
+        _GLOBALS = {name: getattr(_utils, name) for name in _utils.__all__}
+    return dict(_GLOBALS)
 
 
 class MobProgParser:
@@ -56,22 +111,21 @@ class MobProgParser:
         self.attached_obj = attached_obj
         self.triggerer_obj = triggerer_obj
 
-        self.header = """
-from evennia import search_object
-from world.mobprog.utils import *
+    def parse(self, data):
+        """ returns the (cached) code object of script data """
+        return compile_prog(data)
 
-ch = search_object("{ch}", use_dbref=True, exact=True)[0]
-self = search_object("{vict}", use_dbref=True, exact=True)[0]
-""".format(ch=triggerer_obj.dbref, vict=attached_obj.dbref)
+    def namespace(self, **kwargs):
+        namespace = prog_globals()
+        namespace.update(kwargs)
+        namespace['ch'] = self.triggerer_obj
+        namespace['self'] = namespace['vict'] = self.attached_obj
+        return namespace
 
-    def parse(self, data):
+    def execute(self, data, **kwargs):
         """
-        returns a valid python script 
-        that if executed via `exec` it will perform what it needs to do
+        runs script data with the objects of this parser, kwargs are
+        extra names available to the script. raises BudgetExceeded
+        if the script runs too long, see world.mobprog.sandbox
         """
-        data = self._token_replace(data)
-        return FormatCode(self.header + data)[0]
-
-    def _token_replace(self, data):
-        data = data.replace("$n", 'ch').replace("$i", "vict")
-        return data
+        return run_code(self.parse(data), self.namespace(**kwargs))
@@ -0,0 +1,82 @@
+"""
+Restricted execution of mobprogs.
+
+Progs run on the reactor thread, so a runaway loop would freeze the
+server. `run_code` traces the lines executed by the prog itself (not the
+game code it calls) and raises BudgetExceeded inside it once it has run
+too many lines or for too long. Builtins looping in C (sum, sorted,
+list...) run no lines, so the ranges progs make are capped at MAX_LINES
+items instead. Progs only get a small set of builtins and the functions
+listed in world.mobprog.utils.__all__.
+
+This keeps honest mistakes from hanging the game, it is not a security
+boundary: progs are written by builders.
+"""
+import builtins
+import sys
+import time
+
+# lines of prog code one invocation may run
+MAX_LINES = 100_000
+# wall time one invocation may take, in seconds
+MAX_SECONDS = 0.1
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def _range(*args):
+    rng = range(*args)
+    # len() overflows on huge ranges, a slice doesn't
+    if rng[MAX_LINES:]:
+        raise BudgetExceeded(f"range of more than {MAX_LINES} items")
+    return rng
+
+
+_SAFE_BUILTINS = {
+    name: getattr(builtins, name)
+    for name in ('abs', 'all', 'any', 'bool', 'dict', 'enumerate', 'filter',
+                 'float', 'int', 'isinstance', 'len', 'list', 'map', 'max',
+                 'min', 'reversed', 'round', 'set', 'sorted', 'str', 'sum',
+                 'tuple', 'zip')
+}
+_SAFE_BUILTINS['range'] = _range
+
+# progs are compiled with a filename starting with this, see parser
+PROG_FILENAME = "<mobprog"
+
+
+def run_code(code, namespace, max_lines=MAX_LINES, max_seconds=MAX_SECONDS):
+    """
+    executes code in namespace with restricted builtins, raises
+    BudgetExceeded if it runs out of lines or time. returns the amount
+    of lines run.
+    """
+    deadline = time.perf_counter() + max_seconds
+    lines = 0
+
+    def trace_line(frame, event, arg):
+        nonlocal lines
+        if event == 'line':
+            lines += 1
+            if lines > max_lines:
+                raise BudgetExceeded(f"ran more than {max_lines} lines")
+            if time.perf_counter() > deadline:
+                raise BudgetExceeded(f"ran longer than {max_seconds}s")
+        return trace_line
+
+    def trace_call(frame, event, arg):
+        # only the prog's own frames, game code is trusted
+        if frame.f_code.co_filename.startswith(PROG_FILENAME):
+            return trace_line
+        return None
+
+    namespace['__builtins__'] = _SAFE_BUILTINS
+    previous = sys.gettrace()
+    sys.settrace(trace_call)
+    try:
+        exec(code, namespace)
+    finally:
+        sys.settrace(previous)
+    return lines
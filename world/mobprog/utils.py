@@ -4,6 +4,9 @@ mobprog valid functions
 import random
 from world.utils.utils import is_npc, is_pc
 
+# the only names mobprogs get from this module
+__all__ = ['ispc', 'isnpc', 'level', 'is_immort', 'rand']
+
 
 def ispc(obj):
     return is_pc(obj)
@@ -1,13 +1,133 @@
 """
 custom paginators
 """
-from world.utils.utils import clear_terminal
+import math
+from collections import OrderedDict
+
+from world.utils.utils import capitalize_sentence, clear_terminal
+from world.utils.translate import translate
 from evennia.utils import justify
-from evennia import EvForm
+from world.forms import new_form
 from evennia.utils.evmore import EvMore
 
+BOOK_WIDTH = 23
+BOOK_PAGE_HEIGHT = 15
+# book layouts kept around, per (vnum, language, rank)
+MAX_BOOK_LAYOUTS = 128
+
+_BOOK_LAYOUTS = OrderedDict()
+
+
+def _justify_line(line):
+    if len(line) > BOOK_WIDTH:
+        return justify(line, width=BOOK_WIDTH, align="l",
+                       indent=0).split("\n")
+    return [line]
+
+
+class BookLayout:
+    """
+    Pages of a book, laid out as they are asked for. Lines of the body
+    are translated (when translator is set) and justified one source
+    line at a time, only as far as the pages requested.
+    """
+    def __init__(self, header, body, translator=None):
+        self.translator = translator
+        self.lines = []
+        self.pages = []
+        self.done = False
+        for line in header.split("\n"):
+            self.lines.extend(_justify_line(line))
+        body = body.split("\n")
+        self._body = iter(body)
+
+        # every source line takes at least this many lines once justified
+        min_lines = len(self.lines) + sum(
+            max(1, math.ceil(len(x) / BOOK_WIDTH)) for x in body)
+        self.estimate = math.ceil(min_lines / BOOK_PAGE_HEIGHT)
+
+    @property
+    def npages(self):
+        """ exact once done, best guess until then """
+        if self.done:
+            return len(self.pages)
+        return max(self.estimate, len(self.pages) + 1)
+
+    def _next_page(self):
+        while len(self.lines) < BOOK_PAGE_HEIGHT:
+            line = next(self._body, None)
+            if line is None:
+                self.done = True
+                break
+            if self.translator is not None and line:
+                line = self.translator(line)
+            self.lines.extend(_justify_line(line))
+
+        if self.lines:
+            self.pages.append("\n".join(self.lines[:BOOK_PAGE_HEIGHT]))
+            self.lines = self.lines[BOOK_PAGE_HEIGHT:]
+
+    def ensure(self, pageno):
+        """ lays out pages up to and including pageno """
+        while len(self.pages) <= pageno and not self.done:
+            self._next_page()
+
+    def page(self, pageno):
+        self.ensure(pageno)
+        if pageno < len(self.pages):
+            return self.pages[pageno]
+        return ""
+
+
+def book_layout(book, language=None, level=None):
+    """
+    returns the (cached) layout of book as read by someone
+    of skill level in language, no language means untranslated.
+    """
+    contents = book.db.contents or ""
+    key = (book.key, language, level, hash(contents))
+    layout = _BOOK_LAYOUTS.get(key)
+    if layout is not None:
+        _BOOK_LAYOUTS.move_to_end(key)
+        return layout
+
+    header = f"\n|gTitle|w: {book.db.title}\n|gAuthor|w: {book.db.author}\n|gDate|w: {book.db.date}\n\n|n"
+    translator = None
+    if language is not None:
+        translator = lambda line: capitalize_sentence(
+            translate(line, language, level))
+    layout = BookLayout(header, contents, translator)
+    _BOOK_LAYOUTS[key] = layout
+    if len(_BOOK_LAYOUTS) > MAX_BOOK_LAYOUTS:
+        _BOOK_LAYOUTS.popitem(last=False)
+    return layout
+
 
 class BookEvMore(EvMore):
+    def init_pages(self, inp):
+        if not isinstance(inp, BookLayout):
+            super().init_pages(inp)
+            return
+        self._layout = inp
+        self._paginator = self.paginator_layout
+        # the first spread plus one page of read-ahead
+        inp.ensure(2)
+        self._npages = inp.npages
+
+    def paginator_layout(self, pageno):
+        self._layout.ensure(pageno + 1)
+        self._npages = self._layout.npages
+        return self._layout.page(pageno)
+
+    def page_end(self):
+        layout = getattr(self, '_layout', None)
+        if layout is not None:
+            # the last page is only known once everything is laid out
+            while not layout.done:
+                layout.ensure(len(layout.pages))
+            self._npages = layout.npages
+        super().page_end()
+
     def init_str(self, text):
         # """The input is a string"""
 
@@ -89,6 +209,4 @@ class BookEvMore(EvMore):
         lpage = page[0] if page[0] else ""
         rpage = page[1] if page[1] else ""
 
-        form = EvForm("resources.forms.book")
-        form.map(cells={1: lpage, 2: rpage})
-        return str(form)
\ No newline at end of file
+        return str(new_form("resources.forms.book", cells={1: lpage, 2: rpage}))
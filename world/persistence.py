@@ -0,0 +1,208 @@
+"""
+Save cycle and write-behind queue for the StorageHandlers (attrs, stats,
+skills, ...).
+
+Handlers don't write on every change, they are flagged dirty instead.
+Every TICK_SAVE_CHAR seconds one save cycle packs the dirty handlers of
+every object and queues them. Finding the changes made in place without
+mark_dirty (ex: attrs.health.cur -= 1) means packing every loaded handler
+again, idle ones included, so a cycle only does it every IN_PLACE_CYCLES
+cycles. Such changes are saved up to that many cycles late, and right
+away by save_character and at server stop. The queue is written to the database in
+batches, one transaction per batch, from a worker thread so a slow disk
+doesn't stall the reactor. The Attributes and their cache are only
+touched on the reactor, the worker thread gets the rows to update as
+plain pickled values.
+
+Writes queued for the same Attribute are coalesced (the latest value
+wins) and only one batch is in flight at a time, so writes for an object
+always land in the order they were made. Handlers saved directly (see
+StorageHandler.save) call `written_directly` to stay in that order.
+Whatever is still queued is written synchronously by `drain` when the
+server stops, after the batch in flight.
+"""
+import threading
+
+from django.db import transaction
+from evennia import TICKER_HANDLER, logger
+from evennia.typeclasses.attributes import Attribute
+from evennia.utils.dbserialize import to_pickle
+from twisted.internet import threads
+
+from world.globals import TICK_SAVE_CHAR
+from world.storagehandler import loaded_handlers
+from world.utils.serialize import stored_size
+
+# stats of the last batch written
+LAST_CYCLE = {'rows': 0, 'bytes': 0}
+
+# every how many save cycles clean handlers are checked for changes made
+# in place
+IN_PLACE_CYCLES = 5
+_CYCLES = 0
+
+# (obj id, attribute key) -> (obj, attribute key, value)
+_PENDING = {}
+# (obj, attribute key, value, attribute pk, pickled value) being written
+_IN_FLIGHT = []
+# held while a batch is written, drain waits on it
+_LOCK = threading.Lock()
+_DRAINED = False
+
+
+def queue_write(obj, key, value):
+    """ queues value to be written to the Attribute `key` of obj """
+    qkey = (obj.id, key)
+    # re-inserting moves the write to the back of the queue
+    _PENDING.pop(qkey, None)
+    _PENDING[qkey] = (obj, key, value)
+
+
+def written_directly(obj, key, value):
+    """
+    call after writing value to the Attribute `key` of obj without the
+    queue. an older queued write is dropped, and one already in flight
+    is followed by value again so it can't land last.
+    """
+    _PENDING.pop((obj.id, key), None)
+    for row in _IN_FLIGHT:
+        if row[0].id == obj.id and row[1] == key:
+            queue_write(obj, key, value)
+            break
+
+
+def queue_depth():
+    """ amount of Attribute writes waiting to hit the database """
+    return len(_PENDING) + len(_IN_FLIGHT)
+
+
+def queued_value(obj, key):
+    """ the latest value queued for the Attribute `key` of obj, or None """
+    queued = _PENDING.get((obj.id, key))
+    if queued is not None:
+        return queued[2]
+    for row in reversed(_IN_FLIGHT):
+        if row[0].id == obj.id and row[1] == key:
+            return row[2]
+    return None
+
+
+def _prepare(batch):
+    """
+    runs on the reactor, returns the rows to update for batch. Attributes
+    that don't exist yet are created here, the cached ones are given
+    their new value so they don't hand out the old one.
+    """
+    rows = []
+    for obj, key, value in batch:
+        if obj.pk is None:
+            # deleted while queued
+            continue
+        attr = obj.attributes.get(key, return_obj=True)
+        if attr is None:
+            obj.attributes.add(key, value)
+            continue
+        pickled = to_pickle(value)
+        attr.db_value = pickled
+        rows.append((obj, key, value, attr.pk, pickled))
+    return rows
+
+
+def _update(rows):
+    rows_written, size = 0, 0
+    with transaction.atomic():
+        for _, _, value, pk, pickled in rows:
+            Attribute.objects.filter(pk=pk).update(db_value=pickled)
+            rows_written += 1
+            size += stored_size(value)
+    return rows_written, size
+
+
+def _write_batch(rows):
+    # runs in a worker thread, nothing but plain values and raw updates
+    with _LOCK:
+        if _DRAINED:
+            return 0, 0  # written by drain already
+        return _update(rows)
+
+
+def _batch_done(result):
+    rows, size = result
+    _IN_FLIGHT.clear()
+    LAST_CYCLE['rows'] = rows
+    LAST_CYCLE['bytes'] = size
+    if rows:
+        logger.log_info(f"save cycle: wrote {rows} rows ({size} bytes)")
+    process_queue()
+
+
+def _batch_failed(failure):
+    logger.log_err(f"save cycle failed: {failure.getErrorMessage()}")
+    # put back the writes that weren't queued again in the meantime
+    for obj, key, value, _, _ in _IN_FLIGHT:
+        if (obj.id, key) not in _PENDING:
+            _PENDING[(obj.id, key)] = (obj, key, value)
+    _IN_FLIGHT.clear()
+
+
+def process_queue():
+    """ sends the queued writes to a worker thread, one batch at a time """
+    if _IN_FLIGHT or not _PENDING or _DRAINED:
+        return
+    batch = list(_PENDING.values())
+    _PENDING.clear()
+    _IN_FLIGHT.extend(_prepare(batch))
+    if not _IN_FLIGHT:
+        return
+    d = threads.deferToThread(_write_batch, list(_IN_FLIGHT))
+    d.addCallbacks(_batch_done, _batch_failed)
+
+
+def drain():
+    """
+    writes everything still queued right away, used at shutdown. waits
+    for the batch in flight, which is written again first in case its
+    thread hasn't run yet, so the pending writes land after it.
+    """
+    global _DRAINED
+    with _LOCK:
+        _DRAINED = True
+        rows = list(_IN_FLIGHT) + _prepare(list(_PENDING.values()))
+        _IN_FLIGHT.clear()
+        _PENDING.clear()
+        if rows:
+            rows_written, size = _update(rows)
+            LAST_CYCLE['rows'] = rows_written
+            LAST_CYCLE['bytes'] = size
+
+
+def save_dirty(handlers=None, in_place=True):
+    """
+    queues every dirty handler (all loaded ones by default) to be written,
+    looking for changes made in place if in_place (see is_dirty).
+    returns the amount of rows queued.
+    """
+    if handlers is None:
+        handlers = loaded_handlers()
+    rows = 0
+    for handler in handlers:
+        packed = handler.flush(in_place)
+        if packed is not None:
+            queue_write(handler.caller, handler.__attr_name__, packed)
+            rows += 1
+    return rows
+
+
+def save_cycle():
+    # called by the global ticker handler
+    global _CYCLES
+    _CYCLES += 1
+    save_dirty(in_place=_CYCLES % IN_PLACE_CYCLES == 0)
+    process_queue()
+
+
+def start():
+    TICKER_HANDLER.add(interval=TICK_SAVE_CHAR,
+                       callback=save_cycle,
+                       idstring="save_cycle",
+                       persistent=False)
@@ -0,0 +1,135 @@
+"""
+Vitals regeneration for every online character.
+
+Instead of one ticker per character, characters register here when they
+are puppeted and a single ticker heals all of them at once. The system
+holds the max/rate of their vitals as arrays, one row per character,
+so a tick is one vectorized pass and only the characters whose values
+changed are written back and flagged to be saved.
+
+Current values are changed in place all over (combat, conditions, ex:
+caller.attrs.speed.cur -= cost), so they are read from the characters
+every tick, right before healing. A row's max/rate is read again only
+when its attrs change (the handler calls `changed`), and every row
+every RESYNC_TICKS ticks for changes made without the handler.
+"""
+from evennia import TICKER_HANDLER
+
+from world import vitals
+from world.globals import TICK_HEAL_CHAR
+
+REGEN_VITALS = ('health', 'magicka', 'speed', 'stamina')
+RESYNC_TICKS = 6
+
+
+class RegenSystem:
+    def __init__(self):
+        self.chars = []  # row: character
+        self.rows = {}  # character id: row
+        # (rows, len(REGEN_VITALS)) arrays, created on first add
+        self.cur = self.max = self.rate = None
+        self.amount = None  # healed per tick, one per row
+        self.stale = set()  # ids of the characters to read again
+        self.ticks = 0
+
+    def __len__(self):
+        return len(self.chars)
+
+    def _read(self, char):
+        char.attrs.update()
+        vit = [char.attrs.get(name) for name in REGEN_VITALS]
+        return ([x.cur for x in vit], [x.max for x in vit],
+                [x.rate for x in vit],
+                vitals.heal_amount(char.attrs.level.value))
+
+    def _sync(self, row):
+        cur, max_, rate, amount = self._read(self.chars[row])
+        self.cur[row], self.max[row], self.rate[row] = cur, max_, rate
+        self.amount[row] = amount
+
+    def add(self, char):
+        if char.id in self.rows:
+            self.stale.add(char.id)
+            return
+        np = vitals._numpy()
+        cur, max_, rate, amount = self._read(char)
+        if self.cur is None:
+            width = len(REGEN_VITALS)
+            self.cur = np.zeros((0, width), dtype=np.int64)
+            self.max = np.zeros((0, width), dtype=np.int64)
+            self.rate = np.zeros((0, width), dtype=np.float64)
+            self.amount = np.zeros(0, dtype=np.float64)
+        self.cur = np.vstack([self.cur, [cur]])
+        self.max = np.vstack([self.max, [max_]])
+        self.rate = np.vstack([self.rate, [rate]])
+        self.amount = np.append(self.amount, amount)
+        self.rows[char.id] = len(self.chars)
+        self.chars.append(char)
+
+    def remove(self, char):
+        row = self.rows.pop(char.id, None)
+        if row is None:
+            return
+        self.stale.discard(char.id)
+        # the last row takes the place of the removed one
+        last = len(self.chars) - 1
+        if row != last:
+            moved = self.chars[last]
+            self.chars[row] = moved
+            self.rows[moved.id] = row
+            for arr in (self.cur, self.max, self.rate, self.amount):
+                arr[row] = arr[last]
+        self.chars.pop()
+        self.cur, self.max = self.cur[:last], self.max[:last]
+        self.rate, self.amount = self.rate[:last], self.amount[:last]
+
+    def changed(self, char):
+        """ the attrs of char changed, its row is read again next tick """
+        if char.id in self.rows:
+            self.stale.add(char.id)
+
+    def start(self):
+        TICKER_HANDLER.add(interval=TICK_HEAL_CHAR,
+                           callback=regen_tick,
+                           idstring="regen",
+                           persistent=False)
+
+    def tick(self):
+        self.ticks += 1
+        if self.ticks % RESYNC_TICKS == 0:
+            self.stale.update(self.rows)
+        for char_id in list(self.stale):
+            char = self.chars[self.rows[char_id]]
+            if not char.has_account:
+                self.remove(char)
+            else:
+                self._sync(self.rows[char_id])
+        self.stale.clear()
+        if not self.chars:
+            return 0
+
+        # cur may have changed in place since the last tick
+        self.cur = vitals._numpy().array(
+            [[char.attrs.get(name).cur for name in REGEN_VITALS]
+             for char in self.chars],
+            dtype=self.cur.dtype)
+        healed = vitals.regen_batch(self.cur, self.max, self.rate,
+                                    self.amount)
+        rows = (healed != self.cur).any(axis=1).nonzero()[0].tolist()
+        self.cur = healed
+        for row in rows:
+            char = self.chars[row]
+            for name, value in zip(REGEN_VITALS, healed[row].tolist()):
+                char.attrs.get(name).cur = value
+            char.attrs.mark_dirty()
+        # the write backs above aren't changes to read again
+        self.stale.clear()
+        return len(rows)
+
+
+REGEN = RegenSystem()
+
+
+def regen_tick():
+    # called by the global ticker handler
+    REGEN.tick()
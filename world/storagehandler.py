@@ -1,18 +1,60 @@
+import weakref
+
+_SERIALIZE = None
+_PERSISTENCE = None
+
+# every handler that has its values loaded in memory, see `loaded_handlers`
+_LOADED = weakref.WeakSet()
+
+
+def _serialize():
+    # imported lazily, the serializer needs the registries
+    # which themselves import this module
+    global _SERIALIZE
+    if _SERIALIZE is None:
+        from world.utils import serialize as _SERIALIZE
+    return _SERIALIZE
+
+
+def _persistence():
+    # world.persistence imports this module
+    global _PERSISTENCE
+    if _PERSISTENCE is None:
+        from world import persistence as _PERSISTENCE
+    return _PERSISTENCE
+
+
 class StorageHandler:
+    """
+    Exposes the keys of the dictionary Attribute `__attr_name__` on caller
+    as properties of the handler.
+
+    Values are rehydrated once and kept in memory, so in-place changes
+    (ex: caller.attrs.health.cur -= 1) are seen right away. Changes are not
+    written as they happen, the handler is flagged dirty and queued by the
+    next save cycle (see world.persistence) or written by `save`. In the
+    database the values are stored in their compact form, see
+    world.utils.serialize.
+    """
     __attr_name__ = ""
+    __handler_fields__ = ('caller', '_data', '_version', '_dirty',
+                          '_snapshot')
 
     def __init__(self, caller):
         self.caller = caller
-        self.name = self.__attr_name__
+        self._data = None
+        self._version = 0
+        self._dirty = False
+        self._snapshot = None
         self.init()
 
     def __setattr__(self, name, value):
-        super().__setattr__(name, value)
-        if name not in ['caller']:
-            _v = self.caller.attributes.get(self.__attr_name__, default={})
-            # print(type(_v), type(name), type(value))
-            _v[name] = value
-            self.caller.attributes.add(self.__attr_name__, _v)
+        if name in self.__handler_fields__:
+            super().__setattr__(name, value)
+            return
+        self._load()[name] = value
+        self._version += 1
+        self._dirty = True
 
     def __str__(self):
         return f"{self.__attr_name__} on ({self.caller})"
@@ -21,19 +63,38 @@ class StorageHandler:
         return str(self)
 
     def __getattr__(self, name):
-        try:
-            return self.caller.attributes.get(self.__attr_name__,
-                                              default={})[name]
-        except KeyError:
-            return None
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self._load().get(name, None)
+
+    def _load(self):
+        if self._data is None:
+            # a write still queued is newer than the database
+            stored = _persistence().queued_value(self.caller,
+                                                 self.__attr_name__)
+            if stored is None:
+                stored = self.caller.attributes.get(self.__attr_name__,
+                                                    default={})
+            self._data = _serialize().unpack(stored)
+            self._data.setdefault('name', self.__attr_name__)
+            # what is in the database, to find in-place changes later on
+            self._snapshot = _serialize().pack(self._data)
+            self._dirty = False
+            _LOADED.add(self)
+        return self._data
+
+    @property
+    def version(self):
+        """ bumped every time a value is set on the handler """
+        return self._version
 
     def init(self):
         pass
 
     def all(self, return_obj=False):
         if not return_obj:
-            return list(self.caller.attributes.get(self.__attr_name__).keys())
-        objs = list(self.caller.attributes.get(self.__attr_name__).values())
+            return list(self._load().keys())
+        objs = list(self._load().values())
         return [x for x in objs if x != self.__attr_name__]
 
     def get(self, name):
@@ -41,3 +102,57 @@ class StorageHandler:
 
     def set(self, name, value):
         self.__setattr__(name, value)
+
+    def mark_dirty(self):
+        """ flags the handler to be written by the next save cycle """
+        self._dirty = True
+
+    def is_dirty(self, in_place=True):
+        """
+        true if the values in memory differ from the database. changes
+        made in place without mark_dirty are only found (by packing the
+        values again) when in_place.
+        """
+        if self._data is None:
+            return False
+        if self._dirty:
+            return True
+        return in_place and _serialize().pack(self._data) != self._snapshot
+
+    def save(self):
+        """
+        writes every value held by the handler to the database,
+        returns the amount of bytes written
+        """
+        packed = _serialize().pack(self._load())
+        self.caller.attributes.add(self.__attr_name__, packed)
+        # older queued writes must not land after this one
+        _persistence().written_directly(self.caller, self.__attr_name__,
+                                        packed)
+        self._snapshot = packed
+        self._dirty = False
+        return _serialize().stored_size(packed)
+
+    def flush(self, in_place=True):
+        """
+        marks the handler clean and returns its packed values so they can
+        be written by the caller, None if nothing changed (see is_dirty).
+        """
+        if not self.is_dirty(in_place):
+            return None
+        packed = _serialize().pack(self._data)
+        self._snapshot = packed
+        self._dirty = False
+        return packed
+
+    def reload(self):
+        """ drops the in-memory values, they are re-read on next access """
+        self._data = None
+        self._snapshot = None
+        self._dirty = False
+        self._version += 1
+
+
+def loaded_handlers():
+    """ all handlers currently holding values in memory """
+    return list(_LOADED)
@@ -0,0 +1,228 @@
+"""
+Timed condition effects: durations, periodic effects and the stages of
+diseases.
+
+Instead of a ticker per afflicted character, every timer goes into one
+min-heap ordered by the game time (see custom_gametime) it is due at,
+and a single ticker pops the ones that are due. Cancelled timers are
+only forgotten, they are dropped when they reach the top of the heap,
+so adding and cancelling are O(log n) at most.
+
+A timer names the character, the condition and what to do:
+    effect   calls effect() of the condition, again every `repeat`
+    end      removes the condition
+    stage    calls progress() of the condition with the stage
+
+Conditions describe their timers with __duration__, __interval__ and
+stages() (see world.conditions). Pending timers are kept in the timerdb
+global script, saved every TICK_SAVE_CHAR seconds and when the server
+stops, so they survive reloads. Game time doesn't pass while the server
+is down. Conditions stored before they were timed get their timers when
+the character is puppeted.
+"""
+import heapq
+import time
+
+from evennia import GLOBAL_SCRIPTS, TICKER_HANDLER, logger, search_object
+from evennia.contrib import custom_gametime
+from evennia.utils.gametime import gametime
+
+from world.conditions import get_condition
+from world.globals import PULSE_TIMERS, TICK_SAVE_CHAR
+
+# rebuild the heap when it holds this many times more entries than timers
+_COMPACT_RATIO = 2
+
+# when a condition refuses to end, it is tried again after
+END_RETRY = {'min': 1}
+
+# how long the last tick took and what it did
+LAST_TICK = {'ms': 0.0, 'fired': 0}
+
+
+def now():
+    """ game time in seconds """
+    return gametime(absolute=True)
+
+
+def game_seconds(**units):
+    """ game seconds in units of custom_gametime, ex: day=3 """
+    return sum(custom_gametime.UNITS[unit] * value
+               for unit, value in units.items())
+
+
+class TimerHeap:
+    def __init__(self):
+        # entries: [due, seq, char id, handler, condition, action, stage,
+        # repeat], seq makes entries due at the same time fire in order
+        self.heap = []
+        self.entries = {}  # seq: entry, only timers not cancelled
+        self.by_char = {}  # char id: {seq, ...}
+        self.seq = 0
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, due, char_id, handler, condition, action, stage=None,
+            repeat=None):
+        """ schedules a timer at game time due, returns its id """
+        self.seq += 1
+        entry = [
+            due, self.seq, char_id, handler, condition, action, stage, repeat
+        ]
+        heapq.heappush(self.heap, entry)
+        self.entries[self.seq] = entry
+        self.by_char.setdefault(char_id, set()).add(self.seq)
+        self.dirty = True
+        return self.seq
+
+    def cancel(self, seq):
+        entry = self.entries.pop(seq, None)
+        if entry is None:
+            return
+        seqs = self.by_char[entry[2]]
+        seqs.discard(seq)
+        if not seqs:
+            del self.by_char[entry[2]]
+        self.dirty = True
+        if len(self.heap) > _COMPACT_RATIO * len(self.entries) + 64:
+            self.heap = list(self.entries.values())
+            heapq.heapify(self.heap)
+
+    def cancel_all(self, char_id, condition=None):
+        """ cancels the timers of a character, of condition only if given """
+        for seq in list(self.by_char.get(char_id, ())):
+            if condition is None or self.entries[seq][4] == condition:
+                self.cancel(seq)
+
+    def pop_due(self, at):
+        """ removes and returns the timers due by game time at, in order """
+        due = []
+        while self.heap and self.heap[0][0] <= at:
+            entry = heapq.heappop(self.heap)
+            if self.entries.get(entry[1]) is not entry:
+                continue  # cancelled
+            due.append(entry)
+            repeat = entry[7]
+            if repeat:
+                entry[0] += repeat
+                heapq.heappush(self.heap, entry)
+            else:
+                self.cancel(entry[1])
+        if due:
+            self.dirty = True
+        return due
+
+    def dump(self):
+        """ the pending timers, as plain tuples """
+        return [tuple(x) for x in sorted(self.entries.values())]
+
+    def load(self, rows):
+        self.__init__()
+        for due, _, char_id, handler, condition, action, stage, repeat in rows:
+            self.add(due, char_id, handler, condition, action, stage, repeat)
+        self.dirty = False
+
+
+TIMERS = TimerHeap()
+_LAST_SAVE = 0.0
+
+
+def schedule_condition(caller, handler, condition):
+    """ schedules the timers condition describes for caller """
+    # stored with the condition, see schedule_stored
+    condition.meta['timed'] = True
+    if condition.__interval__:
+        every = game_seconds(**condition.__interval__)
+        TIMERS.add(now() + every, caller.id, handler, condition.name,
+                   'effect', repeat=every)
+    if condition.__duration__:
+        TIMERS.add(now() + game_seconds(**condition.__duration__),
+                   caller.id, handler, condition.name, 'end')
+    for stage, after in enumerate(condition.stages()):
+        TIMERS.add(now() + game_seconds(**after), caller.id, handler,
+                   condition.name, 'stage', stage=stage)
+
+
+def schedule_stored(caller, handler, conditions):
+    """
+    schedules the conditions caller already had before they were timed,
+    the others have their timers saved in timerdb
+    """
+    scheduled = False
+    for condition in conditions:
+        if not condition.meta.get('timed'):
+            schedule_condition(caller, handler, condition)
+            scheduled = True
+    return scheduled
+
+
+def cancel_condition(caller, condition):
+    TIMERS.cancel_all(caller.id, condition.name)
+
+
+def _fire(entry):
+    _, _, char_id, handler_name, name, action, stage, _ = entry
+    found = search_object(f"#{char_id}")
+    con_tuple = get_condition(name)
+    if not found or con_tuple is None:
+        TIMERS.cancel_all(char_id)
+        return
+    caller = found[0]
+    handler = getattr(caller, handler_name)
+    cls = con_tuple[0]
+    condition = handler.get(cls)
+    if condition is None:
+        TIMERS.cancel_all(char_id, name)
+        return
+
+    if action == 'end':
+        if handler.remove((cls, condition.X, condition.Y)) is False:
+            # end_condition refused, the end timer is used up
+            TIMERS.add(now() + game_seconds(**END_RETRY), char_id,
+                       handler_name, name, 'end')
+        return
+    if action == 'effect':
+        condition.effect(caller)
+    elif action == 'stage':
+        condition.progress(caller, stage)
+    # effects change the condition and vitals in place
+    handler.mark_dirty()
+    caller.attrs.mark_dirty()
+    if not condition.enabled:
+        handler.remove((cls, condition.X, condition.Y))
+
+
+def save():
+    """ writes the pending timers to the timerdb global script """
+    global _LAST_SAVE
+    GLOBAL_SCRIPTS.timerdb.db.timers = TIMERS.dump()
+    TIMERS.dirty = False
+    _LAST_SAVE = time.time()
+
+
+def load():
+    TIMERS.load(GLOBAL_SCRIPTS.timerdb.db.timers or [])
+
+
+def start():
+    TICKER_HANDLER.add(interval=PULSE_TIMERS,
+                       callback=timers_tick,
+                       idstring="timers",
+                       persistent=False)
+
+
+def timers_tick():
+    # called by the global ticker handler
+    start_time = time.perf_counter()
+    due = TIMERS.pop_due(now())
+    for entry in due:
+        try:
+            _fire(entry)
+        except Exception:
+            logger.log_trace(f"condition timer {entry} failed")
+    if TIMERS.dirty and time.time() - _LAST_SAVE >= TICK_SAVE_CHAR:
+        save()
+    LAST_TICK.update(ms=(time.perf_counter() - start_time) * 1000,
+                     fired=len(due))
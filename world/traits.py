@@ -52,11 +52,10 @@ class CrawlingTrait(Trait):
         cur_max_speed = caller.attrs.speed.max
         # halve current max speed
         self.meta['speed_mod'] = -(cur_max_speed // 2 + 1)
-        caller.attrs.speed.add_mod(self.meta['speed_mod'])
+        caller.attrs.modify_vital('speed', by=self.meta['speed_mod'])
 
     def after_condition(self, caller):
-        caller.attrs.modifier['speed'].remove(self.meta['speed_mod'])
-        caller.attrs.speed.remove_mod(self.meta['speed_mod'])
+        caller.attrs.modify_vital('speed', by=-self.meta['speed_mod'])
 
 
 class DiseaseResistTrait(Trait):
@@ -172,10 +171,10 @@ class PowerWellTrait(Trait):
 
     def at_condition(self, caller):
         # increase max magicka by X
-        caller.attrs.magicka.add_mod(self.X)
+        caller.attrs.modify_vital('magicka', by=self.X)
 
     def after_condition(self, caller):
-        caller.attrs.magicka.remove_mod(self.X)
+        caller.attrs.modify_vital('magicka', by=-self.X)
 
     def on_duplicate(self, other):
         super().on_duplicate(other)
@@ -412,4 +411,10 @@ class InscrutableRacial(RacialTrait):
 
 
 class NaturalArchersRacial(RacialTrait):
-    __obj_name__ = "natural_archers"
\ No newline at end of file
+    __obj_name__ = "natural_archers"
+
+ALL_RACIALS = [
+    InscrutableRacial,
+    MentalStrengthRacial,
+    NaturalArchersRacial,
+]
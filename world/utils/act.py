@@ -1,7 +1,9 @@
+import re
 from enum import Enum
-from world.utils.utils import can_see_obj, is_hidden, is_invis, is_pc, is_sleeping
-from world.conditions import Sleeping
-from world.gender import is_female, is_male, is_nogender
+from functools import lru_cache
+
+from world.utils.utils import can_see_obj, is_pc, is_sleeping
+from world.gender import is_female, is_male
 
 
 class Announce(Enum):
@@ -11,6 +13,88 @@ class Announce(Enum):
     ToChar = 4
 
 
+_TOKEN_PATTERN = re.compile(r'\$(.)', re.S)
+
+
+@lru_cache(maxsize=1024)
+def compile_act(msg):
+    """
+    splits an act() format string into a tuple of (literal, token) pairs,
+    token being the character following `$` or None for the trailing text.
+    compiled once per format string.
+    """
+    parts = []
+    pos = 0
+    for match in _TOKEN_PATTERN.finditer(msg):
+        parts.append((msg[pos:match.start()], match.group(1)))
+        pos = match.end()
+    parts.append((msg[pos:], None))
+    return tuple(parts)
+
+
+def _pronoun(viewer, target, male, female, neuter):
+    if not can_see_obj(viewer, target):
+        return 'someone'
+    if is_male(target):
+        return male
+    if is_female(target):
+        return female
+    return neuter
+
+
+def _name(viewer, target):
+    if not can_see_obj(viewer, target):
+        return 'someone'
+    return target.name.capitalize()
+
+
+def _sdesc(viewer, target):
+    if not can_see_obj(viewer, target):
+        return 'something'
+    return target.db.sdesc
+
+
+def _obj_name(viewer, target):
+    if not can_see_obj(viewer, target):
+        return 'something'
+    return target.name
+
+
+def _article(target):
+    return 'an' if target.name[:1].lower() in 'aeiou' else 'a'
+
+
+_TOKENS = {
+    'n': lambda viewer, ch, obj, vict: _name(viewer, ch),
+    'N': lambda viewer, ch, obj, vict: _name(viewer, vict),
+    'm': lambda viewer, ch, obj, vict: _pronoun(viewer, ch, 'him', 'her', 'it'),
+    'M': lambda viewer, ch, obj, vict: _pronoun(viewer, vict, 'him', 'her', 'it'),
+    's': lambda viewer, ch, obj, vict: _pronoun(viewer, ch, 'his', 'her', 'it'),
+    'S': lambda viewer, ch, obj, vict: _pronoun(viewer, vict, 'his', 'her', 'it'),
+    'e': lambda viewer, ch, obj, vict: _pronoun(viewer, ch, 'he', 'she', 'it'),
+    'E': lambda viewer, ch, obj, vict: _pronoun(viewer, vict, 'he', 'she', 'it'),
+    'p': lambda viewer, ch, obj, vict: _sdesc(viewer, obj),
+    'P': lambda viewer, ch, obj, vict: _sdesc(viewer, vict),
+    'o': lambda viewer, ch, obj, vict: _obj_name(viewer, obj),
+    'O': lambda viewer, ch, obj, vict: _obj_name(viewer, vict),
+    'a': lambda viewer, ch, obj, vict: _article(obj),
+    'A': lambda viewer, ch, obj, vict: _article(vict),
+    '$': lambda viewer, ch, obj, vict: '$',
+}
+
+
+def render_act(template, viewer, ch, obj, vict_obj):
+    """ renders a compiled act() template as seen by viewer """
+    out = []
+    for literal, token in template:
+        out.append(literal)
+        if token is None:
+            continue
+        func = _TOKENS.get(token)
+        out.append(func(viewer, ch, obj, vict_obj) if func else f"${token}")
+    return ''.join(out)
+
+
 def act(msg, hide_invisible, hide_sleep, ch, obj, vict_obj, announce_type):
     """
     A python conversion for ROM based act function.
@@ -36,125 +120,44 @@ def act(msg, hide_invisible, hide_sleep, ch, obj, vict_obj, announce_type):
         $E - like $e but for vict_objt
         $p - short description or 'something' for obj. 
         $P Like $p for vict_obj.*
-
-
-        TODO Tokens:
         $o Name or 'something' for obj, depending on visibility. 
         $O Like $o, for vict_obj.*
         $a 'an' or 'a', depending on the first character of obj's name. 
         $A Like $a, for vict_obj.* 
         $$ Print the character '$' 
+
+    Names, pronouns and descriptions are resolved for each recipient,
+    based on what that recipient can see.
+
     Ex:
         act("$n yells frantically to whole room", FALSE, ch, None, None, Announce.ToRoom)
         act("$n tells $N to calm down", FALSE, ch, None, other_player, Announce.ToRoom)
         act("$n tells you to keep your voice down...", FALSE, ch, None, other_player, Announce.ToVict)
     """
 
-    if "$n" in msg:
-        if is_hidden(ch) or is_invis(ch):
-            msg = msg.replace("$n", "someone")
-        else:
-            msg = msg.replace("$n", ch.name.capitalize())
-
-    if "$N" in msg:
-        if is_hidden(vict_obj) or is_invis(vict_obj):
-            msg = msg.replace("$N", "someone")
-        else:
-            msg = msg.replace("$N", vict_obj.name.capitalize())
-    if "$m" in msg:
-        if is_hidden(ch) or is_invis(ch):
-            msg = msg.replace("$m", 'someone')
-        else:
-            if is_male(ch):
-                msg = msg.replace("$m", 'him')
-            elif is_female(ch):
-                msg = msg.replace('$m', 'her')
-            else:
-                msg = msg.replace('$m', 'it')
-
-    if "$M" in msg:
-        if is_hidden(vict_obj) or is_invis(ch):
-            msg = msg.replace("$M", 'someone')
-        else:
-            if is_male(vict_obj):
-                msg = msg.replace("$M", 'him')
-            elif is_female(vict_obj):
-                msg = msg.replace('$M', 'her')
-            else:
-                msg = msg.replace('$mM', 'it')
-
-    if "$s" in msg:
-        if is_hidden(ch) or is_invis(ch):
-            msg = msg.replace("$s", 'someone')
-        else:
-            if is_male(ch):
-                msg = msg.replace("$s", 'his')
-            elif is_female(ch):
-                msg = msg.replace('$s', 'her')
-            else:
-                msg = msg.replace('$s', 'it')
-
-    if "$S" in msg:
-        if is_hidden(vict_obj) or is_invis(ch):
-            msg = msg.replace("$S", 'someone')
-        else:
-            if is_male(vict_obj):
-                msg = msg.replace("$S", 'his')
-            elif is_female(vict_obj):
-                msg = msg.replace('$S', 'her')
-            else:
-                msg = msg.replace('$S', 'it')
-
-    if "$e" in msg:
-        if is_hidden(ch) or is_invis(ch):
-            msg = msg.replace("$e", 'someone')
-        else:
-            if is_male(ch):
-                msg = msg.replace("$e", 'he')
-            elif is_female(ch):
-                msg = msg.replace('$e', 'she')
-            else:
-                msg = msg.replace('$e', 'it')
-
-    if "$E" in msg:
-        if is_hidden(ch) or is_invis(ch):
-            msg = msg.replace("$E", 'someone')
-        else:
-            if is_male(vict_obj):
-                msg = msg.replace("$E", 'he')
-            elif is_female(vict_obj):
-                msg = msg.replace('$E', 'she')
-            else:
-                msg = msg.replace('$E', 'it')
-
-    if "$p" in msg:
-        #TODO: had invis and basic effects to objects
-
-        sdesc = obj.db.sdesc
-        msg = msg.replace('$p', sdesc)
-
-    if "$P" in msg:
-        sdesc = vict_obj.db.sdesc
-        msg = msg.replace("$P", sdesc)
+    template = compile_act(msg)
 
     if announce_type == Announce.ToRoom:
-        for obj in ch.location.contents:
-            if is_pc(obj):
-                if (hide_invisible and is_invis(obj)) or (
-                        hide_sleep and is_sleeping(obj)) or (obj.id == ch.id):
-                    continue
-                obj.msg(msg)
+        for viewer in ch.location.contents:
+            if not is_pc(viewer) or viewer.id == ch.id:
+                continue
+            if (hide_invisible and not can_see_obj(viewer, ch)) or (
+                    hide_sleep and is_sleeping(viewer)):
+                continue
+            viewer.msg(render_act(template, viewer, ch, obj, vict_obj))
         return
     if announce_type == Announce.ToChar:
-        ch.msg(msg)
+        ch.msg(render_act(template, ch, ch, obj, vict_obj))
         return
     if announce_type == Announce.ToVict:
         if is_pc(vict_obj):
             if is_sleeping(vict_obj) and hide_sleep:
                 return
 
-            vict_obj.msg(msg)
+            vict_obj.msg(render_act(template, vict_obj, ch, obj, vict_obj))
         return
     if announce_type == Announce.ToNotVict:
-        ch.location.announce(msg, exclude=[vict_obj])
+        for viewer in ch.location.contents:
+            if is_pc(viewer) and viewer != vict_obj:
+                viewer.msg(render_act(template, viewer, ch, obj, vict_obj))
         return
@@ -0,0 +1,87 @@
+"""
+Carried weight and item counts of characters and containers.
+
+The totals are computed once from `contents` (recursively) and kept in
+ndb, then updated by the at_object_receive/at_object_leave hooks of
+characters and objects as items move, including moves in and out of
+nested containers. Reading them doesn't walk the contents again.
+Objects deleted in place forget the totals of whatever holds them (see
+`invalidate`).
+"""
+
+
+def _count(obj):
+    return obj.attributes.get('count', default=1)
+
+
+def _compute(obj):
+    weight, count = 0, 0
+    for item in obj.contents:
+        weight += item_weight(item)
+        count += _count(item)
+    obj.ndb.carried_weight = weight
+    obj.ndb.item_count = count
+    obj.ndb.carried_len = len(obj.contents)
+
+
+def invalidate(obj):
+    """ forgets the totals of obj and of everything holding it """
+    while obj is not None:
+        obj.ndb.carried_weight = None
+        obj = obj.location
+
+
+def _cached(obj):
+    # objects created or deleted in place don't call the move hooks,
+    # they show up as a change in the number of contents
+    if obj.ndb.carried_weight is None:
+        _compute(obj)
+    elif obj.ndb.carried_len != len(obj.contents):
+        # the holders counted the old contents too
+        invalidate(obj)
+        _compute(obj)
+
+
+def carried_weight(obj):
+    """ weight of everything inside obj, nested containers included """
+    _cached(obj)
+    return obj.ndb.carried_weight
+
+
+def item_count(obj):
+    """ number of items directly inside obj, stacks count every item """
+    _cached(obj)
+    return obj.ndb.item_count
+
+
+def item_weight(obj):
+    """ weight of obj (every item of its stack) and what it holds """
+    weight = (obj.attributes.get('weight') or 0) * _count(obj)
+    if obj.contents:
+        weight += carried_weight(obj)
+    return weight
+
+
+def _update(obj, moved_obj, sign):
+    delta = sign * item_weight(moved_obj)
+    if obj.ndb.carried_weight is not None:
+        obj.ndb.carried_weight += delta
+        obj.ndb.item_count += sign * _count(moved_obj)
+        # leave is called before moved_obj is taken out of contents
+        obj.ndb.carried_len = len(obj.contents) - (sign < 0)
+
+    # whoever holds obj carries the difference too
+    loc = obj.location
+    while loc is not None and loc.ndb.carried_weight is not None:
+        loc.ndb.carried_weight += delta
+        loc = loc.location
+
+
+def at_receive(obj, moved_obj):
+    """ call from at_object_receive of obj """
+    _update(obj, moved_obj, 1)
+
+
+def at_leave(obj, moved_obj):
+    """ call from at_object_leave of obj """
+    _update(obj, moved_obj, -1)
@@ -0,0 +1,101 @@
+"""
+Shared item matching for the dot notation used by item commands
+(`book`, `2.book`, `all.book`, `all`).
+
+Every container (room, character, container object) keeps an index of
+keyword prefixes to its contents, built on first use and dropped by the
+typeclasses' at_object_receive/at_object_leave when something enters or
+leaves it. Looking up a name is then a dict lookup instead of a
+`match_name` call per object.
+"""
+from world.utils.utils import is_npc, is_obj, is_pc, match_name, parse_dot_notation
+
+
+def _keywords(obj):
+    if is_obj(obj):
+        return obj.db.name or []
+    if is_pc(obj):
+        return obj.name.split()
+    if is_npc(obj):
+        return (obj.db.key or "").split()
+    return []
+
+
+class KeywordIndex:
+    """
+    Maps every prefix of every keyword of the contents of a location
+    to the positions of the matching objects, in contents order.
+    """
+    def __init__(self, location):
+        # a copy, the positions are only valid for these contents
+        self.contents = list(location.contents)
+        self.prefixes = {}
+        for idx, obj in enumerate(self.contents):
+            for keyword in _keywords(obj):
+                keyword = keyword.lower()
+                for end in range(1, len(keyword) + 1):
+                    positions = self.prefixes.setdefault(keyword[:end], [])
+                    # an object can share a prefix between its keywords
+                    if not positions or positions[-1] != idx:
+                        positions.append(idx)
+
+    def find(self, name):
+        """ objects matching name, in contents order """
+        words = name.lower().split()
+        if not words:
+            return []
+        positions = self.prefixes.get(words[0], [])
+        objs = [self.contents[idx] for idx in positions]
+        if len(words) > 1:
+            # multi word names still have to match as a whole
+            objs = [x for x in objs if match_name(name, x)]
+        return objs
+
+
+def keyword_index(location):
+    """ returns the (cached) keyword index of location """
+    index = location.ndb.keyword_index
+    # objects created or deleted in place don't call the move hooks
+    if index is None or len(index.contents) != len(location.contents):
+        index = KeywordIndex(location)
+        location.ndb.keyword_index = index
+    return index
+
+
+def find_objs(query, locations, condition=None):
+    """
+    Resolves a dot notation query against the contents of locations,
+    searched in order. Positions count through all locations.
+
+    Args:
+        query: `all`, `all.<name>`, `<pos>.<name>` or `<name>`
+        locations: iterable of objects whose contents are searched
+        condition: optional callable, objects it returns False for
+            are skipped (and not counted)
+
+    Returns:
+        list of matched objects, empty when nothing matched.
+    """
+    try:
+        pos, name = parse_dot_notation(query)
+    except ValueError:
+        return []
+
+    matched = []
+    for location in locations:
+        if name == 'all':
+            objs = location.contents
+        else:
+            objs = keyword_index(location).find(name)
+        if condition is not None:
+            objs = [x for x in objs if condition(x)]
+        matched.extend(objs)
+
+        if pos is None and name != 'all' and matched:
+            return matched[:1]
+
+    if pos is None or pos == 'all':
+        return matched
+    if 0 < pos <= len(matched):
+        return [matched[pos - 1]]
+    return []
@@ -0,0 +1,48 @@
+"""
+Output coalescing for characters.
+
+Plain text sent to a character is collected instead of being sent right
+away, everything collected during one pass of the reactor (a command, a
+tick...) goes out as a single payload per character, in order. Anything
+that isn't plain text flushes what was collected first, so ordering is
+kept (ex: the prompt always comes after the command output). Objects
+without sessions (mobs) have nobody to collect for.
+"""
+from twisted.internet import reactor
+
+_BUFFERS = {}
+_SCHEDULED = []
+
+
+def buffer_output(obj, text):
+    """ collects text to be sent to obj at the end of this reactor pass """
+    _BUFFERS.setdefault(obj, []).append(text)
+    if not _SCHEDULED:
+        _SCHEDULED.append(reactor.callLater(0, flush_all))
+
+
+def collect(obj, text, plain):
+    """
+    collects text for obj if it is plain text and obj has sessions,
+    returns True if it did. otherwise what obj has collected is sent
+    right away, before text, and returns False.
+    """
+    if plain and obj.sessions.count():
+        buffer_output(obj, text)
+        return True
+    flush_output(obj)
+    return False
+
+
+def flush_output(obj):
+    """ sends whatever was collected for obj """
+    texts = _BUFFERS.pop(obj, None)
+    if texts:
+        # a (text, options) tuple doesn't get collected again
+        obj.msg(text=("\n".join(texts), {}))
+
+
+def flush_all():
+    _SCHEDULED.clear()
+    for obj in list(_BUFFERS):
+        flush_output(obj)
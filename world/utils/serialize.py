@@ -0,0 +1,197 @@
+"""
+Compact storage format for the game objects held by the character
+StorageHandlers (attrs, stats, skills, conditions, traits, languages).
+
+Instead of pickling live instances into Attributes, every known object is
+packed into a small tuple record of the form:
+
+    ('@tag', arg1, arg2, ...)
+
+and rehydrated through the existing registries (get_condition, get_trait,
+get_race, get_birthsign, ...). Objects that never change after creation
+(races, birthsigns, language ranks) are interned and shared between all
+characters.
+
+Values that are not known game objects (ints, strings, enums, dicts...)
+are left as they are, so legacy pickled instances are still readable and
+get packed the next time they are written.
+"""
+import pickle
+from collections.abc import Mapping, MutableSequence
+
+from evennia.utils.dbserialize import to_pickle
+
+from world.attributes import Attribute, VitalAttribute
+from world.birthsigns import BirthSign, get_birthsign
+from world.characteristics import CHARACTERISTICS, Characteristic
+from world.conditions import ALL_CONDITIONS, Condition
+from world.globals import _Proficiency
+from world.languages import LanguageSkill
+from world.races import NoRace, Race, get_race
+from world.skills import GoverningSkills, Skill
+from world.traits import ALL_RACIALS, ALL_TRAITS, Trait
+
+_CONDITIONS = {x.__obj_name__: x for x in ALL_CONDITIONS}
+_TRAITS = {x.__obj_name__: x for x in list(ALL_TRAITS) + list(ALL_RACIALS)}
+_LANGUAGE_RANKS = {
+    x.pos: x
+    for x in vars(LanguageSkill).values() if isinstance(x, _Proficiency)
+}
+
+_NO_RACE = NoRace()
+_INTERNED_SIGNS = {}
+
+
+def _pack_condition(con):
+    tag = '@trait' if isinstance(con, Trait) else '@con'
+    record = (tag, con.name, pack(con.X), pack(con.Y))
+    if con.meta or not con.enabled or con.allow_multi:
+        # only keep runtime state around when it isn't the default
+        record += (con.enabled, con.allow_multi, dict(con.meta))
+    return record
+
+
+def _unpack_condition(registry, name, X, Y, enabled=True, allow_multi=False,
+                      meta=None):
+    cls = registry.get(name)
+    if cls is None:
+        raise KeyError(f"no condition/trait registered as `{name}`")
+    con = cls(unpack(X), unpack(Y))
+    con.enabled = enabled
+    con.allow_multi = allow_multi
+    if meta:
+        con.meta.update(meta)
+    return con
+
+
+def _pack_sign(sign):
+    cursed = sign.properties.get('cursed', {}).get('stats', [])
+    # some signs roll their cursed stats at random, keep what was rolled
+    cursed = tuple((x.short, x.bonus) for x in cursed)
+    return ('@sign', sign.name, bool(sign.cursed), cursed)
+
+
+def _unpack_sign(name, cursed, cursed_stats=()):
+    key = (name, cursed, tuple(cursed_stats))
+    sign = _INTERNED_SIGNS.get(key, None)
+    if sign is None:
+        sign = get_birthsign(name, cursed=cursed)
+        if sign is None:
+            raise KeyError(f"no birthsign registered as `{name}`")
+        if cursed_stats:
+            sign.properties['cursed']['stats'] = [
+                CHARACTERISTICS[short].__class__(bonus=bonus)
+                for short, bonus in cursed_stats
+            ]
+        _INTERNED_SIGNS[key] = sign
+    return sign
+
+
+def _unpack_race(name):
+    if not name:
+        return _NO_RACE
+    return get_race(name)
+
+
+def _pack_stat(stat):
+    return ('@stat', stat.short, stat.base, stat.bonus, stat.favored)
+
+
+def _unpack_stat(short, base, bonus, favored):
+    return CHARACTERISTICS[short].__class__(base=base,
+                                            bonus=bonus,
+                                            favored=favored)
+
+
+def _pack_skill(skill):
+    governing = getattr(skill.governing_skill, 'name', skill.governing_skill)
+    return ('@skill', skill.name, skill.rank.id, governing)
+
+
+def _unpack_skill(name, rank, governing):
+    return Skill(name, rank, GoverningSkills.get(governing) or governing)
+
+
+def _pack_vital(attr):
+    return ('@vital', attr.name, attr.cur, attr.max, tuple(attr.mod),
+            attr.rate, attr.rate_mod)
+
+
+def _unpack_vital(name, cur, max, mod, rate, rate_mod):
+    attr = VitalAttribute(name)
+    attr.cur = cur
+    attr.max = max
+    attr.mod = list(mod)
+    attr.rate = rate
+    attr.rate_mod = rate_mod
+    return attr
+
+
+_UNPACKERS = {
+    '@attr': lambda name, value: Attribute(name, unpack(value)),
+    '@vital': _unpack_vital,
+    '@con': lambda *args: _unpack_condition(_CONDITIONS, *args),
+    '@trait': lambda *args: _unpack_condition(_TRAITS, *args),
+    '@race': _unpack_race,
+    '@sign': _unpack_sign,
+    '@stat': _unpack_stat,
+    '@skill': _unpack_skill,
+    '@lang': lambda pos: _LANGUAGE_RANKS[pos],
+}
+
+
+def is_packed(value):
+    """ checks if value is a packed record """
+    return isinstance(value, tuple) and len(value) > 0 and isinstance(
+        value[0], str) and value[0] in _UNPACKERS
+
+
+def pack(value):
+    """
+    Turns value into its compact storable form. Containers are packed
+    recursively, anything unknown is returned untouched.
+    """
+    # order matters here, VitalAttribute is an Attribute
+    # and traits are conditions
+    if isinstance(value, VitalAttribute):
+        return _pack_vital(value)
+    if isinstance(value, Attribute):
+        return ('@attr', value.name, pack(value.value))
+    if isinstance(value, Condition):
+        return _pack_condition(value)
+    if isinstance(value, Race):
+        return ('@race', value.name)
+    if isinstance(value, BirthSign):
+        return _pack_sign(value)
+    if isinstance(value, Characteristic):
+        return _pack_stat(value)
+    if isinstance(value, Skill):
+        return _pack_skill(value)
+    if isinstance(value, _Proficiency):
+        return ('@lang', value.pos)
+    if isinstance(value, Mapping):
+        return {k: pack(v) for k, v in value.items()}
+    if isinstance(value, MutableSequence):
+        return [pack(x) for x in value]
+    return value
+
+
+def unpack(value):
+    """
+    Rehydrates a value stored by `pack`. Legacy (pickled) instances
+    are returned as they are.
+    """
+    if is_packed(value):
+        tag, *args = value
+        return _UNPACKERS[tag](*args)
+    # Attributes hand back their own dict/list types, so test on the abcs
+    if isinstance(value, Mapping):
+        return {k: unpack(v) for k, v in value.items()}
+    if isinstance(value, MutableSequence):
+        return [unpack(x) for x in value]
+    return value
+
+
+def stored_size(value):
+    """ approximate amount of bytes value takes up as a pickled Attribute """
+    return len(pickle.dumps(to_pickle(value), pickle.HIGHEST_PROTOCOL))
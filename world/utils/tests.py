@@ -1,12 +1,146 @@
 import re
 import unittest
 import json
+from types import SimpleNamespace
+from unittest import mock
 import numpy as np
 
 from evennia import GLOBAL_SCRIPTS
 from evennia.utils.dbserialize import deserialize
 from world.utils.utils import DBDumpEncoder, capitalize_sentence, _LANG_TAGS, parse_dot_notation, room_exists
 from world.utils.db import _search_db, search_mobdb, search_objdb, search_roomdb, search_zonedb, _RE_COMPARATOR_PATTERN
+from world.utils.serialize import is_packed, pack, unpack
+from world.attributes import Attribute, VitalAttribute
+from world.birthsigns import MageSign
+from world.conditions import Burning, DetectInvis, Diseased, HolyLight
+from world.races import get_race
+from world.traits import ResistanceTrait
+from world import vitals
+from world.regen import RegenSystem
+from world.utils.act import compile_act, render_act
+from world.utils.translate import TranslationCache, lang_chunks
+from world.paginator import BOOK_PAGE_HEIGHT, BookLayout
+from world.forms import get_template, new_form
+from world.library import BookCatalogue
+from world.mobprog.parser import MobProgParser, compile_prog
+from world.mobprog import dispatch
+from world.mobprog.dispatch import TriggerIndex
+from world.mobprog.sandbox import BudgetExceeded, run_code
+from world import combat, dice, mobai, persistence
+from world.timers import TimerHeap
+from world.storagehandler import StorageHandler
+from world.utils import carry, match, output
+from world.utils.utils import can_contain_more
+from commands.act_item import parse_amount
+from typeclasses.objs.object import Object
+from typeclasses import characters
+from typeclasses.rooms import rooms
+from evennia import EvForm
+
+
+class FakeHandler:
+    """ like db/ndb, names never set are None """
+    def __getattr__(self, name):
+        return None
+
+
+class FakeAttributes:
+    def __init__(self, **values):
+        self.values = values
+
+    def get(self, key, default=None, return_obj=False, **kwargs):
+        if return_obj:
+            if key not in self.values:
+                return None
+            return SimpleNamespace(pk=key, db_value=self.values[key])
+        return self.values.get(key, default)
+
+    def add(self, key, value, **kwargs):
+        self.values[key] = value
+
+    def has(self, key):
+        return key in self.values
+
+    def remove(self, key):
+        self.values.pop(key, None)
+
+
+class FakeObj:
+    """ just enough of a game object for the systems tested here """
+    has_account = False
+    pk = 1
+
+    def __init__(self, id=1, key='obj', location=None, **attributes):
+        self.id = id
+        self.key = key
+        self.db = FakeHandler()
+        self.ndb = FakeHandler()
+        self.attributes = FakeAttributes(**attributes)
+        self.contents = []
+        self.location = location
+        if location is not None:
+            location.contents.append(self)
+        self.msgs = []
+
+    def msg(self, text=None, **kwargs):
+        self.msgs.append(text)
+
+    def send_prompt(self):
+        pass
+
+    def delete(self):
+        if self.location is not None:
+            self.location.contents.remove(self)
+        self.pk = None
+
+
+class FakeStack(FakeObj):
+    """ a FakeObj stacking like typeclasses.objs.object.Object """
+    __stackable__ = True
+    __specific_fields__ = {}
+    typename = 'Object'
+    count = Object.count
+    stack_key = Object.stack_key
+    split = Object.split
+    merge_stack = Object.merge_stack
+
+
+class FakeVitals:
+    """ the attrs of a level 10 character, only its vitals """
+    def __init__(self, cur):
+        self.level = Attribute(name='level', value=10)
+        self.vit = {}
+        for name in ('health', 'magicka', 'speed', 'stamina', 'carry'):
+            vit = VitalAttribute(name=name)
+            vit.cur, vit.max = cur, 100
+            self.vit[name] = vit
+        self.carry = self.vit['carry']
+        self.dirty = False
+
+    def update(self):
+        pass
+
+    def get(self, name):
+        return self.vit[name]
+
+    def mark_dirty(self):
+        self.dirty = True
+
+
+def fake_char(id, cur):
+    """ an online character with its vitals at cur """
+    char = FakeObj(id, 'char')
+    char.has_account = True
+    char.attrs = FakeVitals(cur)
+    return char
+
+
+def fake_mob(id, location=None, hp=10):
+    """ a mob fighting with 2d4+1 """
+    mob = FakeObj(id, f"mob{id}", location)
+    mob.db.hp = hp
+    mob.db.dam_num, mob.db.dam_size, mob.db.dam_mod = 2, 4, 1
+    return mob
 
 
 class TestNumpyToJsonEncoding(unittest.TestCase):
@@ -150,6 +284,39 @@ class TestRPLanguageParser(unittest.TestCase):
         self.assertEqual(total_chunks,
                          len(re.split(_LANG_TAGS, self.text)[1:]))
 
+    def test_lang_chunks(self):
+        chunks = lang_chunks(self.text)
+        self.assertEqual(['tamrielic', 'aldmerish', 'orcish'],
+                         [x[0] for x in chunks])
+
+
+class TestTranslationCache(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def translator(text, level, language):
+            self.calls.append((text, level, language))
+            return text.upper()
+
+        self.cache = TranslationCache(translator, max_chars=20)
+
+    def test_translated_once(self):
+        self.assertEqual("HELLO", self.cache.get("hello", 'orcish', 0.5))
+        self.assertEqual("HELLO", self.cache.get("hello", 'orcish', 0.5))
+        self.assertEqual(1, len(self.calls))
+        self.cache.get("hello", 'orcish', 0.3)
+        self.assertEqual(2, len(self.calls))
+
+    def test_evicts_least_recent(self):
+        self.cache.get("aaaaa", 'orcish', 0.5)
+        self.cache.get("bbbbb", 'orcish', 0.5)
+        self.cache.get("aaaaa", 'orcish', 0.5)
+        self.cache.get("ccccc", 'orcish', 0.5)
+        self.assertEqual(2, len(self.cache))
+        self.assertIn(("aaaaa", 'orcish', 0.5), self.cache.entries)
+        self.assertNotIn(("bbbbb", 'orcish', 0.5), self.cache.entries)
+        self.assertLessEqual(self.cache.chars, 20)
+
 
 class TestBasicUtils(unittest.TestCase):
     def test_capitalize_sentence(self):
@@ -171,4 +338,955 @@ class TestBasicUtils(unittest.TestCase):
 
     def test_room_exists(self):
         vnum = 1
-        self.assertEqual(room_exists(vnum), True)
\ No newline at end of file
+        self.assertEqual(room_exists(vnum), True)
+
+
+class TestSerialize(unittest.TestCase):
+    def test_vital_roundtrip(self):
+        health = VitalAttribute('health')
+        health.cur, health.max = 10, 20
+        health.add_mod(3)
+
+        packed = pack(health)
+        self.assertTrue(is_packed(packed))
+
+        result = unpack(packed)
+        self.assertEqual((10, 20, [3]), (result.cur, result.max, result.mod))
+
+    def test_condition_keeps_state(self):
+        burning = Burning(3)
+        burning.meta['penalty'] = {'all': -10}
+
+        result = unpack(pack(burning))
+        self.assertEqual(burning, result)
+        self.assertDictEqual(burning.meta, result.meta)
+
+    def test_trait_roundtrip(self):
+        trait = ResistanceTrait(2, 'fire')
+        self.assertEqual(trait, unpack(pack(trait)))
+
+    def test_race_is_interned(self):
+        race = Attribute('altmer', get_race('altmer'))
+        result = unpack(pack({'race': race}))
+        self.assertIs(get_race('altmer'), result['race'].value)
+
+    def test_birthsign_is_interned(self):
+        sign = MageSign(cursed=True)
+        first, second = unpack(pack(sign)), unpack(pack(sign))
+        self.assertIs(first, second)
+        self.assertTrue(first.cursed)
+
+    def test_plain_values_untouched(self):
+        value = {'exp': 10, 'title': ", the new blood."}
+        self.assertDictEqual(value, unpack(pack(value)))
+
+
+class TestVitals(unittest.TestCase):
+    def test_returns_builtin_ints(self):
+        self.assertIs(type(vitals.max_health(10, 40)), int)
+        self.assertIs(type(vitals.max_magicka(10, 40, 35)), int)
+
+    def test_level_one_floor(self):
+        self.assertEqual(vitals.max_health(1, 40), 3)
+        self.assertEqual(vitals.max_magicka(1, 40, 40), 20)
+
+    def test_batch_matches_single(self):
+        levels = [1, 5, 20, 50]
+        ends = [30, 45, 52, 70]
+        agis = [35, 40, 60, 41]
+        self.assertEqual(
+            vitals.max_health_batch(levels, ends).tolist(),
+            [vitals.max_health(l, e) for l, e in zip(levels, ends)])
+        self.assertEqual(
+            vitals.max_stamina_batch(levels, ends, agis).tolist(), [
+                vitals.max_stamina(l, e, a)
+                for l, e, a in zip(levels, ends, agis)
+            ])
+
+
+class TestRegenRows(unittest.TestCase):
+    def test_heals_rows(self):
+        regen = RegenSystem()
+        full, hurt = fake_char(1, 100), fake_char(2, 10)
+        regen.add(full)
+        regen.add(hurt)
+        self.assertEqual(1, regen.tick())
+        self.assertFalse(full.attrs.dirty)
+        self.assertTrue(hurt.attrs.dirty)
+        self.assertGreater(hurt.attrs.get('health').cur, 10)
+
+    def test_keeps_changes_made_in_place(self):
+        regen = RegenSystem()
+        char = fake_char(1, 50)
+        regen.add(char)
+        regen.tick()
+        self.assertEqual(56, char.attrs.get('speed').cur)
+        # ex: the cost of standing up, without mark_dirty
+        char.attrs.get('speed').cur = 20
+        regen.tick()
+        self.assertEqual(26, char.attrs.get('speed').cur)
+
+    def test_remove_moves_last_row(self):
+        regen = RegenSystem()
+        chars = [fake_char(i, 10 * i) for i in range(1, 4)]
+        for char in chars:
+            regen.add(char)
+        regen.remove(chars[0])
+        self.assertEqual(2, len(regen))
+        self.assertEqual(0, regen.rows[3])
+        self.assertEqual(30, regen.cur[0][0])
+
+
+class TestCarryCache(unittest.TestCase):
+    def test_delete_in_nested_container(self):
+        char = FakeObj(1, weight=0)
+        bag = FakeObj(2, location=char, weight=1)
+        item = FakeObj(3, location=bag, weight=5)
+        self.assertEqual(6, carry.carried_weight(char))
+        # deleted in place, no move hooks
+        bag.contents.remove(item)
+        self.assertEqual(0, carry.item_count(bag))
+        self.assertEqual(1, carry.carried_weight(char))
+
+    def test_invalidate_holders(self):
+        char = FakeObj(1, weight=0)
+        bag = FakeObj(2, location=char, weight=1)
+        FakeObj(3, location=bag, weight=5)
+        self.assertEqual(6, carry.carried_weight(char))
+        bag.contents.pop().location = None
+        carry.invalidate(bag)
+        self.assertEqual(1, carry.carried_weight(char))
+
+
+class TestStacks(unittest.TestCase):
+    def test_parse_amount(self):
+        self.assertEqual((5, 'arrow'), parse_amount("5 arrow"))
+        self.assertEqual((None, 'arrow'), parse_amount("arrow"))
+        self.assertEqual((None, '5'), parse_amount("5"))
+        for args in ("0 arrow", "00 arrow"):
+            with self.assertRaises(ValueError):
+                parse_amount(args)
+
+    def test_stack_key(self):
+        room = FakeObj()
+        arrow = FakeStack(2, 'arrow', room, weight=1)
+        other = FakeStack(3, 'arrow', room, weight=1)
+        heavy = FakeStack(4, 'arrow', room, weight=2)
+        self.assertEqual(arrow.stack_key(), other.stack_key())
+        self.assertNotEqual(arrow.stack_key(), heavy.stack_key())
+        self.assertIs(arrow.ndb.stack_key, arrow.stack_key())
+        # holding something
+        FakeObj(5, 'note', arrow)
+        self.assertIsNone(arrow.stack_key())
+
+    def test_split_needs_an_amount(self):
+        arrow = FakeStack(2, 'arrow', FakeObj(), count=5)
+        for amount in (0, -1):
+            with self.assertRaises(ValueError):
+                arrow.split(amount)
+        self.assertEqual(5, arrow.count)
+        self.assertIs(arrow, arrow.split(5))
+
+    def test_merge_stack(self):
+        room = FakeObj()
+        FakeObj(2, 'arrow', room)  # not an object, never merged into
+        arrow = FakeStack(3, 'arrow', room, count=2)
+        more = FakeStack(4, 'arrow', room, count=3)
+        self.assertIs(arrow, more.merge_stack())
+        self.assertEqual(5, arrow.count)
+        self.assertIsNone(more.pk)
+        self.assertNotIn(more, room.contents)
+        # nothing left to merge with
+        self.assertIs(arrow, arrow.merge_stack())
+
+    def test_container_limit_counts_stacks(self):
+        quiver = FakeObj(1, 'quiver')
+        quiver.db.limit = 10
+        FakeStack(2, 'arrow', quiver, count=8)
+        with mock.patch('world.utils.utils.is_container', return_value=True):
+            self.assertTrue(can_contain_more(quiver))
+            self.assertTrue(can_contain_more(quiver, 2))
+            self.assertFalse(can_contain_more(quiver, 3))
+
+
+class TestWriteQueue(unittest.TestCase):
+    def setUp(self):
+        persistence._PENDING.clear()
+        persistence._IN_FLIGHT.clear()
+        persistence._DRAINED = False
+
+    tearDown = setUp
+
+    def test_coalesced(self):
+        char, other = FakeObj(1), FakeObj(2)
+        persistence.queue_write(char, 'attrs', 1)
+        persistence.queue_write(other, 'attrs', 1)
+        persistence.queue_write(char, 'attrs', 2)
+        self.assertEqual(2, persistence.queue_depth())
+        self.assertEqual(2, persistence.queued_value(char, 'attrs'))
+        self.assertIsNone(persistence.queued_value(char, 'stats'))
+        # the latest write went to the back
+        self.assertEqual([(2, 'attrs'), (1, 'attrs')],
+                         list(persistence._PENDING))
+
+    def test_queued_value_in_flight(self):
+        char = FakeObj(1)
+        persistence._IN_FLIGHT.append((char, 'attrs', 1, 'attrs', 1))
+        self.assertEqual(1, persistence.queued_value(char, 'attrs'))
+        persistence.queue_write(char, 'attrs', 2)
+        self.assertEqual(2, persistence.queued_value(char, 'attrs'))
+
+    def test_failed_batch_queued_again(self):
+        char, other = FakeObj(1), FakeObj(2)
+        persistence._IN_FLIGHT.extend([(char, 'attrs', 1, 'attrs', 1),
+                                       (other, 'attrs', 1, 'attrs', 1)])
+        persistence.queue_write(char, 'attrs', 2)
+        persistence._batch_failed(mock.Mock())
+        self.assertEqual([], persistence._IN_FLIGHT)
+        # the newer write isn't replaced by the failed one
+        self.assertEqual(2, persistence.queued_value(char, 'attrs'))
+        self.assertEqual(1, persistence.queued_value(other, 'attrs'))
+
+    def test_drain(self):
+        char = FakeObj(1, attrs='old')
+        persistence._IN_FLIGHT.append((char, 'attrs', 1, 'attrs', 1))
+        persistence.queue_write(char, 'attrs', 2)
+        with mock.patch.object(persistence, '_update',
+                               return_value=(2, 0)) as update:
+            persistence.drain()
+        # the batch in flight first, the pending write lands after it
+        self.assertEqual([1, 2], [x[2] for x in update.call_args[0][0]])
+        self.assertEqual(0, persistence.queue_depth())
+        # the thread of the batch in flight writes nothing anymore
+        self.assertEqual((0, 0), persistence._write_batch([]))
+
+    def test_direct_save_keeps_order(self):
+        class Handler(StorageHandler):
+            __attr_name__ = 'attrs'
+
+        char = FakeObj(1, attrs={})
+        handler = Handler(char)
+        persistence.queue_write(char, 'attrs', {'level': 1})
+        handler.save()
+        self.assertEqual(0, persistence.queue_depth())
+
+        persistence._IN_FLIGHT.append((char, 'attrs', {}, 'attrs', 1))
+        handler.save()
+        # queued again to land after the batch in flight
+        self.assertEqual(char.attributes.get('attrs'),
+                         persistence._PENDING[(1, 'attrs')][2])
+
+
+class TestDirtyHandlers(unittest.TestCase):
+    class Handler(StorageHandler):
+        __attr_name__ = 'attrs'
+
+    def setUp(self):
+        persistence._PENDING.clear()
+        persistence._IN_FLIGHT.clear()
+        persistence._CYCLES = 0
+        self.char = FakeObj(1, attrs={'items': [1]})
+        self.handler = self.Handler(self.char)
+
+    def tearDown(self):
+        persistence._PENDING.clear()
+        persistence._CYCLES = 0
+
+    def test_set_and_flush(self):
+        self.assertFalse(self.handler.is_dirty())
+        self.handler.level = 3
+        self.assertTrue(self.handler.is_dirty(in_place=False))
+        packed = self.handler.flush()
+        self.assertEqual(3, packed['level'])
+        self.assertFalse(self.handler.is_dirty())
+        self.assertIsNone(self.handler.flush())
+
+    def test_changed_in_place(self):
+        self.handler.items.append(2)
+        # only found by packing again
+        self.assertFalse(self.handler.is_dirty(in_place=False))
+        self.assertTrue(self.handler.is_dirty())
+        self.assertEqual([1, 2], self.handler.flush()['items'])
+
+    def test_save_dirty_queues(self):
+        self.handler.level = 3
+        self.assertEqual(1, persistence.save_dirty([self.handler]))
+        self.assertEqual(
+            3,
+            persistence.queued_value(self.char, 'attrs')['level'])
+        self.assertEqual(0, persistence.save_dirty([self.handler]))
+
+    def test_cycles_look_in_place_sometimes(self):
+        self.handler.items.append(2)
+        with mock.patch.object(persistence, 'loaded_handlers',
+                               return_value=[self.handler]), \
+                mock.patch.object(persistence, 'process_queue'):
+            for _ in range(persistence.IN_PLACE_CYCLES - 1):
+                persistence.save_cycle()
+                self.assertEqual(0, persistence.queue_depth())
+            persistence.save_cycle()
+        self.assertEqual(1, persistence.queue_depth())
+
+    def test_cycle_report(self):
+        with mock.patch.object(persistence, 'logger'):
+            persistence._batch_done((3, 120))
+        self.assertEqual({'rows': 3, 'bytes': 120}, persistence.LAST_CYCLE)
+
+
+class TestFindObjs(unittest.TestCase):
+    def setUp(self):
+        # FakeObjs aren't Objects, their keywords are in db.name anyway
+        patcher = mock.patch.object(match, 'is_obj', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.room = FakeObj(1, 'room')
+        self.red = self.item(2, 'red book')
+        self.blue = self.item(3, 'blue book')
+        self.sword = self.item(4, 'sword')
+
+    def item(self, id, name, location=None):
+        obj = FakeObj(id, name, location or self.room)
+        obj.db.name = name.split()
+        return obj
+
+    def find(self, query, locations=None, condition=None):
+        return match.find_objs(query, locations or (self.room, ), condition)
+
+    def test_dot_notation(self):
+        self.assertEqual([self.red], self.find('book'))
+        self.assertEqual([self.blue], self.find('2.book'))
+        self.assertEqual([], self.find('3.book'))
+        self.assertEqual([self.red, self.blue], self.find('all.book'))
+        self.assertEqual([self.red, self.blue, self.sword],
+                         self.find('all'))
+        self.assertEqual([], self.find('x.book'))
+
+    def test_prefixes(self):
+        self.assertEqual([self.red], self.find('bo'))
+        self.assertEqual([self.blue], self.find('bl'))
+        self.assertEqual([self.sword], self.find('SW'))
+        self.assertEqual([], self.find('books'))
+
+    def test_positions_across_locations(self):
+        ch = FakeObj(5, 'ch')
+        mine = self.item(6, 'old book', ch)
+        locations = (ch, self.room)
+        self.assertEqual([mine], self.find('book', locations))
+        self.assertEqual([self.red], self.find('2.book', locations))
+        self.assertEqual([self.blue], self.find('3.book', locations))
+        self.assertEqual([mine, self.red, self.blue],
+                         self.find('all.book', locations))
+
+    def test_condition_not_counted(self):
+        # ex: get skips what isn't an object, 2.book is the next one
+        not_red = lambda x: x is not self.red
+        self.assertEqual([self.blue], self.find('book', condition=not_red))
+        self.assertEqual([], self.find('2.book', condition=not_red))
+        self.assertEqual([self.blue, self.sword],
+                         self.find('all', condition=not_red))
+
+    def test_invalidated(self):
+        self.assertEqual([], self.find('shield'))
+        # created or deleted in place, no move hooks
+        shield = self.item(7, 'shield')
+        self.assertEqual([shield], self.find('shield'))
+        self.room.contents.remove(self.red)
+        self.assertEqual([self.blue], self.find('book'))
+        # a move in and one out keep the length, the hooks drop the index
+        self.room.contents.remove(self.blue)
+        green = self.item(8, 'green book')
+        self.room.ndb.keyword_index = None
+        self.assertEqual([green], self.find('book'))
+
+
+class TestOutputBuffer(unittest.TestCase):
+    def setUp(self):
+        output._BUFFERS.clear()
+        output._SCHEDULED.clear()
+        patcher = mock.patch.object(output, 'reactor')
+        self.reactor = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    tearDown = setUp
+
+    def online(self, id, sessions=1):
+        obj = FakeObj(id)
+        obj.sessions = SimpleNamespace(count=lambda: sessions)
+        return obj
+
+    def test_collected_in_order(self):
+        ch = self.online(1)
+        self.assertTrue(output.collect(ch, "one", True))
+        self.assertTrue(output.collect(ch, "two", True))
+        self.assertEqual([], ch.msgs)
+        # the prompt isn't plain text, what was collected goes first
+        self.assertFalse(output.collect(ch, "prompt", False))
+        self.assertEqual([("one\ntwo", {})], ch.msgs)
+        self.assertEqual(1, self.reactor.callLater.call_count)
+
+    def test_flush_all(self):
+        chars = [self.online(i) for i in (1, 2)]
+        for ch in chars:
+            output.collect(ch, "hi", True)
+        # one flush scheduled for everybody
+        self.assertEqual(1, self.reactor.callLater.call_count)
+        output.flush_all()
+        for ch in chars:
+            self.assertEqual([("hi", {})], ch.msgs)
+        self.assertEqual({}, output._BUFFERS)
+        self.assertEqual([], output._SCHEDULED)
+
+    def test_nothing_collected_without_sessions(self):
+        mob = self.online(1, sessions=0)
+        self.assertFalse(output.collect(mob, "hi", True))
+        self.assertEqual({}, output._BUFFERS)
+        self.reactor.callLater.assert_not_called()
+
+
+class TestEquipment(unittest.TestCase):
+    def setUp(self):
+        # messages and stat changes aren't tested here
+        for name in ('act', 'apply_obj_effects', 'remove_obj_effects'):
+            patcher = mock.patch.object(characters, name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.char = FakeObj(1, 'char')
+        self.helm = FakeObj(2, 'helm', self.char)
+        self.helm.db.wear_loc = 'head'
+        self.sword = FakeObj(3, 'sword', self.char)
+
+    def test_wear_wield_remove(self):
+        equipment = characters.EquipmentHandler(self.char)
+        equipment.add(self.helm)
+        equipment.wield(self.sword)
+        self.assertIs(self.helm, equipment.location['head'])
+        self.assertTrue(equipment.is_equipped(self.sword))
+        self.assertEqual({'head': 2, 'wield': 3},
+                         self.char.attributes.get('equipment'))
+
+        equipment.remove(self.helm)
+        equipment.unwield(self.sword)
+        self.assertIsNone(equipment.location['head'])
+        self.assertFalse(equipment.is_equipped(self.helm))
+        self.assertFalse(equipment.is_equipped(self.sword))
+        self.assertEqual({}, self.char.attributes.get('equipment'))
+
+    def test_slot_taken(self):
+        equipment = characters.EquipmentHandler(self.char)
+        equipment.add(self.helm)
+        other = FakeObj(4, 'cap', self.char)
+        other.db.wear_loc = 'head'
+        equipment.add(other)
+        self.assertIs(self.helm, equipment.location['head'])
+        self.assertFalse(equipment.is_equipped(other))
+
+    def test_cleared_when_left(self):
+        # what Character.at_object_leave does with what leaves
+        equipment = characters.EquipmentHandler(self.char)
+        equipment.wield(self.sword)
+        equipment.clear(self.sword)
+        self.assertIsNone(equipment.location['wield'])
+        self.assertFalse(equipment.is_equipped(self.sword))
+        self.assertEqual({}, self.char.attributes.get('equipment'))
+
+    def test_legacy_characters(self):
+        # no slot map yet, what is worn/wielded is read from the objects
+        self.helm.db.is_worn = self.sword.db.is_wielded = True
+        with mock.patch.object(characters, 'is_equippable',
+                               lambda x: x is self.helm), \
+                mock.patch.object(characters, 'is_worn',
+                                  lambda x: bool(x.db.is_worn)), \
+                mock.patch.object(characters, 'is_wieldable',
+                                  lambda x: x is self.sword), \
+                mock.patch.object(characters, 'is_wielded',
+                                  lambda x: bool(x.db.is_wielded)):
+            equipment = characters.EquipmentHandler(self.char)
+        self.assertIs(self.helm, equipment.location['head'])
+        self.assertIs(self.sword, equipment.location['wield'])
+        self.assertEqual({2, 3}, equipment.equipped)
+        self.assertEqual({'head': 2, 'wield': 3},
+                         self.char.attributes.get('equipment'))
+
+
+class TestRoomLook(unittest.TestCase):
+    def setUp(self):
+        patches = {
+            'is_pc': lambda x: bool(x.db.is_pc),
+            'is_npc': lambda x: bool(x.db.is_npc),
+            'is_obj': lambda x: bool(x.db.is_obj),
+            'is_pc_npc': lambda x: False,
+            # only what DetectInvis reveals is hidden here
+            'can_see_obj': lambda viewer, obj: not obj.db.invis or viewer.
+            conditions.has(DetectInvis),
+            # what the hooks of DefaultRoom do isn't tested here
+            'super': mock.Mock(),
+        }
+        for name, value in patches.items():
+            patcher = mock.patch.object(rooms, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.room = FakeObj(5, '5')
+        self.room.db.name, self.room.db.desc = 'Hall', 'A hall.'
+        self.room.db.exits = {'north': 6, 'south': -1}
+        self.room.__specific_fields__ = {}
+        self.mob = self.thing(6, is_npc=True, ldesc='A guard stands here.')
+        self.coin = self.thing(7, is_obj=True, ldesc='A coin lies here.')
+        self.ring = self.thing(8, is_obj=True, invis=True,
+                               ldesc='A ring lies here.')
+
+    def thing(self, id, **db):
+        obj = FakeObj(id, 'thing', self.room)
+        obj.db.look_index = id
+        for key, value in db.items():
+            setattr(obj.db, key, value)
+        obj.obj_desc = lambda ldesc=False: obj.db.ldesc
+        obj.queue_merge = lambda: None
+        return obj
+
+    def viewer(self, *conditions):
+        return SimpleNamespace(
+            id=1, conditions=SimpleNamespace(has=lambda x: x in conditions))
+
+    def look(self, viewer):
+        return rooms.Room.look_contents(self.room, viewer)
+
+    def test_header_cached_until_rebuilt(self):
+        header = rooms.Room.look_header(self.room)
+        self.assertIn('Hall', header)
+        self.assertIn('north', header)
+        self.assertNotIn('south', header)
+        self.room.db.name = 'Great hall'
+        self.assertIs(header, rooms.Room.look_header(self.room))
+
+        # redit saves rebuild the room from roomdb
+        record = {'name': 'Great hall', 'exits': {}, 'extra': {}}
+        with mock.patch.object(rooms, 'search_roomdb',
+                               return_value={5: record}):
+            rooms.Room.at_object_creation(self.room)
+        self.assertIn('Great hall', rooms.Room.look_header(self.room))
+
+    def test_contents_per_sight(self):
+        seen = self.look(self.viewer())
+        self.assertIn('guard', seen)
+        self.assertNotIn('ring', seen)
+        self.assertIn('ring', self.look(self.viewer(DetectInvis)))
+        # one entry per set of sight conditions, besides the length
+        self.assertEqual(3, len(self.room.ndb.look_contents))
+        self.coin.db.ldesc = 'A shiny coin lies here.'
+        self.assertEqual(seen, self.look(self.viewer()))
+
+    def test_dropped_when_contents_change(self):
+        self.look(self.viewer())
+        rooms.Room.at_object_receive(self.room, self.coin, None)
+        self.assertIsNone(self.room.ndb.look_contents)
+        self.look(self.viewer())
+        rooms.Room.at_object_leave(self.room, self.coin, None)
+        self.assertIsNone(self.room.ndb.look_contents)
+        # created in place, no move hooks
+        self.look(self.viewer())
+        self.thing(9, is_obj=True, ldesc='A bone lies here.')
+        self.assertIn('bone', self.look(self.viewer()))
+
+    def test_dropped_when_conditions_change(self):
+        # what others see of a character depends on its conditions
+        self.look(self.viewer())
+        char = FakeObj(1, 'char', self.room, conditions={'conditions': []})
+        char.db.is_pc = True
+        characters.ConditionHandler(char).add((HolyLight, None, None))
+        self.assertIsNone(self.room.ndb.look_contents)
+
+
+class TestPrompt(unittest.TestCase):
+    def setUp(self):
+        self.char = fake_char(1, 50)
+        self.char.prompt_vitals = lambda: characters.Character.prompt_vitals(
+            self.char)
+        self.char.get_prompt = lambda: f"<{self.char.attrs.vit['health'].cur}>"
+        patcher = mock.patch.object(characters.carry, 'carried_weight',
+                                    return_value=50)
+        self.weight = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def send(self):
+        characters.Character.send_prompt(self.char)
+        msgs, self.char.msgs = self.char.msgs, []
+        return msgs
+
+    def test_unchanged_prompt_not_sent(self):
+        self.assertEqual(2, len(self.send()))
+        self.assertEqual([], self.send())
+        self.assertEqual(self.char.ndb.sent_prompt, '<50>')
+
+    def test_only_changed_vitals_pushed(self):
+        self.send()
+        self.char.attrs.vit['health'].cur = 40
+        with mock.patch.object(self.char, 'msg') as msg:
+            characters.Character.send_prompt(self.char)
+        msg.assert_any_call(char_vitals=((), {'health': 40}))
+        msg.assert_any_call(prompt='<40>')
+        self.assertEqual(40, self.char.ndb.sent_vitals['health'])
+
+    def test_carry_saved_only_when_changed(self):
+        characters.Character.prompt_vitals(self.char)
+        self.assertFalse(self.char.attrs.dirty)
+        self.weight.return_value = 60
+        vitals = characters.Character.prompt_vitals(self.char)
+        self.assertEqual(60, vitals['carry'])
+        self.assertTrue(self.char.attrs.dirty)
+
+
+class TestActTemplates(unittest.TestCase):
+    def test_compile(self):
+        self.assertEqual(compile_act("$n gives $p to $N."),
+                         (('', 'n'), (' gives ', 'p'), (' to ', 'N'),
+                          ('.', None)))
+
+    def test_compile_is_cached(self):
+        self.assertIs(compile_act("$n waves."), compile_act("$n waves."))
+
+    def test_render_literal_tokens(self):
+        template = compile_act("costs 5$$, $x stays")
+        self.assertEqual(render_act(template, None, None, None, None),
+                         "costs 5$, $x stays")
+
+
+class TestBookLayout(unittest.TestCase):
+    def setUp(self):
+        self.translated = []
+
+        def translator(line):
+            self.translated.append(line)
+            return line.upper()
+
+        # the header takes up the first line
+        body = "\n".join(
+            f"line {i}" for i in range(BOOK_PAGE_HEIGHT * 10 - 1))
+        self.layout = BookLayout("title", body, translator)
+
+    def test_lays_out_on_demand(self):
+        self.layout.ensure(1)
+        self.assertEqual(2, len(self.layout.pages))
+        self.assertLess(len(self.translated), BOOK_PAGE_HEIGHT * 3)
+        self.assertFalse(self.layout.done)
+        self.assertIn("LINE 0", self.layout.page(0))
+
+    def test_page_count(self):
+        self.assertEqual(10, self.layout.npages)
+        self.layout.ensure(100)
+        self.assertTrue(self.layout.done)
+        self.assertEqual(10, self.layout.npages)
+        self.assertEqual("", self.layout.page(10))
+
+
+class TestFormTemplates(unittest.TestCase):
+    def test_same_as_evform(self):
+        cells = {1: "left\npage", 2: "right page"}
+        form = EvForm("resources.forms.book")
+        form.map(cells=cells)
+        self.assertEqual(str(form),
+                         str(new_form("resources.forms.book", cells=cells)))
+
+    def test_parsed_once(self):
+        self.assertIs(get_template("resources.forms.book"),
+                      get_template("resources.forms.book"))
+
+
+class TestBookCatalogue(unittest.TestCase):
+    def setUp(self):
+        self.books = BookCatalogue()
+
+        def book(title, category, contents):
+            return {
+                'type': 'book',
+                'extra': {
+                    'title': title,
+                    'author': 'unknown',
+                    'category': category,
+                    'language': 'tamrielic',
+                    'contents': contents
+                }
+            }
+
+        self.books.add(1, book("The Red Mountain", 'research',
+                               "the mountain burns red"))
+        self.books.add(2, book("Cooking", 'notes', "red peppers"))
+        self.books.add(3, {'type': 'weapon', 'extra': {}})
+
+    def test_indexes(self):
+        self.assertEqual(2, len(self.books))
+        self.assertEqual([1], self.books.by_category['research'])
+        self.assertEqual(1, self.books.random('research'))
+        self.assertIsNone(self.books.random('fiction'))
+
+    def test_search_ranks(self):
+        hits = [vnum for vnum, _ in self.books.search("red mountain")]
+        self.assertEqual([1, 2], hits)
+        self.assertEqual([], self.books.search("dragons"))
+
+    def test_update(self):
+        self.books.add(1, {'type': 'weapon', 'extra': {}})
+        self.assertEqual([2], [x for x, _ in self.books.search("red")])
+        self.assertNotIn('mountain', self.books.postings)
+        self.assertNotIn('research', self.books.by_category)
+
+
+class TestMobProgCompile(unittest.TestCase):
+    def test_compiled_once(self):
+        prog = "x = 1"
+        self.assertIs(compile_prog(prog), compile_prog(prog))
+
+    def test_actors_in_namespace(self):
+        class Actor:
+            pass
+
+        ch, mob = Actor(), Actor()
+        MobProgParser(mob, ch).execute("self.greeted = $n\nvict.level = 3")
+        self.assertIs(ch, mob.greeted)
+        self.assertEqual(3, mob.level)
+
+    def test_syntax_error(self):
+        with self.assertRaises(SyntaxError):
+            compile_prog("if True\n  pass")
+
+
+class TestTriggerIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TriggerIndex()
+        self.index.add(1, {'attachedto': 'mob 5', 'event': 'greet',
+                           'prog': ''})
+        self.index.add(2, {'attachedto': 'mob 5', 'event': 'greet',
+                           'prog': ''})
+        self.index.add(3, {'attachedto': '', 'event': 'greet', 'prog': ''})
+        self.index.add(4, {'attachedto': 'room 1', 'event': 'dance',
+                           'prog': ''})
+
+    def test_indexed_by_event_and_entity(self):
+        self.assertEqual({('greet', 'mob', 5): [1, 2]}, self.index.listeners)
+
+    def test_update(self):
+        version = self.index.version
+        self.index.add(1, {'attachedto': 'room 1', 'event': 'enter',
+                           'prog': ''})
+        self.assertEqual([2], self.index.listeners[('greet', 'mob', 5)])
+        self.assertEqual([1], self.index.listeners[('enter', 'room', 1)])
+        self.assertGreater(self.index.version, version)
+
+
+class TestMobProgNesting(unittest.TestCase):
+    def test_nesting_capped(self):
+        mob = FakeObj(1, 'mob')
+        ran = []
+
+        class Parser:
+            # a prog firing itself again, ex: a say prog making its mob say
+            def __init__(self, entity, ch):
+                pass
+
+            def execute(self, prog, **kwargs):
+                ran.append(prog)
+                dispatch.run(1, mob, mob)
+
+        index = SimpleNamespace(triggers={1: ('mob 1', 'say')})
+        with mock.patch.object(dispatch, 'index', return_value=index), \
+                mock.patch.object(dispatch, 'MobProgParser', Parser), \
+                mock.patch.object(dispatch, 'logger') as logger:
+            dispatch.run(1, mob, mob)
+        self.assertEqual(dispatch.MAX_CALL_LEVEL, len(ran))
+        self.assertEqual(0, dispatch._DEPTH)
+        logger.log_err.assert_called_once()
+
+
+class TestMobProgSandbox(unittest.TestCase):
+    def test_runaway_loop_stopped(self):
+        code = compile_prog("while True:\n    pass")
+        with self.assertRaises(BudgetExceeded):
+            run_code(code, {}, max_lines=1000)
+
+    def test_builtin_loop_stopped(self):
+        # sum loops in C, no lines are run
+        for prog in ("x = sum(range(10**12))",
+                     "x = sorted(range(10**30, 0, -1))"):
+            with self.assertRaises(BudgetExceeded):
+                run_code(compile_prog(prog), {})
+
+    def test_restricted_builtins(self):
+        with self.assertRaises(NameError):
+            run_code(compile_prog("open('secrets')"), {})
+
+    def test_runs_within_budget(self):
+        namespace = {}
+        run_code(compile_prog("total = sum(range(10))"), namespace)
+        self.assertEqual(45, namespace['total'])
+
+
+class TestMobAIWheel(unittest.TestCase):
+    def test_bounded_batch(self):
+        ai = mobai.MobAI()
+        for i in range(mobai.MAX_MOBS_PER_PULSE + 100):
+            ai.add(FakeObj(i), delay=0)
+        ai.pulse()
+        self.assertEqual(mobai.MAX_MOBS_PER_PULSE,
+                         mobai.LAST_PULSE['skipped'])
+        self.assertEqual(100, mobai.LAST_PULSE['deferred'])
+        self.assertEqual(mobai.MAX_MOBS_PER_PULSE + 100, len(ai))
+        # the deferred ones are first in line next pulse
+        self.assertEqual(mobai.MAX_MOBS_PER_PULSE, ai.wheel[ai.pos][0].id)
+
+    def test_removed_not_processed(self):
+        ai = mobai.MobAI()
+        mob = FakeObj(1)
+        ai.add(mob, delay=0)
+        ai.remove(mob)
+        ai.pulse()
+        self.assertEqual(0, mobai.LAST_PULSE['skipped'])
+        self.assertEqual(0, len(ai))
+
+    def test_readded_once(self):
+        ai = mobai.MobAI()
+        mob, other = FakeObj(1), FakeObj(2)
+        ai.add(mob, delay=0)
+        ai.remove(mob)
+        ai.add(mob, delay=0)
+        ai.add(other, delay=0)
+        ai.pulse()
+        self.assertEqual(2, mobai.LAST_PULSE['skipped'])
+        self.assertEqual(2, len(ai))
+
+
+class TestCombat(unittest.TestCase):
+    def tearDown(self):
+        dice.seed(None)
+
+    def test_engagement_slots(self):
+        fight = combat.Engagement(None, None, 'hit', 0, (1, 4, 0), 0)
+        with self.assertRaises(AttributeError):
+            fight.extra = 1
+
+    def test_engage_and_stop(self):
+        system = combat.CombatSystem()
+        mob, victim, helper = (fake_mob(i) for i in range(3))
+        self.assertTrue(system.engage(mob, victim))
+        self.assertFalse(system.engage(mob, helper))
+        system.engage(helper, victim)
+        # victim fights back
+        self.assertIs(mob, system.fighting(victim))
+        self.assertEqual((2, 4, 1), system.fights[mob.id].dice)
+
+        system.stop(victim)
+        self.assertEqual(0, len(system))
+        self.assertEqual({}, system.targeted)
+
+    def fight(self, victim_hp):
+        room = FakeObj(1, 'room')
+        mob = fake_mob(2, room, hp=1000)
+        mob.db.hit_roll = 100  # hits unless it rolls a 1
+        victim = fake_mob(3, room, hp=victim_hp)
+        viewers = [FakeObj(i, 'player', room) for i in (4, 5)]
+        for viewer in viewers:
+            viewer.db.is_pc = viewer.has_account = True
+        # what a line looks like isn't tested here, see TestActTemplates
+        patcher = mock.patch.object(combat, 'render_act',
+                                    return_value="a line")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        system = combat.CombatSystem()
+        system.engage(mob, victim)
+        dice.seed(7)
+        return system, mob, victim, viewers
+
+    def test_round(self):
+        system, mob, victim, viewers = self.fight(1000)
+        system.round()
+        self.assertLess(victim.ndb.hp, 1000)
+        self.assertEqual(2, combat.LAST_ROUND['fights'])
+        self.assertEqual(1, combat.LAST_ROUND['rooms'])
+        # one message per player, a line per fighter
+        for viewer in viewers:
+            self.assertEqual(1, len(viewer.msgs))
+            self.assertEqual(2, len(viewer.msgs[0].split("\n")))
+        self.assertEqual(2, len(system))
+
+    def test_round_kill(self):
+        system, mob, victim, viewers = self.fight(1)
+        with mock.patch.object(dispatch, 'fire_at') as fire_at:
+            system.round()
+        fire_at.assert_called_once_with('death', victim, mob)
+        self.assertEqual(1, combat.LAST_ROUND['deaths'])
+        self.assertIsNone(victim.pk)
+        # the victim died before striking back
+        self.assertEqual(1000, combat.get_hp(mob))
+        # the hit and the death, in one message
+        for viewer in viewers:
+            self.assertEqual(1, len(viewer.msgs))
+            self.assertEqual(2, len(viewer.msgs[0].split("\n")))
+        self.assertEqual(0, len(system))
+        self.assertEqual({}, system.targeted)
+
+
+class TestDice(unittest.TestCase):
+    def tearDown(self):
+        dice.seed(None)
+
+    def test_parse(self):
+        self.assertEqual((1, 10, 4), dice.dice("1d10+4"))
+        self.assertEqual((2, 6, -1), dice.dice(" 2d6 - 1"))
+        self.assertEqual((3, 8, 0), dice.dice("3D8"))
+        self.assertEqual("2d6-1", str(dice.dice("2d6 - 1")))
+        self.assertIs(dice.dice("1d10+4"), dice.dice("1d10+4"))
+        for expr in ("d8", "0d6", "1d0", "1d6+", "101d6"):
+            self.assertIsNotNone(dice.valid_dice(expr))
+
+    def test_seeded(self):
+        die = dice.dice("3d6+2")
+        dice.seed(42)
+        single = [die.roll() for _ in range(20)]
+        batch = die.roll_batch(1000).tolist()
+        dice.seed(42)
+        self.assertEqual(single, [die.roll() for _ in range(20)])
+        self.assertEqual(batch, die.roll_batch(1000).tolist())
+        self.assertTrue(all(die.min <= x <= die.max for x in single + batch))
+
+    def test_roll_all(self):
+        low, high = dice.dice("1d4"), dice.dice("1d4+100")
+        rolls = dice.roll_all([low, high, low, high])
+        self.assertTrue(all(x <= 4 for x in rolls[::2]))
+        self.assertTrue(all(x > 100 for x in rolls[1::2]))
+
+
+class TestTimerHeap(unittest.TestCase):
+    def test_order_and_cancel(self):
+        timers = TimerHeap()
+        late = timers.add(30, 1, 'conditions', 'burning', 'end')
+        timers.add(10, 2, 'conditions', 'bleeding', 'effect')
+        cancelled = timers.add(20, 1, 'conditions', 'burning', 'effect')
+        timers.cancel(cancelled)
+
+        self.assertEqual([], timers.pop_due(5))
+        due = timers.pop_due(30)
+        self.assertEqual(['bleeding', 'burning'], [x[4] for x in due])
+        self.assertEqual(late, due[1][1])
+        self.assertEqual(0, len(timers))
+
+    def test_repeat_and_cancel_all(self):
+        timers = TimerHeap()
+        timers.add(10, 1, 'conditions', 'burning', 'effect', repeat=10)
+        timers.add(50, 1, 'conditions', 'burning', 'end')
+        timers.add(50, 2, 'conditions', 'burning', 'end')
+        self.assertEqual(3, len(timers.pop_due(30)))
+        timers.cancel_all(1, 'burning')
+        self.assertEqual(1, len(timers))
+        self.assertEqual([2], [x[2] for x in timers.pop_due(100)])
+
+    def test_dump_load(self):
+        timers = TimerHeap()
+        timers.add(10, 1, 'conditions', 'diseased', 'stage', stage=0)
+        timers.add(5, 2, 'conditions', 'burning', 'effect', repeat=60)
+        loaded = TimerHeap()
+        loaded.load(timers.dump())
+        self.assertEqual(2, len(loaded))
+        self.assertEqual([2, 1], [x[2] for x in loaded.pop_due(10)])
+
+    def test_disease_stages(self):
+        self.assertEqual([{'day': 3}, {'day': 10}],
+                         Diseased('bone_break_fever').stages())
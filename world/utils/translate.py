@@ -0,0 +1,108 @@
+"""
+Cache of obfuscated (translated) text.
+
+What a character reads of a foreign text only depends on the text, the
+language and how well the character knows it. Language skill comes in a
+handful of ranks (see world.languages.LanguageSkill), so the same few
+translations are asked for over and over by `look` and `read`. They are
+kept in a bounded LRU, sized by the amount of characters held, so a text
+is only obfuscated once per rank while it stays in use.
+
+`warm` fills the cache ahead of time for every rank, used on room
+extra descriptions when players walk in.
+"""
+import re
+from collections import OrderedDict
+
+from evennia.contrib.rplanguage import obfuscate_language
+
+from world.languages import LanguageSkill, VALID_LANGUAGES
+from world.globals import _Proficiency
+
+_LANG_TAGS = re.compile('\>(.*?)\<', re.I)
+
+# amount of characters (sources and translations) kept in the cache
+MAX_CACHED_CHARS = 2_000_000
+
+_RANK_LEVELS = sorted(
+    x.level for x in vars(LanguageSkill).values()
+    if isinstance(x, _Proficiency))
+
+
+def lang_chunks(string):
+    """
+    splits a tagged string into (language, text) pairs, returns an
+    empty list if string has no language tags.
+    """
+    chunks = re.split(_LANG_TAGS, string)[1:]
+    if len(chunks) % 2 != 0:
+        raise ValueError("error in regex on rplanguage tag system.")
+    return [(chunks[i], chunks[i + 1].lstrip())
+            for i in range(0, len(chunks), 2)]
+
+
+class TranslationCache:
+    """
+    LRU of translations keyed on (text, language, level), evicting the
+    least recently used entries once more than `max_chars` characters
+    are held.
+    """
+    def __init__(self, translator, max_chars=MAX_CACHED_CHARS):
+        self.translator = translator
+        self.max_chars = max_chars
+        self.entries = OrderedDict()
+        self.chars = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, text, language, level):
+        """ text translated at level (1.0 - skill level) """
+        key = (text, language, level)
+        try:
+            translated = self.entries[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return translated
+
+        self.misses += 1
+        translated = self.translator(text, level=level, language=language)
+        self.entries[key] = translated
+        self.chars += len(text) + len(translated)
+        while self.chars > self.max_chars and len(self.entries) > 1:
+            (old_text, _, _), old = self.entries.popitem(last=False)
+            self.chars -= len(old_text) + len(old)
+        return translated
+
+    def clear(self):
+        self.entries.clear()
+        self.chars = 0
+        self.hits = self.misses = 0
+
+
+TRANSLATIONS = TranslationCache(obfuscate_language)
+
+
+def translate(text, language, skill_level):
+    """ text in language as read by someone of skill_level """
+    return TRANSLATIONS.get(text, language, 1.0 - skill_level)
+
+
+def warm(string):
+    """ translates every tagged chunk of string at every language rank """
+    for language, text in lang_chunks(string):
+        if language not in VALID_LANGUAGES:
+            continue
+        for level in _RANK_LEVELS:
+            translate(text, language, level)
+
+
+def warm_room(room):
+    """ warms the extra descriptions of room """
+    for edesc in (room.db.edesc or {}).values():
+        warm(edesc)
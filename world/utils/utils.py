@@ -1,9 +1,7 @@
 from json import JSONEncoder
-import numpy as np
 import random
 import re
 from functools import reduce
-from numpy.lib.arraysetops import isin
 import yaml
 try:
     from yaml import CLoader as Loader, CDumper as Dumper
@@ -11,30 +9,28 @@ except ImportError:
     from yaml import Loader, Dumper
 
 from evennia import GLOBAL_SCRIPTS, create_object
-from evennia.contrib.rplanguage import obfuscate_language
 from evennia.utils import make_iter
 from evennia.utils.utils import inherits_from, string_partial_matching
 
 from typeclasses.objs.object import VALID_OBJ_APPLIES
 from typeclasses.objs.custom import CUSTOM_OBJS
 from world.globals import BUILDER_LVL, BOOK_CATEGORIES
+from world.utils import carry
+from world.utils.translate import _LANG_TAGS, lang_chunks, translate
 from world.utils.db import search_objdb, search_mobdb
+from world.library import catalogue
 from world.conditions import DetectHidden, DetectInvis, Hidden, HolyLight, Invisible, Sleeping, get_condition
 
 _CAP_PATTERN = re.compile(r'((?<=[\.\?!\n]\s)(\w+)|(^\w+))')
-_LANG_TAGS = re.compile('\>(.*?)\<', re.I)
 
 
 class DBDumpEncoder(JSONEncoder):
     def default(self, obj):
-        if isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
+        # numpy scalars and arrays, checked by module so
+        # numpy doesn't have to be imported to dump the dbs
+        if type(obj).__module__ == 'numpy' and hasattr(obj, 'tolist'):
             return obj.tolist()
-        else:
-            super().default(obj)
+        return super().default(obj)
 
 
 class EntityLoader:
@@ -185,35 +181,19 @@ def rplanguage_parse_string(ch, string):
     If you plan on using this function, it is import that string supplied
     must have >[language]< first then contents in order for this function to parse correctly.
     """
-    global _LANG_TAGS
-
-    chunks = re.split(_LANG_TAGS, string)[1:]
+    chunks = lang_chunks(string)
     if not chunks:
         # no tags found for a language
         return string
 
-    if len(chunks) % 2 != 0:
-        raise ValueError("error in regex on rplanguage tag system.")
-
-    tmp = 0
-    languages = dict()
-    for i in range(0, len(chunks), 2):
-        languages[f"{chunks[i]}_{tmp}"] = chunks[i + 1].lstrip()
-        tmp += 1
-
     new_string = []
-    for lang, text in languages.items():
-        lang = lang.split('_')[0]
+    for lang, text in chunks:
         lang_skill = ch.languages.get(lang)
         if not lang_skill:
             # language doesn't exist (tag is wrong or language isn't implemented)
             new_string.append(text)
             continue
-        lang_skill = lang_skill.level
-        obfuscated_string = obfuscate_language(text,
-                                               level=1.0 - lang_skill,
-                                               language=lang)
-        new_string.append(obfuscated_string)
+        new_string.append(translate(text, lang, lang_skill.level))
 
     translated_string = "".join(new_string)
     #return capitalize_sentence(translated_string)
@@ -288,11 +268,10 @@ def random_book(caller, category=None):
     book will be loaded and put into callers contents
     """
     if category not in BOOK_CATEGORIES:
-        rvnum = random.choice(list(search_objdb('book').keys()))
-    else:
-
-        rvnum = random.choice(
-            list(search_objdb('book', category=category).keys()))
+        category = None
+    rvnum = catalogue().random(category)
+    if rvnum is None:
+        return
 
     book = create_object('typeclasses.objs.custom.Book', key=rvnum)
     book.move_to(caller)
@@ -557,8 +536,8 @@ def is_container(obj):
     return is_obj(obj) and obj.__obj_type__ == 'container'
 
 
-def can_contain_more(obj):
-    """ checks to see if container can store more items """
+def can_contain_more(obj, count=1):
+    """ checks to see if container can store count more items """
     if not is_container(obj):
         return False
 
@@ -568,8 +547,8 @@ def can_contain_more(obj):
     if obj_limit < 0:
         return True
 
-    cur_item_count = len(obj.contents)
-    if obj_limit < cur_item_count + 1:  # for the maybe extra added item
+    cur_item_count = carry.item_count(obj)
+    if obj_limit < cur_item_count + count:  # for the maybe added items
         return False
     return True
 
@@ -580,8 +559,8 @@ def can_pickup(ch, obj):
         return False
 
     # check to see if adding obj will overflow carry rating
-    carry = ch.attrs.carry
-    if carry.cur + obj.db.weight > carry.max:
+    carried = carry.carried_weight(ch) + carry.item_weight(obj)
+    if carried > ch.attrs.carry.max:
         return False
 
     return True
@@ -0,0 +1,106 @@
+"""
+Formulas for the derived vitals (health, stamina, magicka, speed, carry).
+
+The plain functions work on single Python numbers with `math` and always
+hand back Python ints, so nothing but builtins ends up in Attributes.
+
+The `*_batch` functions do the same math over whole arrays at once for
+systems that handle many characters per call. NumPy is only imported the
+first time one of those is used.
+"""
+import math
+
+_NP = None
+
+
+def _numpy():
+    # numpy is heavy to import and only needed for batch work
+    global _NP
+    if _NP is None:
+        import numpy as _NP
+    return _NP
+
+
+def base_vital(level, mult=1.5):
+    level = max(level, 1)
+    return (mult * math.log2(level)) * level
+
+
+def max_health(level, end, mods=0):
+    health = base_vital(level) * math.log(max(end, 1))
+    return max(int(health) + mods, 3)
+
+
+def max_stamina(level, end, agi, mods=0):
+    stamina = base_vital(level) * math.log(max((end + agi) / 2, 1))
+    return max(int(stamina) + mods, 3)
+
+
+def max_magicka(level, wp, int_, mods=0):
+    magicka = base_vital(level) * math.log(max((wp + int_) / 2, 1))
+    return max(int(magicka) + mods + 20, 3)
+
+
+def max_speed(str_bonus, agi_bonus, mods=0):
+    return str_bonus + (2 * agi_bonus) + 20 + mods
+
+
+def max_carry(str_, end, mods=0):
+    carry = ((0.75 * str_) + (0.25 * end)) + 50
+    return int(carry) + mods
+
+
+def heal_amount(level):
+    """ amount of vitals regenerated per heal tick """
+    return 0.17588 * level + 5
+
+
+def base_vital_batch(level, mult=1.5):
+    np = _numpy()
+    level = np.maximum(np.asarray(level, dtype=np.float64), 1)
+    return (mult * np.log2(level)) * level
+
+
+def _log_batch(value):
+    np = _numpy()
+    return np.log(np.maximum(np.asarray(value, dtype=np.float64), 1))
+
+
+def max_health_batch(level, end, mods=0):
+    np = _numpy()
+    health = base_vital_batch(level) * _log_batch(end)
+    return np.maximum(health.astype(np.int64) + mods, 3)
+
+
+def max_stamina_batch(level, end, agi, mods=0):
+    np = _numpy()
+    stamina = base_vital_batch(level) * _log_batch(
+        (np.asarray(end) + np.asarray(agi)) / 2)
+    return np.maximum(stamina.astype(np.int64) + mods, 3)
+
+
+def max_magicka_batch(level, wp, int_, mods=0):
+    np = _numpy()
+    magicka = base_vital_batch(level) * _log_batch(
+        (np.asarray(wp) + np.asarray(int_)) / 2)
+    return np.maximum(magicka.astype(np.int64) + mods + 20, 3)
+
+
+def heal_amount_batch(level):
+    np = _numpy()
+    return 0.17588 * np.asarray(level, dtype=np.float64) + 5
+
+
+def regen_batch(cur, max_, rate, amount):
+    """
+    applies `amount` (one value per row) scaled by each vital's rate to
+    the cur array, clamped to [0, max]. vitals already at max are
+    left untouched. returns the new cur array.
+    """
+    np = _numpy()
+    cur = np.asarray(cur, dtype=np.int64)
+    max_ = np.asarray(max_, dtype=np.int64)
+    gain = (np.asarray(amount, dtype=np.float64)[:, None] *
+            np.asarray(rate, dtype=np.float64)).astype(np.int64)
+    healed = np.clip(cur + gain, 0, max_)
+    return np.where(cur == max_, cur, healed)